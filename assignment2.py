@@ -1,6 +1,36 @@
+import cProfile
 import math
-from queue import Queue
-from typing import List, Tuple, Optional, Union
+import marshal
+import mmap
+import os
+import string
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from heapq import heappush, heappop
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import repeat
+from typing import List, Tuple, Optional, Union, Iterable, Iterator, Callable
+
+# Header written at the start of a compiled dictionary cache. The marshal version is part of it because the marshal
+# format is only guaranteed to be readable by the interpreter that wrote it.
+CACHE_SUFFIX = ".trie.bin"
+COMPACT_CACHE_SUFFIX = ".compact.bin"
+CACHE_MAGIC = b"TRIEBIN" + bytes([2, marshal.version])
+
+# Header of a memory mapped trie snapshot: magic, version, byte order, node count, word count and string blob size.
+SNAPSHOT_HEADER = struct.Struct("=8sIIQQQ")
+SNAPSHOT_MAGIC = b"TRIESNAP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_BYTEORDER = 1 if sys.byteorder == "little" else 2
+
+# Max-flow engines that FlowNetwork.calculateMaxFlow and allocate accept, mapped to the FlowNetwork method name
+MAX_FLOW_METHODS = {"ford_fulkerson": "fordFulkerson", "dinic": "dinic", "push_relabel": "pushRelabel"}
 
 ### DO NOT CHANGE THIS FUNCTION
 def load_dictionary(filename):
@@ -24,17 +54,266 @@ def load_dictionary(filename):
 
     return aList
 
+def iter_dictionary(filename: str) -> Iterator[Tuple[str, str, int]]:
+    """
+    Function description:
+    Streams the records of a dictionary file one at a time in the same format as load_dictionary, without building
+    an intermediate list.
+
+    Approach description (if main function):
+    The file is read in a single pass. Each line is classified by its first four characters and the value is taken
+    by slicing off the known "word: ", "frequency: " or "definition: " label, so no str.replace is needed. A record is
+    yielded as soon as its definition line is read, which lets the caller insert it straight into a Trie.
+
+    :Input:
+    filename: Path of the dictionary file.
+    :Output, return or postcondition: Yields (word, definition, frequency) tuples in file order.
+    :Time complexity: O(T). T is the amount of characters in the file.
+    :Aux space complexity: O(L). L is the length of the longest line, only one line is held at a time.
+    """
+    word, frequency = "", 0
+    with open(filename, encoding="utf-8") as infile:
+        for line in infile:
+            label = line[0:4]
+            if label == "word":
+                word = line[6:].strip()
+            elif label == "freq":
+                frequency = int(line[11:])
+            elif label == "defi":
+                yield word, line[12:].rstrip("\n"), frequency
+
+def cache_path(filename: str, compact: bool = False) -> str:
+    """
+    Function description:
+    Returns the path of the compiled cache that belongs to a dictionary file, e.g. Dictionary.trie.bin for
+    Dictionary.txt, or Dictionary.compact.bin for the cache of its CompactTrie.
+
+    :Input:
+    filename: Path of the dictionary file.
+    compact: Whether to return the path of the CompactTrie cache.
+    :Output, return or postcondition: The path of the cache file next to the dictionary file.
+    :Time complexity: O(F). F is the length of filename.
+    :Aux space complexity: O(F).
+    """
+    return os.path.splitext(filename)[0] + (COMPACT_CACHE_SUFFIX if compact else CACHE_SUFFIX)
+
+def read_cache(filename: str, compact: bool = False) -> Optional[Union[List[Tuple[str, str, int]], tuple]]:
+    """
+    Function description:
+    Reads the compiled cache of a dictionary file if it exists, is newer than the dictionary file and was written
+    by a compatible interpreter.
+
+    :Input:
+    filename: Path of the dictionary file (not of the cache).
+    compact: Whether to read the CompactTrie cache instead of the records.
+    :Output, return or postcondition: Returns the list of (word, definition, frequency) records, or the state of
+    the CompactTrie from CompactTrie.state when compact is set. Returns None if the cache is missing, stale or
+    unreadable.
+    :Time complexity: O(T). T is the size of the cache, which is read with marshal in one call and never parsed as
+    text.
+    :Aux space complexity: O(T).
+    """
+    path = cache_path(filename, compact)
+    try:
+        if os.stat(path).st_mtime_ns <= os.stat(filename).st_mtime_ns:
+            return None
+        with open(path, "rb") as infile:
+            if infile.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            # marshal.load on the file object reads it in small pieces, loads on the whole buffer is many times faster
+            return marshal.loads(infile.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+def write_cache(filename: str, records: Union[List[Tuple[str, str, int]], tuple], compact: bool = False) -> bool:
+    """
+    Function description:
+    Writes the compiled cache of a dictionary file. The cache is written to a temporary file first and then moved
+    into place, so a reader never sees a half written cache.
+
+    :Input:
+    filename: Path of the dictionary file (not of the cache).
+    records: The (word, definition, frequency) records of the dictionary, or the state of its CompactTrie when
+    compact is set.
+    compact: Whether to write the CompactTrie cache instead of the records.
+    :Output, return or postcondition: Returns True if the cache was written, False if the directory is not writable.
+    :Time complexity: O(T). T is the size of the records.
+    :Aux space complexity: O(T) for the marshal buffer.
+    """
+    path = cache_path(filename, compact)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as outfile:
+            outfile.write(CACHE_MAGIC)
+            marshal.dump(records, outfile)
+        os.replace(temp_path, path)
+        return True
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+def load_trie(filename: str, use_cache: bool = True, compact: bool = False) -> Union["Trie", "CompactTrie"]:
+    """
+    Function description:
+    Builds a Trie, or a CompactTrie, from a dictionary file, using the compiled cache next to it when it is up to
+    date.
+
+    Approach description (if main function):
+    On a warm start of a Trie the records are read from the compiled cache with marshal, so no text parsing happens
+    at all, but the nodes are still built: most of the time of a cold start goes into creating the Node objects, and
+    creating them from a cached layout instead of by inserting was measured to be no faster. A CompactTrie is only
+    flat arrays, so its cache holds the built arrays and a warm start skips construction entirely. On a cold start
+    the records are streamed from iter_dictionary straight into the Trie in one pass, and the cache is written
+    afterwards so the next start is warm.
+
+    :Input:
+    filename: Path of the dictionary file.
+    use_cache: Whether to read and write the compiled cache.
+    compact: Whether to return a CompactTrie instead of a Trie.
+    :Output, return or postcondition: Returns a Trie, or a CompactTrie if compact is set, holding every record of
+    the dictionary.
+    :Time complexity: O(T). T is the amount of characters in the dictionary. A warm CompactTrie start is O(T) in
+    reading the cache only.
+    :Aux space complexity: O(T). Same as the Trie itself.
+    """
+    if compact:
+        if use_cache:
+            state = read_cache(filename, True)
+            if state is not None:
+                return CompactTrie.from_state(state)
+        trie = CompactTrie(iter_dictionary(filename))
+        if use_cache:
+            write_cache(filename, trie.state(), True)
+        return trie
+    if not use_cache:
+        return Trie(iter_dictionary(filename))
+    records = read_cache(filename)
+    if records is not None:
+        return Trie(records)
+    trie = Trie([])
+    records = []
+    for record in iter_dictionary(filename):
+        # Insert while streaming and keep the record for the cache
+        trie.insert(record[0], record)
+        records.append(record)
+    write_cache(filename, records)
+    return trie
+
+class Alphabet:
+    def __init__(self, characters: Optional[str] = string.ascii_lowercase, dense_threshold: Optional[int] = None):
+        """
+        Function description:
+        Initializes the mapping from characters to the child slots of a Trie Node. Slot 0 is reserved for the node
+        that stores a complete word, so the first character gets slot 1.
+
+        :Input:
+        characters: The characters that may appear in keys, in slot order. None gives an open alphabet that accepts
+        any Unicode character and assigns slots in the order characters are first inserted.
+        dense_threshold: The number of children a node may have before its sorted child arrays are replaced by one
+        dense array indexed by slot. 0 makes every node dense. Defaults to 0 for a fixed alphabet of at most 27 slots,
+        which is the original 27 slot layout, and to 8 otherwise.
+        :Output, return or postcondition: Creates an Alphabet object with the attributes characters, index, fixed,
+        dense_threshold and offset.
+        :Time complexity: O(A). A is the number of characters.
+        :Aux space complexity: O(A)
+        """
+        self.fixed = characters is not None
+        # characters[slot] is the character of a slot and index[character] is the slot of a character
+        self.characters = [""]
+        self.index = {}
+        for char in characters or "":
+            if char not in self.index:
+                self.index[char] = len(self.characters)
+                self.characters.append(char)
+        if dense_threshold is None:
+            dense_threshold = 0 if self.fixed and len(self.characters) <= 27 else 8
+        self.dense_threshold = dense_threshold
+        # A fixed alphabet that is one run of code points, like a to z, has the slot ord(char) - offset
+        self.offset = None
+        codes = [ord(char) for char in self.characters[1:]]
+        if self.fixed and codes and codes == list(range(codes[0], codes[0] + len(codes))):
+            self.offset = codes[0] - 1
+
+    def __len__(self) -> int:
+        """
+        Function description:
+        Returns the number of slots, including the reserved slot 0.
+
+        :Output, return or postcondition: The number of slots. An integer.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        return len(self.characters)
+
+    def slot(self, char: str) -> int:
+        """
+        Function description:
+        Returns the slot of a character, used when inserting. An open alphabet gives a new character the next free
+        slot.
+
+        :Input:
+        char: The character.
+        :Output, return or postcondition: The slot of the character. Raises ValueError if a fixed alphabet does not
+        contain it.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        slot = self.index.get(char)
+        if slot is None:
+            if self.fixed:
+                raise ValueError(f"character {char!r} is not in the alphabet")
+            slot = self.index[char] = len(self.characters)
+            self.characters.append(char)
+        return slot
+
+    def slots(self, key: str) -> List[int]:
+        """
+        Function description:
+        Returns the slots of every character of a key, used when inserting. Same as calling slot for each character.
+
+        :Input:
+        key: The key.
+        :Output, return or postcondition: The list of slots. Raises ValueError if a fixed alphabet does not contain
+        one of the characters.
+        :Time complexity: O(M). M is the length of the key.
+        :Aux space complexity: O(M) for the list.
+        """
+        index = self.index
+        try:
+            return [index[char] for char in key]
+        except KeyError:
+            # Falls back to slot, which adds new characters to an open alphabet or raises for a fixed one
+            return [self.slot(char) for char in key]
+
+    def find(self, char: str) -> int:
+        """
+        Function description:
+        Returns the slot of a character, used when searching. Unlike slot, it never changes the alphabet.
+
+        :Input:
+        char: The character.
+        :Output, return or postcondition: The slot of the character, or -1 if it is not in the alphabet.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        return self.index.get(char, -1)
+
 class Node:
-    def __init__(self, data: Tuple[Optional[str], Optional[str], Optional[int]] = (None, None, None), size: int = 27):
+    __slots__ = ("word", "definition", "frequency", "node_frequency", "keys", "link", "top")
+
+    def __init__(self, data: Tuple[Optional[str], Optional[str], Optional[int]] = (None, None, None), size: int = 27,
+                 sparse: bool = False):
         """
         Function description:
         Initializes a Node object to be used in Trie class.
 
         :Input:
         data: A tuple containing information about the word (word, definition, frequency).
-        size: The size of the link array for child nodes.
+        size: The size of the link array for child nodes of a dense node.
+        sparse: Whether the node starts with empty sorted child arrays instead of a dense link array.
         :Output, return or postcondition: Creates a Node object with the attributes being word, definition, frequency,
-        node_frequency, and link.
+        node_frequency, link and keys.
         :Time complexity: O(1). Just initializing an object.
         :Aux space complexity: O(size). size is the number of elements initialized in self.link list
         """
@@ -42,28 +321,436 @@ class Node:
         self.definition = data[1]
         self.frequency = data[2]
         self.node_frequency = 0
-        # Array of child nodes
-        self.link = [None] * size
+        if sparse:
+            # Sorted slots of the children, link[i] is the child in slot keys[i]
+            self.keys = []
+            self.link = []
+        else:
+            # Array of child nodes indexed by slot, keys is None for a dense node
+            self.keys = None
+            self.link = [None] * size
+        # Sorted list of the best (-frequency, word, definition) entries below this node, only kept when the Trie
+        # was built with top_k
+        self.top = None
+
+class Metrics:
+    def __init__(self):
+        """
+        Function description:
+        Initializes a set of counters and summaries that a Trie or FlowNetwork fills in when it is given one through
+        its metrics attribute. With metrics set to None, the default, an engine only pays for one attribute check
+        per call it would count.
+
+        :Output, return or postcondition: Creates an empty Metrics object with the attributes counters, mapping a
+        name to a count, and summaries, mapping a name to a list of the number and the sum of its observations.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.counters = {}
+        self.summaries = {}
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """
+        Function description:
+        Adds to a counter, creating it at 0 first.
+
+        :Input:
+        name: The name of the counter.
+        amount: How much to add.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Function description:
+        Records one observation of a summary, such as the nodes one search visited.
+
+        :Input:
+        name: The name of the summary.
+        value: The observed value.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        summary = self.summaries.get(name)
+        if summary is None:
+            summary = self.summaries[name] = [0, 0]
+        summary[0] += 1
+        summary[1] += value
+
+    def reset(self) -> None:
+        """
+        Function description:
+        Sets every counter and summary back to nothing.
+
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.counters = {}
+        self.summaries = {}
+
+    def as_dict(self) -> dict:
+        """
+        Function description:
+        Exports the metrics as a flat dictionary: every counter under its name and every summary as name_count and
+        name_sum.
+
+        :Output, return or postcondition: Returns the dictionary, sorted by name.
+        :Time complexity: O(N log N). N is the number of metrics.
+        :Aux space complexity: O(N)
+        """
+        values = dict(self.counters)
+        for name, (count, total) in self.summaries.items():
+            values[f"{name}_count"] = count
+            values[f"{name}_sum"] = total
+        return dict(sorted(values.items()))
+
+    def to_prometheus(self, namespace: str = "") -> str:
+        """
+        Function description:
+        Exports the metrics in the Prometheus text exposition format: counters as name_total and summaries as
+        name_count and name_sum, every name prefixed with the namespace.
+
+        :Input:
+        namespace: Prefix of every metric name, such as "trie" or "flow_network".
+        :Output, return or postcondition: Returns the text, ending with a newline.
+        :Time complexity: O(N log N). N is the number of metrics.
+        :Aux space complexity: O(N)
+        """
+        prefix = f"{namespace}_" if namespace else ""
+        lines = []
+        for name in sorted(self.counters):
+            lines.append(f"# TYPE {prefix}{name}_total counter")
+            lines.append(f"{prefix}{name}_total {self.counters[name]}")
+        for name in sorted(self.summaries):
+            count, total = self.summaries[name]
+            lines.append(f"# TYPE {prefix}{name} summary")
+            lines.append(f"{prefix}{name}_count {count}")
+            lines.append(f"{prefix}{name}_sum {total}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+class Tracer:
+    def __init__(self, profile: bool = False, clock: Callable[[], float] = time.perf_counter):
+        """
+        Function description:
+        Initializes a tracer that records timed spans, such as the phases of allocate and the rounds of a max-flow
+        engine. Spans nest: a span opened inside another one is its child. One Tracer is meant for one thread.
+
+        Approach description (if main function):
+        span is a context manager for coarse phases, and record adds a span that already finished from its start
+        time, which costs a clock call and an append in hot loops. Every finished span is passed to the callbacks.
+        The spans can be exported as Chrome trace events (chrome://tracing, Perfetto, speedscope) or as collapsed
+        stacks for flamegraph.pl. With profile set, a cProfile.Profile runs while the outermost span is open, so the
+        function level profile covers exactly the traced work and can be read with pstats.
+
+        :Input:
+        profile: Whether to run cProfile inside the outermost span.
+        clock: The function giving the current time in seconds.
+        :Output, return or postcondition: Creates a Tracer with the attributes spans (finished spans in the order
+        they finished), stack (names of the open spans), callbacks and profiler (None without profile).
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.clock = clock
+        self.origin = clock()
+        self.spans = []
+        self.stack = []
+        self.callbacks = []
+        self.profiler = cProfile.Profile() if profile else None
+
+    def add_callback(self, callback: Callable[[dict], None]) -> None:
+        """
+        Function description:
+        Registers a function called with every span as it finishes. A span is a dictionary with the keys name,
+        start and end (seconds of the clock), stack (the names from the outermost span down to this one) and
+        attributes.
+
+        :Input:
+        callback: The function to call.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[dict]:
+        """
+        Function description:
+        Context manager timing the code in its block as a span. The attributes of the span dictionary it gives can
+        be added to inside the block, for example to record a result.
+
+        :Input:
+        name: The name of the span.
+        attributes: Values to keep with the span.
+        :Output, return or postcondition: The span is recorded when the block exits, even by an exception.
+        :Time complexity: O(C). C is the number of callbacks.
+        :Aux space complexity: O(D). D is the depth of the span.
+        """
+        if not self.stack and self.profiler is not None:
+            self.profiler.enable()
+        self.stack.append(name)
+        span = {"name": name, "start": self.clock(), "end": None, "stack": tuple(self.stack),
+                "attributes": attributes}
+        try:
+            yield span
+        finally:
+            span["end"] = self.clock()
+            self.stack.pop()
+            if not self.stack and self.profiler is not None:
+                self.profiler.disable()
+            self.finish(span)
+
+    def record(self, name: str, start: float, **attributes) -> None:
+        """
+        Function description:
+        Records a span that started at start and ends now, as a child of the open spans.
+
+        :Input:
+        name: The name of the span.
+        start: When it started, from the clock attribute.
+        attributes: Values to keep with the span.
+        :Time complexity: O(C + D). C is the number of callbacks and D the depth of the span.
+        :Aux space complexity: O(D)
+        """
+        self.finish({"name": name, "start": start, "end": self.clock(), "stack": tuple(self.stack) + (name,),
+                     "attributes": attributes})
+
+    def finish(self, span: dict) -> None:
+        """
+        Function description:
+        Keeps a finished span and passes it to the callbacks.
+
+        :Input:
+        span: The finished span.
+        :Time complexity: O(C). C is the number of callbacks.
+        :Aux space complexity: O(1)
+        """
+        self.spans.append(span)
+        for callback in self.callbacks:
+            callback(span)
+
+    def chrome_trace(self) -> dict:
+        """
+        Function description:
+        Exports the spans as complete events of the Chrome trace event format, in microseconds since the Tracer was
+        created. Saved with json.dump, the result opens in chrome://tracing, Perfetto or speedscope.
+
+        :Output, return or postcondition: Returns a dictionary with the list of events under traceEvents.
+        :Time complexity: O(S). S is the number of spans.
+        :Aux space complexity: O(S)
+        """
+        process, thread = os.getpid(), threading.get_ident()
+        events = [{"name": span["name"], "ph": "X", "ts": (span["start"] - self.origin) * 1e6,
+                   "dur": (span["end"] - span["start"]) * 1e6, "pid": process, "tid": thread,
+                   "args": span["attributes"]} for span in sorted(self.spans, key=lambda span: span["start"])]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def collapsed_stacks(self) -> str:
+        """
+        Function description:
+        Exports the spans as collapsed stacks, one line per stack of span names joined by ";" followed by the time
+        spent in the innermost span itself in microseconds, the input format of flamegraph.pl and speedscope.
+
+        :Output, return or postcondition: Returns the lines, sorted by stack.
+        :Time complexity: O(S×D + N log N). S is the number of spans, D their depth and N the number of stacks.
+        :Aux space complexity: O(N)
+        """
+        totals = {}
+        for span in self.spans:
+            totals[span["stack"]] = totals.get(span["stack"], 0) + span["end"] - span["start"]
+        own = dict(totals)
+        for stack, total in totals.items():
+            if len(stack) > 1 and stack[:-1] in own:
+                own[stack[:-1]] -= total
+        lines = [f"{';'.join(stack)} {round(seconds * 1e6)}" for stack, seconds in sorted(own.items())
+                 if round(seconds * 1e6) > 0]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def trace_span(tracer: Optional[Tracer], name: str, **attributes):
+    """
+    Function description:
+    Returns tracer.span(name, **attributes), or a context manager doing nothing when tracer is None.
+
+    :Input:
+    tracer: The Tracer, or None.
+    name: The name of the span.
+    attributes: Values to keep with the span.
+    :Output, return or postcondition: The context manager.
+    :Time complexity: O(1)
+    :Aux space complexity: O(1)
+    """
+    return nullcontext({"attributes": {}}) if tracer is None else tracer.span(name, **attributes)
+
+class PrefixCache:
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Function description:
+        Initializes a bounded result cache for Trie.prefix_search with least recently used eviction and an optional
+        time to live. It is thread safe, so one cache can sit in front of a VersionedTrie that is read by many
+        threads.
+
+        :Input:
+        maxsize: The largest number of prefixes kept.
+        ttl: How many seconds a result stays valid. None keeps results until they are evicted or invalidated.
+        clock: The function giving the current time in seconds.
+        :Output, return or postcondition: Creates an empty PrefixCache with all counters at 0.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        # Maps a prefix to (expiry time, result), ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Increased on every invalidation, so a result computed before it is not stored after it
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        """
+        Function description:
+        Returns the number of prefixes in the cache.
+
+        :Output, return or postcondition: The number of entries. An integer.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        return len(self.entries)
+
+    def get(self, prefix: str) -> Optional[List[Union[str, int]]]:
+        """
+        Function description:
+        Looks a prefix up and marks it as most recently used. An expired entry is removed and counts as a miss.
+
+        :Input:
+        prefix: The prefix to look up.
+        :Output, return or postcondition: Returns the cached prefix_search result, or None on a miss.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        with self.lock:
+            entry = self.entries.get(prefix)
+            if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+                del self.entries[prefix]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(prefix)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, prefix: str, result: List[Union[str, int]], generation: int) -> None:
+        """
+        Function description:
+        Stores the result of a prefix, evicting the least recently used prefix if the cache is full. The result is
+        dropped if the cache was invalidated since the caller read generation, because it may be stale.
+
+        :Input:
+        prefix: The prefix.
+        result: The prefix_search result of the prefix.
+        generation: The value of self.generation read before the result was computed.
+        :Output, return or postcondition: The result is cached unless it may be stale.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        with self.lock:
+            if generation != self.generation or self.maxsize <= 0:
+                return
+            expiry = None if self.ttl is None else self.clock() + self.ttl
+            self.entries[prefix] = (expiry, result)
+            self.entries.move_to_end(prefix)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, word: str) -> None:
+        """
+        Function description:
+        Removes every cached prefix of a word that was inserted, updated or deleted. Only those prefixes can have
+        a different result afterwards.
+
+        :Input:
+        word: The word that changed.
+        :Output, return or postcondition: No prefix of word is cached.
+        :Time complexity: O(M). M is the length of the word.
+        :Aux space complexity: O(1)
+        """
+        with self.lock:
+            self.generation += 1
+            for counter in range(len(word) + 1):
+                if self.entries.pop(word[:counter], None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Function description:
+        Removes every entry, for example after the Trie was replaced. The counters are kept.
+
+        :Output, return or postcondition: The cache is empty.
+        :Time complexity: O(N). N is the number of entries.
+        :Aux space complexity: O(1)
+        """
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Function description:
+        Returns the counters of the cache, for sizing it in production.
+
+        :Output, return or postcondition: A dictionary with hits, misses, evictions, expirations, invalidations,
+        size and maxsize.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "expirations": self.expirations, "invalidations": self.invalidations,
+                    "size": len(self.entries), "maxsize": self.maxsize}
 
 class Trie:
-    def __init__(self, Dictionary):
+    def __init__(self, Dictionary: Iterable, top_k: int = 0, alphabet: Optional[Alphabet] = None,
+                 metrics: Optional[Metrics] = None):
         """
         Function description:
         Initializes a Trie with data from the given dictionary.
 
         :Input:
-        Dictionary: A list of lists. Each inner index 0 is the word, index 1 is the definition, and
-        index 2 is the frequency of that word.
+        Dictionary: A list of lists, or any iterable such as iter_dictionary. Each inner index 0 is the word, index 1
+        is the definition, and index 2 is the frequency of that word.
+        top_k: How many suggestions every node keeps for prefix_search_topk. 0 keeps none.
+        alphabet: The Alphabet of the keys. Defaults to the lowercase letters a to z.
+        metrics: A Metrics object to count nodes allocated, the comparisons deciding which word a node keeps
+        (compare_calls, one per node on the path of an inserted word, whether insert_aux decides it by frequency or
+        calls compare to break a tie) and the characters compared to break ties, and the nodes every prefix_search
+        visits. It can also be set later through the metrics attribute. None counts nothing.
         :Output, return or postcondition: Initializes a Trie with a root node and populates it with data from the
         Dictionary.
         :Time complexity:
-        O(T). T is the amount of characters in Dictionary.txt. Creates a Node for every character by inserting every
-        word in Dictionary.txt.
+        O(T*K). T is the amount of characters in Dictionary.txt. Creates a Node for every character by inserting every
+        word in Dictionary.txt. K is top_k, the cost of keeping the suggestion list of every node on the path.
         :Aux space complexity:
-        O(T). T is the amount of characters in Dictionary.txt. Creates a Node for every character by inserting every
-        word in Dictionary.txt.
+        O(T*K). T is the amount of characters in Dictionary.txt. Creates a Node for every character by inserting every
+        word in Dictionary.txt, each holding up to K suggestions.
         """
-        self.root = Node()
+        self.alphabet = Alphabet() if alphabet is None else alphabet
+        self.metrics = metrics
+        self.root = self.new_node()
+        self.top_k = top_k
+        self.cache = None
+        # Functions called with a word after it was inserted, updated or deleted
+        self.invalidation_hooks = []
         # Inserts each word from dictionary into Trie
         for words in Dictionary:
             self.insert(words[0], words)
@@ -74,9 +761,9 @@ class Trie:
         Inserts a word and its data into the Trie.
 
         Approach description (if main function):
-        The insert method adds a word and its data to Trie object. Starting at root node, it adds the node_frequency
-        by 1 and uses compare method in Trie class to store the data. It then calls insert_aux method and iterate
-        through the characters of the word that is inserted.
+        The insert method adds a word and its data to Trie object. It calls insert_aux method which iterates through
+        the characters of the word that is inserted. Then at the root node, it adds the node_frequency by 1 and uses
+        compare method in Trie class to store the data.
 
         :Input:
         key: The word to insert.
@@ -86,60 +773,300 @@ class Trie:
         :Aux space complexity: O(M). M is the aux space complexity of insert_aux function.
         """
         current = self.root
+        # Inserts along the key first, so a key with a character outside the alphabet leaves the Trie unchanged
+        data = self.insert_aux(current, key, 0, data)
         # Adds the node frequency at the root node
         current.node_frequency += 1
         # Compare and store data at the current node
         self.compare(current, data)
-        self.insert_aux(current, key, 0, data)
+        if self.top_k:
+            self.update_top(current, data)
+        if self.invalidation_hooks:
+            self.notify(key)
 
-    def insert_aux(self, current: Node, key: str, counter: int, data: Tuple[str, str, int] = None) -> None:
+    def insert_aux(self, current: Node, key: str, counter: int,
+                   data: Tuple[str, str, int] = None) -> Tuple[str, str, int]:
         """
         Function description:
         Auxiliary function for inserting a word and its data into the Trie.
 
         Approach description (if main function):
-        The insert_aux method recursively adds a word and its data to Trie object. For each character in the word,
-        it calculates the index for the corresponding child node based on the character's position in the alphabet.
-        If a child node at the calculated index exists, it goes to that node. Else, it creates a new node at that
-        index. The method adds the node_frequency at each node along the path, making sure it is the same the number
-        of words sharing that key. It then calls the compare method to update the word information at each node with
-        the highest frequency and alphabetically smaller word. When the end of the word is reached, the word and data
-        are stored in the 0th child node.
+        The insert_aux method iteratively adds a word and its data to Trie object. The characters of the word,
+        starting at index counter, are first mapped to their slots in the alphabet, or for a run of code points like
+        the default a to z alphabet only checked to be in the run, as the slot is then ord(char) - offset. For each
+        slot, if a child node exists in that slot, it goes to that node. Else, it creates a new node in that slot. The
+        method adds the node_frequency at each node along the path, making sure it is the same the number of words
+        sharing that key. It then calls the compare method to update the word information at each node with the
+        highest frequency and alphabetically smaller word. When the end of the word is reached, the word and data are stored in the 0th
+        child node.
 
         :Input:
         current: The current node in the Trie.
         key: The word to insert.
         counter: The index of the word being processed.
         data: A list containing word information: word, definition, frequency.
-        :Output, return or postcondition: Inserts the word and data into the Trie recursively.
-        :Time complexity: O(M*min(X, Y)). M is the length of the key. The function is called M times recursively to
-        insert each character in the key. Then compare is used that has O(min(X, Y)) time complexity.
-        :Aux space complexity: O(M). M is the length of the key and the function creates a Node recursively for
-        every character in the key if it not yet exists.
-        """
-        # Store the data in the first node when there is no more characters in the key
-        if counter == len(key):
-            current.link[0] = Node(data)
-            current = current.link[0]
+        :Output, return or postcondition: Inserts the word and data into the Trie and returns the data kept for the
+        word. A word inserted again keeps the data of its insert with the highest frequency, the earliest on a tie,
+        which is what the nodes above it keep. Keys of any length are supported since no recursion is used. Raises
+        ValueError, before changing anything, if the key has a character that is not in a fixed alphabet.
+        :Time complexity: O(M*min(X, Y)). M is the length of the key. The loop runs M times to insert each character
+        in the key. Then compare is used that has O(min(X, Y)) time complexity. With top_k, a key inserted again also
+        costs M times rebuild_top.
+        :Aux space complexity: O(M). M is the length of the key and the function creates a Node for every character
+        in the key if it not yet exists.
+        """
+        top_k = self.top_k
+        frequency = data[2]
+        alphabet = self.alphabet
+        offset = alphabet.offset
+        # Nodes on the path, to rebuild their suggestion lists if the key was inserted before
+        path = [current] if top_k else None
+        # Ties are left to compare, which counts itself in the metrics
+        ties = 0
+        characters = alphabet.characters
+        rest = key[counter:]
+        if offset is not None and alphabet.dense_threshold == 0 and not top_k and (
+                not rest or characters[1] <= min(rest) and max(rest) <= characters[-1]):
+            # The default a to z alphabet: every node is a full dense node and the key was checked to be in the run
+            # of code points, so each slot is computed from the character and indexes the link array directly
+            size = len(characters)
+            empty = (None, None, None)
+            created = 0
+            for counter in range(counter, len(key)):
+                slot = ord(key[counter]) - offset
+                child = current.link[slot]
+                if child is None:
+                    # Positional arguments, a keyword argument makes the call noticeably slower
+                    child = current.link[slot] = Node(empty, size)
+                    created += 1
+                current = child
+                current.node_frequency += 1
+                if current.frequency is None or frequency > current.frequency:
+                    current.word, current.definition, current.frequency = data
+                elif frequency == current.frequency:
+                    ties += 1
+                    self.compare(current, data, counter)
+            if self.metrics is not None:
+                self.metrics.inc("nodes_allocated", created)
         else:
-            # Get the character at the current position
-            char = key[counter]
-            # Calculate the index based on the character's position in the alphabet
-            index = ord(char) - ord("a") + 1
-            if current.link[index] is not None:
-                # Move to the existing child node
-                current = current.link[index]
-            else:
-                # Create a new child node if it does not exist
-                current.link[index] = Node()
-                # Move to the newly created child node
-                current = current.link[index]
-            # Increment the node_frequency to reflect the number of words sharing the key
-            current.node_frequency += 1
-            # Call the compare method to update word information
-            self.compare(current, data, counter)
-            # Recursively inserts the word
-            self.insert_aux(current, key, counter + 1, data)
+            # Map every character to its slot first, so a character outside the alphabet raises before anything
+            # changes
+            slots = alphabet.slots(rest)
+            for counter, slot in enumerate(slots, counter):
+                # Index dense nodes directly and leave sparse nodes to the child and set_child methods
+                link = current.link
+                if current.keys is None and slot < len(link):
+                    child = link[slot]
+                    if child is None:
+                        # Create a new child node if it does not exist
+                        child = link[slot] = self.new_node()
+                else:
+                    child = self.child(current, slot)
+                    if child is None:
+                        child = self.new_node()
+                        self.set_child(current, slot, child)
+                # Move to the child node
+                current = child
+                # Increment the node_frequency to reflect the number of words sharing the key
+                current.node_frequency += 1
+                # Store the data directly on a new node or a node with a lower frequency, and let the compare method
+                # break ties
+                if current.frequency is None or frequency > current.frequency:
+                    current.word, current.definition, current.frequency = data
+                elif frequency == current.frequency:
+                    ties += 1
+                    self.compare(current, data, counter)
+                if top_k:
+                    self.update_top(current, data)
+                    path.append(current)
+        # Store the data in the first node when there is no more characters in the key. Its node_frequency counts
+        # how many times the word was inserted
+        previous = self.child(current, 0)
+        if previous is not None and frequency <= previous.frequency:
+            # Like on the nodes above, a word inserted again keeps the data of its best insert
+            data = (previous.word, previous.definition, previous.frequency)
+            if top_k:
+                # update_top put the data of this insert in the lists on the path, and entries it evicted for it
+                # are gone, so the lists are rebuilt from the deepest node up
+                for node in reversed(path):
+                    self.rebuild_top(node)
+        terminal = Node(data, 0)
+        if self.metrics is not None:
+            self.metrics.inc("nodes_allocated")
+            # The nodes where the frequencies alone decided
+            self.metrics.inc("compare_calls", len(rest) - ties)
+        terminal.node_frequency = 1 if previous is None else previous.node_frequency + 1
+        self.set_child(current, 0, terminal)
+        return data
+
+    def set_cache(self, cache: Optional[PrefixCache]) -> None:
+        """
+        Function description:
+        Puts a PrefixCache in front of prefix_search, or removes it when cache is None. The cache is emptied and
+        registered as an invalidation hook, so every insert, update_frequency and delete drops the prefixes of the
+        changed word.
+
+        :Input:
+        cache: The PrefixCache to use, or None.
+        :Output, return or postcondition: prefix_search goes through the cache.
+        :Time complexity: O(H + N). H is the number of hooks and N is the number of entries in the cache.
+        :Aux space complexity: O(1)
+        """
+        if self.cache is not None:
+            self.invalidation_hooks.remove(self.cache.invalidate)
+        self.cache = cache
+        if cache is not None:
+            cache.clear()
+            self.add_invalidation_hook(cache.invalidate)
+
+    def add_invalidation_hook(self, hook: Callable[[str], None]) -> None:
+        """
+        Function description:
+        Registers a function that is called with a word after the word was inserted, updated or deleted, for
+        example to drop results cached outside the Trie.
+
+        :Input:
+        hook: The function to call.
+        :Output, return or postcondition: hook is called after every change.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.invalidation_hooks.append(hook)
+
+    def notify(self, word: str) -> None:
+        """
+        Function description:
+        Calls every invalidation hook with a word that changed.
+
+        :Input:
+        word: The word that was inserted, updated or deleted.
+        :Output, return or postcondition: Every hook was called.
+        :Time complexity: O(H). H is the number of hooks, times the cost of each hook.
+        :Aux space complexity: O(1)
+        """
+        for hook in self.invalidation_hooks:
+            hook(word)
+
+    def new_node(self) -> Node:
+        """
+        Function description:
+        Creates an empty Node with the child storage the alphabet asks for: a dense link array with one slot per
+        character when dense_threshold is 0, and empty sorted child arrays otherwise.
+
+        :Output, return or postcondition: Returns the new Node.
+        :Time complexity: O(A) for a dense node, A being the size of the alphabet, otherwise O(1).
+        :Aux space complexity: O(A) for a dense node, otherwise O(1).
+        """
+        alphabet = self.alphabet
+        if self.metrics is not None:
+            self.metrics.inc("nodes_allocated")
+        if alphabet.dense_threshold == 0:
+            return Node((None, None, None), len(alphabet.characters))
+        return Node(sparse=True)
+
+    def child(self, current: Node, slot: int) -> Optional[Node]:
+        """
+        Function description:
+        Returns the child of a node in the given slot. Slot 0 holds the node that stores a complete word.
+
+        :Input:
+        current: The current node in the Trie.
+        slot: The slot of the child, from Alphabet.slot or Alphabet.find.
+        :Output, return or postcondition: Returns the child Node, or None if there is no child in that slot.
+        :Time complexity: O(1) for a dense node, O(log(S)) for a sparse node with S children.
+        :Aux space complexity: O(1)
+        """
+        keys = current.keys
+        if keys is None:
+            if 0 <= slot < len(current.link):
+                return current.link[slot]
+            return None
+        position = bisect_left(keys, slot)
+        if position < len(keys) and keys[position] == slot:
+            return current.link[position]
+        return None
+
+    def set_child(self, current: Node, slot: int, child: Node) -> None:
+        """
+        Function description:
+        Stores a child of a node in the given slot. A sparse node that gets more children than the dense_threshold of
+        the alphabet is turned into a dense node, if at least half of its dense array, which reaches up to the highest
+        slot used, is filled. A dense node that would grow to less than half filled turns sparse again.
+
+        :Input:
+        current: The current node in the Trie.
+        slot: The slot of the child.
+        child: The child Node.
+        :Output, return or postcondition: The child is stored in current.
+        :Time complexity: O(S) for a sparse node with S children, O(L) when the node turns dense or its dense array
+        grows, L being the highest slot used, and O(1) for a dense node otherwise.
+        :Aux space complexity: O(L) when the node turns dense or grows, otherwise O(1).
+        """
+        keys = current.keys
+        if keys is None:
+            if slot >= len(current.link):
+                # The array only reaches the highest slot used so far, or an open alphabet grew since it was created
+                used = [key for key, node in enumerate(current.link) if node is not None]
+                if slot >= 2 * (len(used) + 1):
+                    # Growing the array to a far slot would leave it mostly empty, so the node turns sparse again
+                    current.link = [current.link[key] for key in used] + [child]
+                    current.keys = used + [slot]
+                    return
+                current.link.extend([None] * (slot + 1 - len(current.link)))
+            current.link[slot] = child
+            return
+        position = bisect_left(keys, slot)
+        if position < len(keys) and keys[position] == slot:
+            current.link[position] = child
+            return
+        keys.insert(position, slot)
+        current.link.insert(position, child)
+        # A dense array reaches up to the highest slot used, so with a large alphabet it only pays off when it is no
+        # larger than the two sorted arrays
+        if len(keys) > self.alphabet.dense_threshold and keys[-1] < 2 * len(keys):
+            link = [None] * (keys[-1] + 1)
+            for key, node in zip(keys, current.link):
+                link[key] = node
+            current.keys = None
+            current.link = link
+
+    def remove_child(self, current: Node, slot: int) -> None:
+        """
+        Function description:
+        Removes the child of a node in the given slot, if there is one.
+
+        :Input:
+        current: The current node in the Trie.
+        slot: The slot of the child.
+        :Output, return or postcondition: current has no child in that slot.
+        :Time complexity: O(1) for a dense node, O(S) for a sparse node with S children.
+        :Aux space complexity: O(1)
+        """
+        keys = current.keys
+        if keys is None:
+            if 0 <= slot < len(current.link):
+                current.link[slot] = None
+            return
+        position = bisect_left(keys, slot)
+        if position < len(keys) and keys[position] == slot:
+            del keys[position]
+            del current.link[position]
+
+    def children(self, current: Node) -> List[Tuple[int, Node]]:
+        """
+        Function description:
+        Returns the children of a node in slot order, without the node in slot 0 that stores a complete word.
+
+        :Input:
+        current: The current node in the Trie.
+        :Output, return or postcondition: A list of (slot, child) tuples.
+        :Time complexity: O(A) for a dense node, A being the size of the alphabet, O(S) for a sparse node with S
+        children.
+        :Aux space complexity: O(S) for the list.
+        """
+        if current.keys is None:
+            return [(slot, child) for slot, child in enumerate(current.link) if slot and child is not None]
+        return [(slot, child) for slot, child in zip(current.keys, current.link) if slot]
 
     def compare(self, current: Node, data: Tuple[str, str, int], counter: int = 0) -> None:
         """
@@ -159,15 +1086,23 @@ class Trie:
         data's word min(X, Y) times to determine if it will replace current node with data.
         :Aux space complexity: O(1)
         """
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.inc("compare_calls")
         if data is not None and current.frequency is not None:
             if data[2] > current.frequency:
                 # Replace current node's data with the data if data's frequency is higher
                 current.word, current.definition, current.frequency = data
             elif data[2] == current.frequency:
+                start = counter
                 # Compare the order of characters while the strings have characters and the characters are the same
                 while counter < len(data[0]) and counter < len(current.word) and data[0][counter] == current.word[
                     counter]:
                     counter += 1
+                if metrics is not None:
+                    # The characters found equal, plus the one that differs if there is one
+                    metrics.inc("compare_characters", counter - start + (counter < len(data[0])
+                                                                         and counter < len(current.word)))
                 if counter < len(data[0]) and counter < len(current.word) and data[0][counter] < current.word[counter]:
                     # Replace current with data if data is alphabetically smaller
                     current.word, current.definition, current.frequency = data
@@ -175,25 +1110,351 @@ class Trie:
             # Set the current node's data to the data if data or current.frequency is None
             current.word, current.definition, current.frequency = data
 
-    def prefix_search(self, prefix: str) -> List[Union[str, int]]:
+    def find_path(self, current: Node, word: str) -> Optional[List[Node]]:
         """
         Function description:
-        Returns the word with the highest frequency that has the given prefix, its definition, and the number of words
-        that have the given prefix.
+        Returns the nodes on the path of a word that is stored in the Trie.
 
-        Approach description (if main function):
-        This method searches a word and its associated data by its prefix in the Trie data structure.
-        Starting at root node, it calls prefix_search_aux to perform to search recursively.
+        :Input:
+        current: The node to start from, normally the root.
+        word: The word to look for.
+        :Output, return or postcondition: Returns a list of len(word) + 1 nodes where the node at index i is reached
+        after the first i characters, or None if the word is not stored in the Trie.
+        :Time complexity: O(M). M is the length of the word.
+        :Aux space complexity: O(M) for the path.
+        """
+        path = [current]
+        for char in word:
+            current = self.child(current, self.alphabet.find(char))
+            if current is None:
+                return None
+            path.append(current)
+        if self.child(current, 0) is None:
+            return None
+        return path
+
+    def recompute(self, current: Node) -> None:
+        """
+        Function description:
+        Recomputes the word, definition and frequency kept at a node, and its suggestion list, from the word that
+        ends at the node and the best words of its children. Used after a word below the node changed.
+
+        :Input:
+        current: The node to recompute.
+        :Output, return or postcondition: current holds the best word below it again, or None if there is none.
+        :Time complexity: O(S*min(X, Y) + S*K*log(S*K)). S is the number of children and K is top_k.
+        :Aux space complexity: O(S*K) for merging the suggestion lists.
+        """
+        current.word, current.definition, current.frequency = None, None, None
+        terminal = self.child(current, 0)
+        candidates = [child for slot, child in self.children(current)]
+        if terminal is not None:
+            # The word that ends here is compared first, like it is inserted before the longer words below it
+            candidates.insert(0, terminal)
+        for candidate in candidates:
+            if candidate.frequency is not None:
+                self.compare(current, (candidate.word, candidate.definition, candidate.frequency))
+        if self.top_k:
+            self.rebuild_top(current)
+
+    def rebuild_top(self, current: Node) -> None:
+        """
+        Function description:
+        Rebuilds the suggestion list of a node by merging the word that ends at the node with the suggestion lists of
+        its children. Used when an entry may have to leave the list, which update_top cannot do since the entries it
+        evicted earlier are gone.
+
+        :Input:
+        current: The node to rebuild. The suggestion lists of its children must be up to date.
+        :Output, return or postcondition: current.top holds the best top_k words below it, or None if there is none.
+        :Time complexity: O(S*K*log(S*K)). S is the number of children and K is top_k.
+        :Aux space complexity: O(S*K) for merging the suggestion lists.
+        """
+        entries = []
+        terminal = self.child(current, 0)
+        if terminal is not None:
+            entries.append((-terminal.frequency, terminal.word, terminal.definition))
+        for slot, child in self.children(current):
+            if child.top is not None:
+                entries.extend(child.top)
+        entries.sort()
+        current.top = entries[:self.top_k] or None
+
+    def update_frequency(self, word: str, new_frequency: int) -> bool:
+        """
+        Function description:
+        Changes the frequency of a stored word without rebuilding the Trie.
+
+        Approach description (if main function):
+        The node that stores the word is replaced by one with the new frequency. Then every node on the path of the
+        word, from the deepest to the root, recomputes its best word and suggestion list from its children. Nodes off
+        the path are not affected because their subtree did not change.
+
+        :Input:
+        word: The word to update.
+        new_frequency: The new frequency of the word.
+        :Output, return or postcondition: Returns True if the word was updated, False if it is not in the Trie.
+        :Time complexity: O(M*S). M is the length of the word and S is the cost of recompute at one node.
+        :Aux space complexity: O(M) for the path.
+        """
+        if not self.update_frequency_aux(self.root, word, new_frequency):
+            return False
+        self.notify(word)
+        return True
+
+    def update_frequency_aux(self, current: Node, word: str, new_frequency: int) -> bool:
+        """
+        Function description:
+        Auxiliary function for update_frequency, starting at the given root node.
+
+        :Input:
+        current: The root node of the Trie to update.
+        word: The word to update.
+        new_frequency: The new frequency of the word.
+        :Output, return or postcondition: Returns True if the word was updated, False if it is not in the Trie.
+        :Time complexity: O(M*S). M is the length of the word and S is the cost of recompute at one node.
+        :Aux space complexity: O(M) for the path.
+        """
+        path = self.find_path(current, word)
+        if path is None:
+            return False
+        terminal = self.child(path[-1], 0)
+        updated = Node((terminal.word, terminal.definition, new_frequency), 0)
+        if self.metrics is not None:
+            self.metrics.inc("nodes_allocated")
+        updated.node_frequency = terminal.node_frequency
+        self.set_child(path[-1], 0, updated)
+        for node in reversed(path):
+            self.recompute(node)
+        return True
+
+    def delete(self, word: str) -> bool:
+        """
+        Function description:
+        Removes a stored word without rebuilding the Trie.
+
+        Approach description (if main function):
+        The node that stores the word is removed and node_frequency is decreased along the path by the number of
+        times the word was inserted. Nodes whose node_frequency drops to 0 no longer lead to any word and are
+        unlinked from their parent. Every remaining node on the path then recomputes its best word and suggestion
+        list, from the deepest to the root.
+
+        :Input:
+        word: The word to remove.
+        :Output, return or postcondition: Returns True if the word was removed, False if it is not in the Trie.
+        :Time complexity: O(M*S). M is the length of the word and S is the cost of recompute at one node.
+        :Aux space complexity: O(M) for the path.
+        """
+        if not self.delete_aux(self.root, word):
+            return False
+        self.notify(word)
+        return True
+
+    def delete_aux(self, current: Node, word: str) -> bool:
+        """
+        Function description:
+        Auxiliary function for delete, starting at the given root node.
+
+        :Input:
+        current: The root node of the Trie to remove the word from.
+        word: The word to remove.
+        :Output, return or postcondition: Returns True if the word was removed, False if it is not in the Trie.
+        :Time complexity: O(M*S). M is the length of the word and S is the cost of recompute at one node.
+        :Aux space complexity: O(M) for the path.
+        """
+        path = self.find_path(current, word)
+        if path is None:
+            return False
+        count = self.child(path[-1], 0).node_frequency
+        self.remove_child(path[-1], 0)
+        for node in path:
+            node.node_frequency -= count
+        for depth in range(len(word), -1, -1):
+            node = path[depth]
+            if depth > 0 and node.node_frequency == 0:
+                # Unlink the node from its parent since no word goes through it anymore
+                self.remove_child(path[depth - 1], self.alphabet.find(word[depth - 1]))
+            else:
+                self.recompute(node)
+        return True
+
+    def update_top(self, current: Node, data: Tuple[str, str, int]) -> None:
+        """
+        Function description:
+        Adds a newly inserted word to the bounded suggestion list of a node. The list is sorted by frequency from high
+        to low and then alphabetically, and never grows beyond top_k entries.
+
+        :Input:
+        current: The current node in the Trie.
+        data: A list containing word information: word, definition, frequency.
+        :Output, return or postcondition: Updates current.top. A word that is inserted again replaces its old entry.
+        :Time complexity: O(K). K is top_k. The list is scanned for the word and the new entry is placed by bisect.
+        :Aux space complexity: O(1)
+        """
+        entry = (-data[2], data[0], data[1])
+        top = current.top
+        if top is None:
+            current.top = [entry]
+            return
+        # Remove the old entry of a word that is inserted again
+        for index in range(len(top)):
+            if top[index][1] == data[0]:
+                del top[index]
+                break
+        if len(top) < self.top_k or entry < top[-1]:
+            insort(top, entry)
+            if len(top) > self.top_k:
+                top.pop()
+
+    def prefix_search_topk(self, prefix: str, k: Optional[int] = None) -> List[List[Union[str, int]]]:
+        """
+        Function description:
+        Returns up to k words with the highest frequency that have the given prefix, best first.
+
+        Approach description (if main function):
+        Every node keeps its own bounded suggestion list while words are inserted, so the search only walks down the
+        prefix and copies the first k entries of the list at the last node. The size of the subtree below the prefix
+        does not matter.
+
+        :Input:
+        prefix: The prefix to search for.
+        k: The number of suggestions wanted. Defaults to top_k and cannot be larger than top_k.
+        :Output, return or postcondition: Returns a list of [word, definition, frequency] lists sorted by frequency
+        from high to low and then alphabetically. Returns an empty list if no word has the prefix. Raises ValueError if
+        k is larger than the top_k the Trie was built with.
+        :Time complexity: O(M + K). M is the length of the prefix and K is the number of suggestions.
+        :Aux space complexity: O(K) for the result.
+        """
+        if k is None:
+            k = self.top_k
+        if k > self.top_k:
+            raise ValueError(f"k={k} is larger than the top_k={self.top_k} the Trie was built with")
+        current = self.root
+        for char in prefix:
+            current = self.child(current, self.alphabet.find(char))
+            if current is None:
+                return []
+        if current.top is None:
+            return []
+        return [[word, definition, -frequency] for frequency, word, definition in current.top[:k]]
+
+    def prefix_search_many(self, prefixes: List[str]) -> List[List[Union[str, int]]]:
+        """
+        Function description:
+        Runs prefix_search for many prefixes at once and returns the results in the order of the input.
+
+        Approach description (if main function):
+        The prefixes are visited in sorted order, so prefixes that share a stem are next to each other. The nodes on
+        the path of the previous prefix are kept in a list indexed by depth. For the next prefix the search resumes
+        from the node at the end of the longest common prefix with the previous one, and only the remaining
+        characters are walked. Each shared stem is therefore walked once per run of prefixes that share it.
+
+        :Input:
+        prefixes: The prefixes to search for.
+        :Output, return or postcondition: Returns a list with one [word, definition, node_frequency] list per prefix,
+        equal to what prefix_search returns for it.
+        :Time complexity: O(P*log(P)*M + S). P is the number of prefixes and M is their length, for sorting. S is the
+        number of characters that are not shared with the previous prefix in sorted order.
+        :Aux space complexity: O(P + M) for the order, the results and the path.
+        """
+        results = [None] * len(prefixes)
+        order = sorted(range(len(prefixes)), key=prefixes.__getitem__)
+        previous = ""
+        # path[i] is the node reached after the first i characters of the previous prefix
+        path = [self.root]
+        result = [None, None, 0]
+        for position in order:
+            prefix = prefixes[position]
+            if prefix == previous and position != order[0]:
+                # Repeated prefixes share the result of the first one
+                results[position] = list(result)
+                continue
+            # Length of the common prefix with the previous prefix, limited to the nodes that exist on the path
+            limit = min(len(prefix), len(previous), len(path) - 1)
+            if prefix.startswith(previous[:limit]):
+                common = limit
+            else:
+                common = 0
+                while prefix[common] == previous[common]:
+                    common += 1
+            del path[common + 1:]
+            current = path[common]
+            for counter in range(common, len(prefix)):
+                current = self.child(current, self.alphabet.find(prefix[counter]))
+                if current is None:
+                    break
+                path.append(current)
+            if current is None:
+                result = [None, None, 0]
+            else:
+                result = [current.word, current.definition, current.node_frequency]
+            results[position] = result
+            previous = prefix
+        return results
+
+    def prefix_search(self, prefix: str) -> List[Union[str, int]]:
+        """
+        Function description:
+        Returns the word with the highest frequency that has the given prefix, its definition, and the number of words
+        that have the given prefix.
+
+        Approach description (if main function):
+        This method searches a word and its associated data by its prefix in the Trie data structure.
+        Starting at root node, it calls prefix_search_aux to perform the search.
+
+        When a PrefixCache is set, the result is taken from the cache if it is there, and stored in it otherwise.
 
         :Input:
         prefix: The prefix to search for.
         :Output, return or postcondition: Returns a list containing word, definition, and node_frequency for the
         matching prefix.
-        :Time complexity: O(M). M is the time complexity of prefix_search_aux method.
+        :Time complexity: O(M). M is the time complexity of prefix_search_aux method, or O(1) on a cache hit.
         :Aux space complexity: O(1)
         """
-        current = self.root
-        return self.prefix_search_aux(current, prefix, 0)
+        cache = self.cache
+        if cache is None:
+            current = self.root
+            result = self.prefix_search_aux(current, prefix, 0)
+            if self.metrics is not None:
+                self.metrics.observe("prefix_search_nodes_visited", self.depth(current, prefix, result))
+            return result
+        result = cache.get(prefix)
+        if result is None:
+            # Read the generation before the root, so a result computed from an old root is never stored
+            generation = cache.generation
+            current = self.root
+            result = self.prefix_search_aux(current, prefix, 0)
+            cache.put(prefix, result, generation)
+            if self.metrics is not None:
+                self.metrics.observe("prefix_search_nodes_visited", self.depth(current, prefix, result))
+        elif self.metrics is not None:
+            self.metrics.observe("prefix_search_nodes_visited", 0)
+        return list(result)
+
+    def depth(self, current: Node, prefix: str, result: List[Union[str, int]]) -> int:
+        """
+        Function description:
+        Returns the number of nodes a prefix search from a node visited, counting the node itself. Used for the
+        metrics, after the search, so searching costs nothing extra without metrics.
+
+        :Input:
+        current: The node the search started from.
+        prefix: The prefix searched for.
+        result: The result of the search.
+        :Output, return or postcondition: len(prefix) + 1 if the prefix was found, else the number of nodes on the
+        part of the prefix that is in the Trie.
+        :Time complexity: O(1) if the prefix was found, else O(M). M is the length of the prefix.
+        :Aux space complexity: O(1)
+        """
+        if result[2]:
+            return len(prefix) + 1
+        visited = 1
+        for char in prefix:
+            current = self.child(current, self.alphabet.find(char))
+            if current is None:
+                break
+            visited += 1
+        return visited
 
     def prefix_search_aux(self, current: Node, prefix: str, counter: int) -> List[Union[str, int]]:
         """
@@ -201,11 +1462,12 @@ class Trie:
         Auxiliary function for prefix_search.
 
         Approach description (if main function):
-        This method performs a prefix search recursively within the Trie. For each character in the prefix, it goes
-        to the child node at the calculated index if it exists. If it doesn't exist, it returns [None, None, 0] meaning
-        no matching word was found. The method continues the process, moving deeper into the Trie, until it reaches the
-        end of the prefix. At the end of the prefix, it returns the information of the node: word, definition, and node
-        frequency, which represents the words in the Trie that shares the prefix and has the highest frequency.
+        This method performs a prefix search iteratively within the Trie. For each character in the prefix, starting
+        at index counter, it goes to the child node in the character's slot if it exists. If it doesn't exist, it
+        returns [None, None, 0] meaning no matching word was found. The method continues the process, moving deeper
+        into the Trie, until it reaches the end of the prefix. At the end of the prefix, it returns the information of
+        the node: word, definition, and node frequency, which represents the words in the Trie that shares the prefix
+        and has the highest frequency.
 
         :Input:
         current: The current node in the Trie.
@@ -213,61 +1475,848 @@ class Trie:
         counter: The index of the prefix being processed.
         :Output, return or postcondition: Returns a list containing word, definition, and node_frequency for the
         matching prefix.
-        :Time complexity: O(M). M is the length of the prefix entered by the user and the function is called M
-        times recursively to search each character of the prefix.
+        :Time complexity: O(M). M is the length of the prefix entered by the user and the loop runs M times to
+        search each character of the prefix.
         :Aux space complexity: O(1)
         """
+        index = self.alphabet.index
+        try:
+            for counter in range(counter, len(prefix)):
+                # Move to the next character's node if it exists, indexing dense nodes directly
+                if current.keys is None:
+                    current = current.link[index[prefix[counter]]]
+                else:
+                    current = self.child(current, index[prefix[counter]])
+                # Return [None, None, 0] if there is no matching node for the next character
+                if current is None:
+                    return [None, None, 0]
+        except (KeyError, IndexError):
+            # A character outside the alphabet, or a slot the dense node was created without, has no child either
+            return [None, None, 0]
         # Return the information of the current node if the end of prefix is reached
-        if counter == len(prefix):
-            return [current.word, current.definition, current.node_frequency]
-        else:
-            char = prefix[counter]
-            index = ord(char) - ord("a") + 1
-            # Move to the next character's node if it exists
-            if current.link[index] is not None:
-                current = current.link[index]
-                return self.prefix_search_aux(current, prefix, counter + 1)  # Continue the recursive search
-            # Return [None, None, 0] if there is no matching node for the next character
+        return [current.word, current.definition, current.node_frequency]
+
+    def fuzzy_prefix_search(self, prefix: str, max_edits: int = 1) -> List[Union[str, int]]:
+        """
+        Function description:
+        Like prefix_search, but a word matches if it starts with some string within max_edits insertions, deletions
+        or substitutions of the prefix. Returns the matching word with the highest frequency, its definition, and the
+        number of matching words.
+
+        Approach description (if main function):
+        The Trie is walked depth first while keeping one row of the Levenshtein table per node: row[j] is the edit
+        distance between the first j characters of the prefix and the string of the node. The row of a child follows
+        from the row of its parent and the character of the child in O(M). When the smallest value of a row is above
+        max_edits no longer string can match, so the branch is pruned. When row[M] is at most max_edits, every word
+        below the node matches: the node's word is the best of them and node_frequency counts them, so the node is
+        taken as a whole and not descended into. Such nodes are never ancestors of each other, so their counts add up
+        without counting a word twice. The best of their words is chosen like compare does, by frequency first and
+        then alphabetically. With max_edits 0 only the node of the prefix itself matches, which gives the result of
+        prefix_search.
+
+        :Input:
+        prefix: The prefix to search for.
+        max_edits: The number of edits allowed. Must not be negative.
+        :Output, return or postcondition: Returns a list containing word, definition, and the number of matching
+        words, [None, None, 0] if no word matches. Raises ValueError if max_edits is negative.
+        :Time complexity: O(N*(M + K)). N is the number of nodes visited, the nodes whose string is within max_edits of
+        a prefix of the prefix, which grows with max_edits but not with the size of the Trie beyond that. M is the
+        length of the prefix, the cost of allocating a row, and K is max_edits, as only a band of 2K + 1 values of
+        each row is computed.
+        :Aux space complexity: O(D*A*M) for the rows on the stack. D is the depth of the Trie and A the size of the
+        alphabet.
+        """
+        if max_edits < 0:
+            raise ValueError(f"max_edits must not be negative, got {max_edits}")
+        characters = self.alphabet.characters
+        length = len(prefix)
+        # Values above max_edits are all stored as limit, which changes no decision
+        limit = max_edits + 1
+        best = [None, None, 0]
+        frequency = None
+        visited = 0
+        # Nodes to visit with their depth and their rows of the Levenshtein table
+        stack = [(self.root, 0, [min(j, limit) for j in range(length + 1)])]
+        while stack:
+            current, depth, row = stack.pop()
+            visited += 1
+            if row[-1] <= max_edits:
+                # Every word below matches, the node's word is the best of them
+                if current.word is not None and current.node_frequency:
+                    best[2] += current.node_frequency
+                    if frequency is None or current.frequency > frequency or (
+                            current.frequency == frequency and current.word < best[0]):
+                        best[0], best[1], frequency = current.word, current.definition, current.frequency
+                continue
+            depth += 1
+            # Row values more than max_edits away from the diagonal are above max_edits, so only the band between
+            # low and high is computed
+            low, high = max(1, depth - max_edits), min(length, depth + max_edits)
+            # Reversed, so children are popped in slot order
+            for slot, child in reversed(self.children(current)):
+                char = characters[slot]
+                below = [limit] * (length + 1)
+                if depth < limit:
+                    below[0] = depth
+                for j in range(low, high + 1):
+                    value = row[j - 1] if prefix[j - 1] == char else row[j - 1] + 1
+                    if row[j] + 1 < value:
+                        value = row[j] + 1
+                    if below[j - 1] + 1 < value:
+                        value = below[j - 1] + 1
+                    below[j] = value if value < limit else limit
+                # No string through the child can match once every value of its row is above max_edits
+                if min(below) < limit:
+                    stack.append((child, depth, below))
+        if self.metrics is not None:
+            self.metrics.observe("fuzzy_search_nodes_visited", visited)
+        return best
+
+class VersionedTrie(Trie):
+    def __init__(self, Dictionary: Iterable, top_k: int = 0, alphabet: Optional[Alphabet] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        Function description:
+        Initializes a copy-on-write Trie. Any number of threads may call prefix_search, prefix_search_topk and
+        prefix_search_many without locks while other threads call insert, update_frequency and delete.
+
+        Approach description (if main function):
+        A writer never changes a node that a reader can reach. It copies the root and the nodes on the path of the
+        word, applies the usual Trie update to the copies, and then publishes the new root with a single attribute
+        assignment. Nodes off the path are shared between the old and the new version. A reader reads self.root once
+        at the start of a search, so it sees either the old or the new version and never a half updated node.
+        Writers are serialised by a lock.
+
+        :Input:
+        Dictionary: A list of lists, or any iterable such as iter_dictionary. Each inner index 0 is the word, index 1
+        is the definition, and index 2 is the frequency of that word.
+        top_k: How many suggestions every node keeps for prefix_search_topk. 0 keeps none.
+        alphabet: The Alphabet of the keys. Defaults to the lowercase letters a to z.
+        :Output, return or postcondition: Initializes a VersionedTrie at version 0 populated with the Dictionary.
+        :Time complexity: O(T*K). Same as Trie, since no reader can see the Trie before it is built.
+        :Aux space complexity: O(T*K). Same as Trie.
+        """
+        self.lock = threading.Lock()
+        self.version = 0
+        Trie.__init__(self, [], top_k, alphabet, metrics)
+        # Nobody can read the Trie before the constructor returns, so the words are inserted in place
+        for words in Dictionary:
+            Trie.insert(self, words[0], words)
+
+    def copy_node(self, current: Node) -> Node:
+        """
+        Function description:
+        Returns a shallow copy of a node. The children are shared, the child arrays and suggestion list are not.
+
+        :Input:
+        current: The node to copy.
+        :Output, return or postcondition: Returns the copy.
+        :Time complexity: O(A + K). A is the size of the child array and K is top_k.
+        :Aux space complexity: O(A + K)
+        """
+        copy = Node((current.word, current.definition, current.frequency), 0)
+        if self.metrics is not None:
+            self.metrics.inc("nodes_allocated")
+        copy.node_frequency = current.node_frequency
+        copy.keys = None if current.keys is None else list(current.keys)
+        copy.link = list(current.link)
+        copy.top = None if current.top is None else list(current.top)
+        return copy
+
+    def copy_path(self, word: str) -> Node:
+        """
+        Function description:
+        Copies the published root and every existing node on the path of a word, linking each copy into the copy of
+        its parent.
+
+        :Input:
+        word: The word whose path is copied.
+        :Output, return or postcondition: Returns the copied root. The published version is not changed.
+        :Time complexity: O(M*A). M is the length of the word and A is the cost of copy_node.
+        :Aux space complexity: O(M*A) for the copies.
+        """
+        root = self.copy_node(self.root)
+        current = root
+        for char in word:
+            slot = self.alphabet.find(char)
+            child = self.child(current, slot)
+            if child is None:
+                break
+            child = self.copy_node(child)
+            self.set_child(current, slot, child)
+            current = child
+        return root
+
+    def publish(self, root: Node) -> None:
+        """
+        Function description:
+        Makes a new version visible to readers.
+
+        :Input:
+        root: The root of the new version.
+        :Output, return or postcondition: self.root is root and the version number is increased.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.root = root
+        self.version += 1
+
+    def snapshot(self) -> Trie:
+        """
+        Function description:
+        Returns the current version as a Trie, so a reader can run several searches against the same version. The
+        returned Trie shares its nodes with this one and must not be changed.
+
+        :Output, return or postcondition: A Trie whose root is the currently published root.
+        :Time complexity: O(A). A is the size of the alphabet.
+        :Aux space complexity: O(A)
+        """
+        view = Trie([], self.top_k, self.alphabet)
+        view.root = self.root
+        return view
+
+    def insert(self, key: str, data: Tuple[str, str, int]) -> None:
+        """
+        Function description:
+        Inserts a word and its data into a new version of the Trie and publishes it. Same result as Trie.insert.
+
+        :Input:
+        key: The word to insert.
+        data: A list containing word information: word, definition, frequency.
+        :Output, return or postcondition: A new version holding the word is published.
+        :Time complexity: O(M*(A + min(X, Y))). M is the length of the key, A is the cost of copying a node and
+        min(X, Y) is the cost of compare.
+        :Aux space complexity: O(M*A) for the copied path.
+        """
+        with self.lock:
+            current = self.copy_path(key)
+            data = self.insert_aux(current, key, 0, data)
+            current.node_frequency += 1
+            self.compare(current, data)
+            if self.top_k:
+                self.update_top(current, data)
+            self.publish(current)
+        self.notify(key)
+
+    def update_frequency(self, word: str, new_frequency: int) -> bool:
+        """
+        Function description:
+        Changes the frequency of a stored word in a new version of the Trie and publishes it. Same result as
+        Trie.update_frequency.
+
+        :Input:
+        word: The word to update.
+        new_frequency: The new frequency of the word.
+        :Output, return or postcondition: Returns True if the word was updated, False if it is not in the Trie, in
+        which case no new version is published.
+        :Time complexity: O(M*(A + S)). M is the length of the word, A is the cost of copying a node and S is the cost
+        of recompute at one node.
+        :Aux space complexity: O(M*A) for the copied path.
+        """
+        with self.lock:
+            current = self.copy_path(word)
+            if not self.update_frequency_aux(current, word, new_frequency):
+                return False
+            self.publish(current)
+        self.notify(word)
+        return True
+
+    def delete(self, word: str) -> bool:
+        """
+        Function description:
+        Removes a stored word in a new version of the Trie and publishes it. Same result as Trie.delete.
+
+        :Input:
+        word: The word to remove.
+        :Output, return or postcondition: Returns True if the word was removed, False if it is not in the Trie, in
+        which case no new version is published.
+        :Time complexity: O(M*(A + S)). M is the length of the word, A is the cost of copying a node and S is the cost
+        of recompute at one node.
+        :Aux space complexity: O(M*A) for the copied path.
+        """
+        with self.lock:
+            current = self.copy_path(word)
+            if not self.delete_aux(current, word):
+                return False
+            self.publish(current)
+        self.notify(word)
+        return True
+
+class CompactTrie:
+    def __init__(self, Dictionary: Iterable):
+        """
+        Function description:
+        Initializes a memory compact Trie with data from the given dictionary. It answers prefix_search exactly like
+        Trie, but instead of a Node object with a 27 slot link list per character it keeps every node as one index
+        into a handful of flat arrays.
+
+        Approach description (if main function):
+        Node n is described by first_child[n], next_sibling[n], label[n] (the code point of the character on the
+        edge into n), best[n] (the id of the stored word) and node_frequency[n]. The children of a node form a
+        linked list through next_sibling kept in increasing label order, so a node only pays for the children it
+        actually has. The words, definitions and frequencies are stored once each and referred to by word id. Node 0
+        is the root. The arrays are filled in one pass over the words in sorted order by build.
+
+        :Input:
+        Dictionary: A list of lists, or any iterable such as iter_dictionary. Each inner index 0 is the word, index 1
+        is the definition, and index 2 is the frequency of that word.
+        :Output, return or postcondition: Initializes a CompactTrie populated with data from the Dictionary.
+        :Time complexity:
+        O(T + W*log(W)). T is the amount of characters in Dictionary.txt and W the number of words, which are sorted.
+        :Aux space complexity:
+        O(T). T is the amount of characters in Dictionary.txt, at 20 bytes per node.
+        """
+        self.words = []
+        self.definitions = []
+        self.frequencies = array("q")
+        for words in Dictionary:
+            self.words.append(words[0])
+            self.definitions.append(words[1])
+            self.frequencies.append(words[2])
+        self.build()
+
+    def build(self) -> None:
+        """
+        Function description:
+        Builds the node arrays for the words in the word tables, with the same result as inserting them one by one in
+        word id order.
+
+        Approach description (if main function):
+        The word ids are sorted by word. In sorted order every word shares a prefix with the one before it, so only
+        the nodes after that common prefix are new, and they are created in preorder with each child after its
+        smaller siblings. No sibling list is ever scanned. The subtree of a node is then a range of node ids after it
+        and a range of sorted positions starting at the word that created it. One reverse pass over the node ids
+        adds every node_frequency into the parent and finds the best word of each node from the best of its children
+        and the words that end at it. The words with the top frequency are ordered like compare orders them, the
+        alphabetically smaller first and the earlier id on equal words, unless one of them is a prefix of another.
+        compare never replaces a word by its prefix, so which one is kept then depends on insertion order, and for
+        those nodes the top frequency words of the subtree are run through compare's rule in id order.
+
+        :Output, return or postcondition: Replaces the node arrays with the ones for the word tables.
+        :Time complexity:
+        O(T + W*log(W)). T is the amount of characters in the words and W the number of words. The ordered fallback
+        sorts at most the words of a subtree for each node on their path, which is O(T*log(W)) in the worst case.
+        :Aux space complexity: O(T + W)
+        """
+        words = self.words
+        frequencies = self.frequencies
+        order = sorted(range(len(words)), key=words.__getitem__)
+        first_child = [-1]
+        next_sibling = [-1]
+        label = [0]
+        parent = [-1]
+        last_child = [-1]
+        start = [0]
+        ends = [0] * len(order)
+        path = [0]
+        previous = ""
+        for position in range(len(order)):
+            word = words[order[position]]
+            # Length of the prefix shared with the previous word in sorted order
+            if word.startswith(previous):
+                common = len(previous)
             else:
+                common = 0
+                while word[common] == previous[common]:
+                    common += 1
+            del path[common + 1:]
+            current = path[common]
+            for counter in range(common, len(word)):
+                node = len(label)
+                first_child.append(-1)
+                next_sibling.append(-1)
+                label.append(ord(word[counter]))
+                parent.append(current)
+                last_child.append(-1)
+                start.append(position)
+                # Sorted order creates the children of a node in increasing label order
+                if last_child[current] == -1:
+                    first_child[current] = node
+                else:
+                    next_sibling[last_child[current]] = node
+                last_child[current] = node
+                path.append(node)
+                current = node
+            ends[position] = current
+            previous = word
+
+        # Best of the words ending at each node, equal words keep the earliest id like compare does
+        node_count = len(label)
+        node_frequency = [0] * node_count
+        best = [-1] * node_count
+        for position in range(len(order)):
+            node = ends[position]
+            word_id = order[position]
+            node_frequency[node] += 1
+            if best[node] == -1 or frequencies[word_id] > frequencies[best[node]] or (
+                    frequencies[word_id] == frequencies[best[node]] and word_id < best[node]):
+                best[node] = word_id
+        # Best over the children, merged in as each child is finished, and whether it has a prefix tie
+        child_best = [-1] * node_count
+        prefix_tie = [False] * node_count
+        for node in range(node_count - 1, -1, -1):
+            own, other = best[node], child_best[node]
+            if other != -1:
+                if own == -1 or frequencies[other] > frequencies[own]:
+                    best[node] = other
+                elif frequencies[other] == frequencies[own]:
+                    # A word ending here is a prefix of every word below
+                    prefix_tie[node] = True
+                else:
+                    prefix_tie[node] = False
+            if prefix_tie[node]:
+                best[node] = self.ordered_best(order[start[node]:start[node] + node_frequency[node]],
+                                               frequencies[best[node]])
+            if node > 0:
+                above = parent[node]
+                node_frequency[above] += node_frequency[node]
+                winner, current = best[node], child_best[above]
+                if current == -1 or frequencies[winner] > frequencies[current]:
+                    child_best[above] = winner
+                    prefix_tie[above] = prefix_tie[node]
+                elif frequencies[winner] == frequencies[current]:
+                    prefix_tie[above] = prefix_tie[above] or prefix_tie[node]
+                    if words[winner] < words[current]:
+                        child_best[above] = winner
+
+        self.first_child = array("i", first_child)
+        self.next_sibling = array("i", next_sibling)
+        self.label = array("I", label)
+        self.best = array("i", best)
+        self.node_frequency = array("i", node_frequency)
+
+    def ordered_best(self, word_ids: List[int], frequency: int) -> int:
+        """
+        Function description:
+        Returns the word id compare would keep after the given words are inserted in id order, for a set of words
+        whose highest frequency is the given frequency.
+
+        :Input:
+        word_ids: The ids of the words in a subtree.
+        frequency: The highest frequency among them.
+        :Output, return or postcondition: Returns the kept word id.
+        :Time complexity: O(W*log(W) + W*L). W is the number of word ids and L the length of the longest word.
+        :Aux space complexity: O(W)
+        """
+        words = self.words
+        kept = -1
+        for word_id in sorted(word_id for word_id in word_ids if self.frequencies[word_id] == frequency):
+            word = words[word_id]
+            # compare keeps the new word only if it is smaller and not a prefix of the kept one
+            if kept == -1 or (word < words[kept] and not words[kept].startswith(word)):
+                kept = word_id
+        return kept
+
+    @classmethod
+    def from_trie(cls, trie: Trie) -> "CompactTrie":
+        """
+        Function description:
+        Converts a built Trie into a CompactTrie with the same prefix_search results, without reinserting any word.
+
+        Approach description (if main function):
+        The Trie is walked with an explicit stack. Every Node becomes one node id, its children are linked in code point
+        order, and the (word, definition, frequency) stored at each node is given a word id the first time it is
+        seen, so a word that is best for many nodes is stored once.
+
+        :Input:
+        trie: The Trie to convert.
+        :Output, return or postcondition: Returns the equivalent CompactTrie.
+        :Time complexity: O(N). N is the number of nodes in the Trie.
+        :Aux space complexity: O(N) for the new arrays and the stack.
+        """
+        compact = cls([])
+        word_ids = {}
+        stack = [(trie.root, 0)]
+        while stack:
+            node, node_id = stack.pop()
+            compact.node_frequency[node_id] = node.node_frequency
+            if node.word is not None:
+                record = (node.word, node.definition, node.frequency)
+                if record not in word_ids:
+                    word_ids[record] = len(compact.words)
+                    compact.words.append(node.word)
+                    compact.definitions.append(node.definition)
+                    compact.frequencies.append(node.frequency)
+                compact.best[node_id] = word_ids[record]
+            previous = -1
+            children = [(ord(trie.alphabet.characters[slot]), child) for slot, child in trie.children(node)]
+            for code, child in sorted(children, key=lambda pair: pair[0]):
+                child_id = len(compact.label)
+                compact.first_child.append(-1)
+                compact.next_sibling.append(-1)
+                compact.label.append(code)
+                compact.best.append(-1)
+                compact.node_frequency.append(0)
+                if previous == -1:
+                    compact.first_child[node_id] = child_id
+                else:
+                    compact.next_sibling[previous] = child_id
+                previous = child_id
+                stack.append((child, child_id))
+        return compact
+
+    def state(self) -> tuple:
+        """
+        Function description:
+        Returns the arrays and tables of the CompactTrie as a tuple of bytes and lists, which marshal can write.
+        Used for the compiled cache of load_trie.
+
+        :Output, return or postcondition: The state, which from_state turns back into an equal CompactTrie.
+        :Time complexity: O(N + W). N is the number of nodes and W the number of words.
+        :Aux space complexity: O(N + W)
+        """
+        return (self.first_child.tobytes(), self.next_sibling.tobytes(), self.label.tobytes(), self.best.tobytes(),
+                self.node_frequency.tobytes(), self.words, self.definitions, self.frequencies.tobytes())
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "CompactTrie":
+        """
+        Function description:
+        Rebuilds a CompactTrie from what state returned, without inserting any word.
+
+        :Input:
+        state: The state of a CompactTrie, written by the same interpreter.
+        :Output, return or postcondition: Returns the CompactTrie.
+        :Time complexity: O(N + W). N is the number of nodes and W the number of words, copied as whole buffers.
+        :Aux space complexity: O(N + W)
+        """
+        compact = cls([])
+        first_child, next_sibling, label, best, node_frequency, words, definitions, frequencies = state
+        compact.first_child = array("i", first_child)
+        compact.next_sibling = array("i", next_sibling)
+        compact.label = array("I", label)
+        compact.best = array("i", best)
+        compact.node_frequency = array("i", node_frequency)
+        compact.words = words
+        compact.definitions = definitions
+        compact.frequencies = array("q", frequencies)
+        return compact
+
+    def __len__(self) -> int:
+        """
+        Function description:
+        Returns the number of nodes in the CompactTrie, including the root.
+
+        :Output, return or postcondition: The number of nodes. An integer.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        return len(self.label)
+
+    def insert(self, key: str, data: Tuple[str, str, int]) -> None:
+        """
+        Function description:
+        Inserts a word and its data into the CompactTrie.
+
+        Approach description (if main function):
+        The data is stored once in the word tables and gets a word id. Starting at the root, each character of the
+        key is looked up in the sorted sibling list of the current node and a new node is linked in at its sorted
+        position if it does not exist. Like Trie.insert_aux, node_frequency is increased along the path and compare
+        decides which word id is kept at every node.
+
+        :Input:
+        key: The word to insert.
+        data: A list containing word information: word, definition, frequency.
+        :Output, return or postcondition: Inserts the word and data into the CompactTrie.
+        :Time complexity: O(M*min(X, Y)). M is the length of the key and min(X, Y) is the cost of compare.
+        :Aux space complexity: O(M). At most one node is created for every character in the key.
+        """
+        word_id = len(self.words)
+        self.words.append(data[0])
+        self.definitions.append(data[1])
+        self.frequencies.append(data[2])
+
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        label = self.label
+        best = self.best
+        node_frequency = self.node_frequency
+        frequencies = self.frequencies
+        frequency = data[2]
+        current = 0
+        node_frequency[current] += 1
+        self.compare(current, word_id)
+        for counter in range(len(key)):
+            code = ord(key[counter])
+            # Walk the sorted sibling list until the label is reached or passed
+            previous = -1
+            child = first_child[current]
+            while child != -1 and label[child] < code:
+                previous = child
+                child = next_sibling[child]
+            if child == -1 or label[child] != code:
+                # Create a new node and link it in before the larger sibling
+                new_node = len(label)
+                first_child.append(-1)
+                next_sibling.append(child)
+                label.append(code)
+                best.append(-1)
+                node_frequency.append(0)
+                if previous == -1:
+                    first_child[current] = new_node
+                else:
+                    next_sibling[previous] = new_node
+                child = new_node
+            current = child
+            # Increment the node_frequency to reflect the number of words sharing the key
+            node_frequency[current] += 1
+            # Decide the common cases inline and only call compare to break a tie
+            best_id = best[current]
+            if best_id == -1 or frequency > frequencies[best_id]:
+                best[current] = word_id
+            elif frequency == frequencies[best_id]:
+                self.compare(current, word_id, counter)
+
+    def compare(self, current: int, word_id: int, counter: int = 0) -> None:
+        """
+        Function description:
+        Same rule as Trie.compare on node ids: the word with the higher frequency is kept at the node, and on equal
+        frequency the alphabetically smaller word is kept, comparing from index counter onwards.
+
+        :Input:
+        current: The id of the current node.
+        word_id: The id of the newly inserted word.
+        counter: The index from which the words can differ.
+        :Output, return or postcondition: Updates best[current] with word_id if the new word wins.
+        :Time complexity: O(min(X, Y)). X and Y are the lengths of the two words.
+        :Aux space complexity: O(1)
+        """
+        best = self.best[current]
+        if best == -1:
+            self.best[current] = word_id
+            return
+        frequency, best_frequency = self.frequencies[word_id], self.frequencies[best]
+        if frequency > best_frequency:
+            self.best[current] = word_id
+        elif frequency == best_frequency:
+            word, best_word = self.words[word_id], self.words[best]
+            while counter < len(word) and counter < len(best_word) and word[counter] == best_word[counter]:
+                counter += 1
+            if counter < len(word) and counter < len(best_word) and word[counter] < best_word[counter]:
+                self.best[current] = word_id
+
+    def child(self, current: int, char: str) -> int:
+        """
+        Function description:
+        Returns the id of the child of a node reached through the given character.
+
+        :Input:
+        current: The id of the current node.
+        char: The character on the edge.
+        :Output, return or postcondition: Returns the child id, or -1 if there is no such child.
+        :Time complexity: O(S). S is the number of children of the node, at most the size of the alphabet.
+        :Aux space complexity: O(1)
+        """
+        code = ord(char)
+        child = self.first_child[current]
+        while child != -1 and self.label[child] < code:
+            child = self.next_sibling[child]
+        if child != -1 and self.label[child] == code:
+            return child
+        return -1
+
+    def prefix_search(self, prefix: str) -> List[Union[str, int]]:
+        """
+        Function description:
+        Returns the word with the highest frequency that has the given prefix, its definition, and the number of words
+        that have the given prefix. The result is identical to Trie.prefix_search.
+
+        :Input:
+        prefix: The prefix to search for.
+        :Output, return or postcondition: Returns a list containing word, definition, and node_frequency for the
+        matching prefix, or [None, None, 0] if no word has the prefix.
+        :Time complexity: O(M). M is the length of the prefix, each step scans at most 26 siblings.
+        :Aux space complexity: O(1)
+        """
+        current = 0
+        for char in prefix:
+            current = self.child(current, char)
+            if current == -1:
                 return [None, None, 0]
+        best = self.best[current]
+        if best == -1:
+            return [None, None, 0]
+        return [self.words[best], self.definitions[best], self.node_frequency[current]]
 
+class TrieSnapshot:
+    def __init__(self, filename: str):
+        """
+        Function description:
+        Opens a snapshot written by save_snapshot. The file is memory mapped read only and queried in place, so any
+        number of processes that open the same snapshot share one physical copy of it through the page cache.
 
-class Vertex:
-    def __init__(self, name: str) -> None:
+        Approach description (if main function):
+        The header is checked and every section of the file is exposed as a memoryview cast to the element type of
+        the matching CompactTrie array. Nothing is copied or parsed at open time; words and definitions are decoded
+        from the string blob only when a query returns them.
+
+        :Input:
+        filename: Path of the snapshot file.
+        :Output, return or postcondition: Creates a TrieSnapshot that answers prefix_search like the saved Trie.
+        Raises ValueError if the file is not a snapshot or was written on a machine with a different byte order.
+        :Time complexity: O(1). Only the header is read, the rest is paged in by the operating system on demand.
+        :Aux space complexity: O(1)
+        """
+        with open(filename, "rb") as infile:
+            self.map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < SNAPSHOT_HEADER.size:
+            self.map.close()
+            raise ValueError(f"{filename} is not a compatible trie snapshot")
+        magic, version, byteorder, node_count, word_count, blob_size = SNAPSHOT_HEADER.unpack_from(self.map, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or byteorder != SNAPSHOT_BYTEORDER:
+            self.map.close()
+            raise ValueError(f"{filename} is not a compatible trie snapshot")
+        self.node_count = node_count
+        self.word_count = word_count
+        view = memoryview(self.map)
+        offset = SNAPSHOT_HEADER.size
+        sections = []
+        for typecode, length in (("i", node_count), ("i", node_count), ("I", node_count), ("i", node_count),
+                                 ("i", node_count), ("q", word_count), ("Q", word_count + 1),
+                                 ("Q", word_count + 1), ("B", blob_size)):
+            size = array(typecode).itemsize * length
+            sections.append(view[offset:offset + size].cast(typecode))
+            # Every section starts on an 8 byte boundary
+            offset += size + (-size % 8)
+        (self.first_child, self.next_sibling, self.label, self.best, self.node_frequency, self.frequencies,
+         self.word_offsets, self.definition_offsets, self.blob) = sections
+        self.views = sections + [view]
+
+    def __len__(self) -> int:
         """
         Function description:
-        Initializes a Vertex object to be used in FlowNetwork class.
+        Returns the number of nodes in the snapshot, including the root.
+
+        :Output, return or postcondition: The number of nodes. An integer.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        return self.node_count
+
+    def __enter__(self) -> "TrieSnapshot":
+        """
+        Function description:
+        Lets a TrieSnapshot be used in a with statement.
+
+        :Output, return or postcondition: Returns the snapshot itself.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Function description:
+        Closes the snapshot at the end of a with statement.
+
+        :Output, return or postcondition: The mapping is closed.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Function description:
+        Releases the memoryviews and unmaps the file. The snapshot cannot be queried afterwards.
+
+        :Output, return or postcondition: The mapping is closed.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        for view in self.views:
+            view.release()
+        self.views = []
+        self.map.close()
+
+    def child(self, current: int, char: str) -> int:
+        """
+        Function description:
+        Returns the id of the child of a node reached through the given character. Same as CompactTrie.child.
 
         :Input:
-        name: Name of the vertex. A string.
-        :Output, return or postcondition: Creates a vertex object with the attributes being name, edges, and visited.
-        :Time complexity: O(1). Just initializing an object.
-        :Aux space complexity: O(1). Just initializing a name and an empty list of edges.
+        current: The id of the current node.
+        char: The character on the edge.
+        :Output, return or postcondition: Returns the child id, or -1 if there is no such child.
+        :Time complexity: O(S). S is the number of children of the node, at most the size of the alphabet.
+        :Aux space complexity: O(1)
         """
-        self.name = name
-        self.edges = [] #stores a list of all outgoing edges
-        self.visited = False
+        code = ord(char)
+        child = self.first_child[current]
+        while child != -1 and self.label[child] < code:
+            child = self.next_sibling[child]
+        if child != -1 and self.label[child] == code:
+            return child
+        return -1
 
-class Edge:
-    def __init__(self, origin: str, destination: str, capacity: int) -> None:
+    def prefix_search(self, prefix: str) -> List[Union[str, int]]:
         """
         Function description:
-        Initializes an Edge object to be used in FlowNetwork class.
+        Returns the word with the highest frequency that has the given prefix, its definition, and the number of words
+        that have the given prefix. The result is identical to Trie.prefix_search on the saved Trie.
 
         :Input:
-        origin: The name of origin vertex. A string.
-        destination: The name of destination vertex. A string.
-        capacity: The capacity. An integer.
-        :Output, return or postcondition: Creates a vertex object with the attributes being origin, destination,
-        capacity, flow, and reverseEdge.
-        :Time complexity: O(1). Just initializing an object.
-        :Aux space complexity: O(1). Just initializing attributes.
+        prefix: The prefix to search for.
+        :Output, return or postcondition: Returns a list containing word, definition, and node_frequency for the
+        matching prefix, or [None, None, 0] if no word has the prefix.
+        :Time complexity: O(M + W + D). M is the length of the prefix, W and D are the lengths of the word and
+        definition that are decoded from the mapped file.
+        :Aux space complexity: O(W + D) for the decoded strings.
         """
-        self.origin = origin
-        self.destination= destination
-        self.capacity = capacity
-        self.flow = 0
-        self.reverseEdge = None
+        current = 0
+        for char in prefix:
+            current = self.child(current, char)
+            if current == -1:
+                return [None, None, 0]
+        best = self.best[current]
+        if best == -1:
+            return [None, None, 0]
+        word = str(self.blob[self.word_offsets[best]:self.word_offsets[best + 1]], "utf-8")
+        definition = str(self.blob[self.definition_offsets[best]:self.definition_offsets[best + 1]], "utf-8")
+        return [word, definition, self.node_frequency[current]]
+
+def save_snapshot(trie: Union[Trie, CompactTrie], filename: str) -> None:
+    """
+    Function description:
+    Serializes a built Trie or CompactTrie into a flat file that TrieSnapshot can memory map and query in place.
+
+    Approach description (if main function):
+    A Trie is first converted with CompactTrie.from_trie. The header is followed by the raw bytes of the
+    CompactTrie node arrays, the word frequencies, the offsets of every word and definition, and finally one blob
+    holding all words and definitions encoded as UTF-8. Each section is padded to 8 bytes. The file is written under
+    a temporary name and moved into place, so workers that still map an older snapshot keep reading it unharmed.
+
+    :Input:
+    trie: The Trie or CompactTrie to save.
+    filename: Path of the snapshot file.
+    :Output, return or postcondition: Writes the snapshot file.
+    :Time complexity: O(T). T is the amount of characters stored in the Trie.
+    :Aux space complexity: O(T) for the string blob.
+    """
+    if not isinstance(trie, CompactTrie):
+        trie = CompactTrie.from_trie(trie)
+    blob = bytearray()
+    word_offsets = array("Q", [0])
+    definition_offsets = array("Q", [0])
+    for word in trie.words:
+        blob += word.encode("utf-8")
+        word_offsets.append(len(blob))
+    definition_offsets[0] = len(blob)
+    for definition in trie.definitions:
+        blob += definition.encode("utf-8")
+        definition_offsets.append(len(blob))
+
+    temp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(temp_filename, "wb") as outfile:
+        outfile.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SNAPSHOT_BYTEORDER, len(trie),
+                                           len(trie.words), len(blob)))
+        for section in (trie.first_child, trie.next_sibling, trie.label, trie.best, trie.node_frequency,
+                        trie.frequencies, word_offsets, definition_offsets, blob):
+            data = bytes(section)
+            outfile.write(data)
+            outfile.write(bytes(-len(data) % 8))
+    os.replace(temp_filename, filename)
+
 
 class FlowNetwork:
     def __init__(self):
@@ -275,118 +2324,275 @@ class FlowNetwork:
         Function description:
         Initializes a Flow Network object to be used in FlowNetwork class.
 
+        Approach description (if main function):
+        Vertices are numbered 0, 1, 2, ... in the order they are added, and names maps each vertex name to its
+        number. Edges are stored as a forward star in flat integer arrays: edge e goes to vertex to[e] with
+        capacity[e] and flow[e], head[v] is the last edge added out of vertex v and next[e] is the edge added out of
+        the same vertex before e, or -1. Edges are added in pairs, so the reverse edge of e is e ^ 1 and its origin
+        is to[e ^ 1].
+
         :Input:
         Nothing
-        :Output, return or postcondition: Creates a network object with the attributes being vertices which is a list
-        of Vertex Objects in the FlowNetwork.
+        :Output, return or postcondition: Creates an empty network with the attributes being names, index, head, to,
+        next, capacity and flow, destinations, the number of destinations create_network built it for, and metrics.
+        Setting metrics to a Metrics object counts getVertex calls, augmenting paths and the vertices and edges the
+        BFS of getPath and buildLevels scan. Setting tracer to a Tracer records a span for every round of the
+        max-flow engines.
         :Time complexity: O(1). Just initializing an object.
         :Aux space complexity: O(1). Just initializing attributes.
         """
-        self.vertices = []
-
-    def getVertex(self, name: str) -> Optional[Vertex]:
+        self.names = []
+        self.index = {}
+        self.head = array("i")
+        self.to = array("i")
+        self.next = array("i")
+        self.capacity = array("i")
+        self.flow = array("i")
+        self.destinations = 0
+        self.metrics = None
+        self.tracer = None
+
+    def getVertex(self, name: str) -> Optional[int]:
         """
         Function description:
         Gets the vertex based on its name.
 
         :Input:
         name: Name of the vertex we want to search. A string.
-        :Output, return or postcondition: Returns the vertex we are looking for. A vertex object.
-        :Time complexity: O(n). n being the length of self.vertices which is the same as the amount of persons.
+        :Output, return or postcondition: Returns the number of the vertex, or None if there is no such vertex.
+        :Time complexity: O(1). A dictionary lookup.
         :Aux space complexity: O(1). It's in place.
         """
-        for vertex in self.vertices:
-            if name == vertex.name:
-                return vertex
+        if self.metrics is not None:
+            self.metrics.inc("get_vertex_calls")
+        return self.index.get(name)
 
-    def addVertex(self, name: str) -> None:
+    def addVertex(self, name: str) -> int:
         """
         Function description:
-        Adds a new vertex to self.vertices.
+        Adds a new vertex to the network.
 
         :Input:
         name: Name which is the name of the vertex we want to add. A string.
-        :Output, return or postcondition: Adds a vertex to self.vertices.
-        :Time complexity: O(1). We are creating and adding just 1 object at the end of the list.
-        :Aux space complexity: O(1). Only creating 1 object.
+        :Output, return or postcondition: Adds a vertex without edges and returns its number.
+        :Time complexity: O(1) amortised. Appending to the arrays.
+        :Aux space complexity: O(1).
         """
-        newVertex = Vertex(name)
-        self.vertices.append(newVertex)
+        vertex = len(self.names)
+        self.names.append(name)
+        self.index[name] = vertex
+        self.head.append(-1)
+        return vertex
 
-    def addEdge(self, origin: str, destination: str, capacity: int) -> None:
+    def addEdge(self, origin: str, destination: str, capacity: int) -> int:
         """
         Function description:
-        Adds a new edge to the origin vertex and the corresponding reverse edge to the destination vertex.
+        Adds a new edge from the origin vertex and the corresponding reverse edge from the destination vertex.
 
         :Input:
         origin: The name of the vertex the edge originates from. A string.
         destination: The name of the edge destination vertex. A string.
         capacity: The capacity of the edge. An integer.
-        :Output, return or postcondition: Adds an edge to the origin vertex.
-        :Time complexity: O(1). We are creating and appending the edge to the originVertex.edges then we create the
-        corresponding reverse edge and append them to destinationVertex.edges.
-        :Aux space complexity: O(1). Only creating 2 objects.
+        :Output, return or postcondition: Adds the edge and returns its number.
+        :Time complexity: O(1). Two dictionary lookups and addEdgeById.
+        :Aux space complexity: O(1).
+        """
+        return self.addEdgeById(self.index[origin], self.index[destination], capacity)
+
+    def addEdgeById(self, origin: int, destination: int, capacity: int) -> int:
+        """
+        Function description:
+        Adds a new edge between two vertex numbers, followed by its reverse edge with capacity 0.
+
+        :Input:
+        origin: The number of the vertex the edge originates from.
+        destination: The number of the edge destination vertex.
+        capacity: The capacity of the edge. An integer.
+        :Output, return or postcondition: Adds the edge as number e and its reverse as number e + 1, and returns e.
+        :Time complexity: O(1) amortised. Appending to the arrays.
+        :Aux space complexity: O(1).
+        """
+        edge = len(self.to)
+        self.to.append(destination)
+        self.next.append(self.head[origin])
+        self.capacity.append(capacity)
+        self.flow.append(0)
+        self.head[origin] = edge
+        self.to.append(origin)
+        self.next.append(self.head[destination])
+        self.capacity.append(0)
+        self.flow.append(0)
+        self.head[destination] = edge + 1
+        return edge
+
+    def edgesOf(self, vertex: int) -> List[int]:
         """
-        newEdge = Edge(origin, destination, capacity)
-        reverseEdge = Edge(destination, origin, 0)
-        newEdge.reverseEdge = reverseEdge
-        reverseEdge.reverseEdge = newEdge
+        Function description:
+        Returns the numbers of the edges out of a vertex, including reverse edges.
 
-        originVertex = self.getVertex(origin)
-        originVertex.edges.append(newEdge)
+        :Input:
+        vertex: The number of the vertex.
+        :Output, return or postcondition: A list of edge numbers, the most recently added first.
+        :Time complexity: O(D). D is the number of edges out of the vertex.
+        :Aux space complexity: O(D) for the list.
+        """
+        edges = []
+        edge = self.head[vertex]
+        while edge != -1:
+            edges.append(edge)
+            edge = self.next[edge]
+        return edges
+
+    def findEdge(self, origin: int, destination: int) -> Optional[int]:
+        """
+        Function description:
+        Finds the edge added from the origin to the destination, not counting reverse edges.
 
-        destinationVertex = self.getVertex(destination)
-        destinationVertex.edges.append(reverseEdge)
+        :Input:
+        origin: The number of the vertex the edge originates from.
+        destination: The number of the edge destination vertex.
+        :Output, return or postcondition: The most recently added such edge, or None if there is none.
+        :Time complexity: O(D). D is the number of edges out of the origin.
+        :Aux space complexity: O(1)
+        """
+        edge = self.head[origin]
+        while edge != -1:
+            if self.to[edge] == destination and edge % 2 == 0:
+                return edge
+            edge = self.next[edge]
+        return None
 
-    def getPath(self, origin: str, destination: str) -> Optional[List[Tuple[Edge, int]]]:
+    def getPath(self, origin: int, destination: int) -> Optional[List[Tuple[int, int]]]:
         """
         Function description:
         Determines an augmenting path in the network using BFS. It searches for a path from the origin to the
         destination that has available capacity.
 
+        Approach description (if main function):
+        The BFS only remembers the edge each vertex was first reached through, which also marks it as visited. When
+        the destination is reached the path is rebuilt once by following these parent edges backwards, the origin of
+        edge e being to[e ^ 1].
+
         :Input:
-        origin: The name of the origin vertex. A string
-        destination: The name of the destination vertex. A string.
+        origin: The number of the origin vertex.
+        destination: The number of the destination vertex.
 
         :Output, return or postcondition:
         Returns an augmenting path from the source to the sink if one exists, else None. The path is represented as a
-        list of tuples where each tuple contains an edge and its residual capacity.
+        list of tuples where each tuple contains an edge number and its residual capacity.
 
         :Time complexity:
         O(V + E). V is the number of vertices and E is the number of edges. In the worst case, BFS would visit
         all the vertices and edges of the flow network.
 
         :Aux space complexity:
-        O(V). Due to the BFS queue and the potential need to store paths for all vertices.
-        """
-        for vertex in self.vertices:
-            vertex.visited = False
-
-        # Using built-in Queue for BFS
-        queue = Queue()
-        queue.put((origin, []))
-        while not queue.empty():
-            (current_vertex_name, path) = queue.get()
-            current_vertex = self.getVertex(current_vertex_name)
-
-            if current_vertex_name == destination:
-                return path
-
-            if not current_vertex.visited:
-                current_vertex.visited = True
-
-                for edge in current_vertex.edges:
-                    residual_capacity = edge.capacity - edge.flow
-                    if residual_capacity > 0 and not (edge, residual_capacity) in path:
-                        new_path = list(path)
-                        new_path.append((edge, residual_capacity))
-                        queue.put((edge.destination, new_path))  # Enqueue operation
+        O(V). For the parent edges and the BFS queue.
+        """
+        head, to, nxt, capacity, flow = self.head, self.to, self.next, self.capacity, self.flow
+        # parent[v] is the edge v was reached through, -1 while unvisited
+        parent = [-1] * len(self.names)
+        parent[origin] = -2
+        queue = deque([origin])
+        while queue:
+            current_vertex = queue.popleft()
+            edge = head[current_vertex]
+            while edge != -1:
+                next_vertex = to[edge]
+                if parent[next_vertex] == -1 and capacity[edge] - flow[edge] > 0:
+                    parent[next_vertex] = edge
+                    if next_vertex == destination:
+                        if self.metrics is not None:
+                            self.countScanned(parent, queue, current_vertex, edge)
+                        # Rebuild the path from the parent edges
+                        path = []
+                        while next_vertex != origin:
+                            edge = parent[next_vertex]
+                            path.append((edge, capacity[edge] - flow[edge]))
+                            next_vertex = to[edge ^ 1]
+                        path.reverse()
+                        return path
+                    queue.append(next_vertex)
+                edge = nxt[edge]
+        if self.metrics is not None:
+            self.countScanned(parent, queue)
         return None
 
-    def calculateMaxFlow(self) -> int:
+    def countScanned(self, reached: List[int], queue: deque, stopped: int = -1, last: int = -1) -> None:
+        """
+        Function description:
+        Counts the vertices a BFS took off its queue, and the edges it looked at, in the metrics. Done after the
+        search from what it left behind, so a search costs nothing extra without metrics. Counting in the loop
+        instead made getPath about 70% slower.
+
+        :Input:
+        reached: The list the BFS kept per vertex, -1 for the vertices it did not reach.
+        queue: The vertices still in the queue, reached but never scanned.
+        stopped: The vertex being scanned when the search stopped early, -1 if it ran until the queue was empty.
+        last: The edge of stopped that reached the destination. The destination was never taken off the queue and
+        the edges of stopped after last were never looked at.
+        :Time complexity: O(V + E). V is the number of vertices and E is the number of edges.
+        :Aux space complexity: O(Q). Q is the length of the queue.
+        """
+        waiting = set(queue)
+        if stopped != -1:
+            # The destination is marked reached but was never queued
+            waiting.add(self.to[last])
+        vertices = edges = 0
+        for vertex, mark in enumerate(reached):
+            if mark != -1 and vertex not in waiting:
+                vertices += 1
+                edge = self.head[vertex]
+                while edge != -1:
+                    edges += 1
+                    if vertex == stopped and edge == last:
+                        break
+                    edge = self.next[edge]
+        self.metrics.inc("bfs_vertices_scanned", vertices)
+        self.metrics.inc("bfs_edges_scanned", edges)
+
+    def calculateMaxFlow(self, method: str = "ford_fulkerson") -> int:
+        """
+        Function description:
+        Calculates the maximum flow in the network and fills the edges with flow, using the chosen max-flow engine.
+        Vertex 0 is the source and vertex 1 is the sink.
+
+        :Input:
+        method: One of the names in MAX_FLOW_METHODS: "ford_fulkerson" (BFS augmenting paths), "dinic" (level graph
+        and blocking flow) or "push_relabel" (FIFO push-relabel).
+
+        :Output, return or postcondition:
+        Returns the maximum flow value in the network. An integer. Raises ValueError for an unknown method.
+
+        :Time complexity:
+        The time complexity of the chosen engine.
+
+        :Aux space complexity:
+        The aux space complexity of the chosen engine.
+        """
+        if method not in MAX_FLOW_METHODS:
+            raise ValueError(f"unknown max-flow method {method!r}, expected one of {sorted(MAX_FLOW_METHODS)}")
+        return getattr(self, MAX_FLOW_METHODS[method])()
+
+    def sourceFlow(self) -> int:
+        """
+        Function description:
+        Returns the total flow leaving the source, which is the value of the current flow.
+
+        :Output, return or postcondition: The flow value. An integer.
+        :Time complexity: O(D). D is the number of edges out of the source.
+        :Aux space complexity: O(1)
+        """
+        total = 0
+        edge = self.head[0]
+        while edge != -1:
+            total += self.flow[edge]
+            edge = self.next[edge]
+        return total
+
+    def fordFulkerson(self) -> int:
         """
         Function description:
-        Calculates the maximum flow in the network and fills the edges with flow usingFord-Fulkerson with BFS.
+        Calculates the maximum flow in the network and fills the edges with flow using Ford-Fulkerson with BFS.
 
         :Input: None
 
@@ -401,134 +2607,1239 @@ class FlowNetwork:
         :Aux space complexity:
         O(V). Mainly governed by the BFS in getPath and storage needed to store the path.
         """
-        source = self.vertices[0]
-        sink = self.vertices[1]
-        path = self.getPath(source.name, sink.name)
+        flows = self.flow
+        tracer = self.tracer
+        paths = 0
+        start = 0 if tracer is None else tracer.clock()
+        path = self.getPath(0, 1)
         while path != None:
             flow = min(edge[1] for edge in path)
             for edge, res in path:
-                edge.flow += flow
-                edge.reverseEdge.flow -= flow
-            path = self.getPath(source.name, sink.name)
-        sourceEdges = self.vertices[0].edges
-        return sum(edge.flow for edge in sourceEdges)
+                flows[edge] += flow
+                flows[edge ^ 1] -= flow
+            paths += 1
+            if tracer is not None:
+                # One round is a search and its augmentation
+                tracer.record("augment", start, flow=flow)
+                start = tracer.clock()
+            path = self.getPath(0, 1)
+        if tracer is not None:
+            tracer.record("augment", start, flow=0)
+        if self.metrics is not None:
+            self.metrics.inc("augmenting_paths", paths)
+        return self.sourceFlow()
+
+    def dinic(self) -> int:
+        """
+        Function description:
+        Calculates the maximum flow in the network and fills the edges with flow using Dinic's algorithm.
+
+        Approach description (if main function):
+        Each phase builds a level graph with a BFS from the source over edges with residual capacity, then finds a
+        blocking flow in it with a depth first search that only follows edges to the next level. Every vertex keeps
+        a current arc pointer, so an edge that cannot lead to the sink is never tried twice in a phase, and a vertex
+        that turns out to be a dead end is dropped from the level graph. Phases repeat until the sink is no longer
+        reachable.
+
+        :Input: None
+
+        :Output, return or postcondition:
+        Returns the maximum flow value in the network. An integer.
+
+        :Time complexity:
+        O(min(V^(2/3), E^(1/2))×E) for the unit capacity networks built by create_network, O(V^2×E) in general. V is
+        the number of vertices and E is the number of edges.
+
+        :Aux space complexity:
+        O(V) for the BFS queue, the levels, the current arcs and the path of the depth first search.
+        """
+        tracer = self.tracer
+        paths = 0
+        while True:
+            start = 0 if tracer is None else tracer.clock()
+            level = self.buildLevels()
+            if level[1] == -1:
+                if tracer is not None:
+                    tracer.record("phase", start, paths=0)
+                break
+            current = list(self.head)
+            phase_paths = paths
+            while self.augmentLevelPath(level, current):
+                paths += 1
+            if tracer is not None:
+                tracer.record("phase", start, paths=paths - phase_paths)
+        if self.metrics is not None:
+            self.metrics.inc("augmenting_paths", paths)
+        return self.sourceFlow()
+
+    def buildLevels(self, capacity: Optional[array] = None) -> List[int]:
+        """
+        Function description:
+        Returns the BFS distance of every vertex from the source in the residual network, or -1 if it cannot be
+        reached. Used by dinic and minCostFlow.
+
+        :Input:
+        capacity: Capacities to use instead of the ones of the network, so some edges can be left out.
+        :Output, return or postcondition: The list of levels indexed by vertex number.
+        :Time complexity: O(V + E)
+        :Aux space complexity: O(V) for the levels and the queue.
+        """
+        head, to, nxt, flow = self.head, self.to, self.next, self.flow
+        capacity = self.capacity if capacity is None else capacity
+        level = [-1] * len(self.names)
+        level[0] = 0
+        queue = deque([0])
+        while queue:
+            vertex = queue.popleft()
+            edge = head[vertex]
+            while edge != -1:
+                destination = to[edge]
+                if level[destination] == -1 and capacity[edge] - flow[edge] > 0:
+                    level[destination] = level[vertex] + 1
+                    queue.append(destination)
+                edge = nxt[edge]
+        if self.metrics is not None:
+            self.countScanned(level, queue)
+        return level
+
+    def augmentLevelPath(self, level: List[int], current: List[int], capacity: Optional[array] = None) -> int:
+        """
+        Function description:
+        Finds one source to sink path in the level graph with an iterative depth first search and pushes the
+        bottleneck capacity along it. Used by dinic and minCostFlow.
+
+        :Input:
+        level: The levels from buildLevels. Dead ends are set to -1.
+        current: The current arc of every vertex, advanced as edges are used up.
+        capacity: The capacities buildLevels was given, if any.
+        :Output, return or postcondition: Returns the flow pushed, 0 if the level graph has no path left.
+        :Time complexity: O(V + advanced current arcs). Over a whole phase, every edge is passed by a current arc
+        pointer at most once.
+        :Aux space complexity: O(V) for the path.
+        """
+        to, nxt, flow = self.to, self.next, self.flow
+        capacity = self.capacity if capacity is None else capacity
+        path = []
+        vertex = 0
+        while vertex != 1:
+            edge = current[vertex]
+            while edge != -1 and not (level[to[edge]] == level[vertex] + 1 and capacity[edge] - flow[edge] > 0):
+                edge = nxt[edge]
+            current[vertex] = edge
+            if edge != -1:
+                # Advance along the current arc
+                path.append(edge)
+                vertex = to[edge]
+            elif vertex == 0:
+                return 0
+            else:
+                # Dead end: drop the vertex from the level graph and retreat
+                level[vertex] = -1
+                vertex = to[path.pop() ^ 1]
+                current[vertex] = nxt[current[vertex]]
+        pushed = min(capacity[edge] - flow[edge] for edge in path)
+        for edge in path:
+            flow[edge] += pushed
+            flow[edge ^ 1] -= pushed
+        return pushed
+
+    def pushRelabel(self) -> int:
+        """
+        Function description:
+        Calculates the maximum flow in the network and fills the edges with flow using the FIFO push-relabel
+        algorithm with the gap and global relabelling heuristics.
+
+        Approach description (if main function):
+        The source saturates all its edges and every vertex gets a height, its BFS distance to the sink in the
+        residual network (a global relabel). The first phase builds a maximum preflow: vertices with excess flow and a
+        height below V are processed in first in, first out order. A vertex pushes excess along residual edges to
+        vertices exactly one lower, scanning its edges with a current arc pointer, and is relabelled to one above its
+        lowest residual neighbour when no such edge is left. When a relabel empties a height, no vertex above it can
+        reach the sink anymore, so they are all lifted to V at once (the gap heuristic), and every V relabels the
+        heights are recomputed by a global relabel. Without these, excess that cannot reach the sink climbs to V one
+        relabel at a time. Vertices at height V are set aside. The second phase returns their excess to the source,
+        with heights recomputed as the BFS distance to the source. Existing flow on the edges is kept as the starting
+        point.
+
+        :Input: None
+
+        :Output, return or postcondition:
+        Returns the maximum flow value in the network. An integer.
+
+        :Time complexity:
+        O(V^3). V is the number of vertices.
+
+        :Aux space complexity:
+        O(V) for the heights, the excesses, the height counts, the current arcs and the queue.
+        """
+        head, to, nxt, capacity, flow = self.head, self.to, self.next, self.capacity, self.flow
+        tracer = self.tracer
+        count = len(self.names)
+        start = 0 if tracer is None else tracer.clock()
+        height = self.globalRelabel()
+        if tracer is not None:
+            tracer.record("global_relabel", start)
+            start = tracer.clock()
+        height[0] = count
+        excess = [0] * count
+        queue = deque()
+        # Saturate the residual capacity of every source edge
+        edge = head[0]
+        while edge != -1:
+            residual = capacity[edge] - flow[edge]
+            destination = to[edge]
+            if residual > 0:
+                flow[edge] += residual
+                flow[edge ^ 1] -= residual
+                if excess[destination] == 0 and destination != 1:
+                    queue.append(destination)
+                excess[destination] += residual
+            edge = nxt[edge]
+        # Phase 1: move excess towards the sink while it can still reach it
+        current = list(head)
+        # level[h] is the number of vertices at height h below count
+        level = [0] * count
+        for vertex in range(2, count):
+            if height[vertex] < count:
+                level[height[vertex]] += 1
+        relabels = 0
+        while queue:
+            if relabels >= count:
+                # Periodic global relabel, the heights only grow to the exact distances
+                relabels = 0
+                if tracer is not None:
+                    tracer.record("discharge", start)
+                    start = tracer.clock()
+                height = self.globalRelabel()
+                height[0] = count
+                level = [0] * count
+                for vertex in range(2, count):
+                    if height[vertex] < count:
+                        level[height[vertex]] += 1
+                current = list(head)
+                if tracer is not None:
+                    tracer.record("global_relabel", start)
+                    start = tracer.clock()
+            vertex = queue.popleft()
+            # Discharge the vertex
+            while excess[vertex] > 0 and height[vertex] < count:
+                edge = current[vertex]
+                if edge == -1:
+                    # Relabel to one above the lowest neighbour reachable through a residual edge
+                    relabels += 1
+                    old = height[vertex]
+                    lowest = count
+                    edge = head[vertex]
+                    while edge != -1:
+                        if capacity[edge] - flow[edge] > 0 and height[to[edge]] < lowest:
+                            lowest = height[to[edge]]
+                        edge = nxt[edge]
+                    level[old] -= 1
+                    if level[old] == 0:
+                        # Gap: nothing is left at height old, so the vertices above it cannot reach the sink
+                        for other in range(2, count):
+                            if old < height[other] < count:
+                                level[height[other]] -= 1
+                                height[other] = count
+                        height[vertex] = count
+                    else:
+                        height[vertex] = min(lowest + 1, count)
+                        if height[vertex] < count:
+                            level[height[vertex]] += 1
+                    current[vertex] = head[vertex]
+                    continue
+                destination = to[edge]
+                residual = capacity[edge] - flow[edge]
+                if residual > 0 and height[vertex] == height[destination] + 1:
+                    pushed = min(excess[vertex], residual)
+                    flow[edge] += pushed
+                    flow[edge ^ 1] -= pushed
+                    excess[vertex] -= pushed
+                    if excess[destination] == 0 and destination > 1:
+                        queue.append(destination)
+                    excess[destination] += pushed
+                else:
+                    current[vertex] = nxt[edge]
+        if tracer is not None:
+            tracer.record("discharge", start)
+            start = tracer.clock()
+        # Phase 2: the preflow is maximum, return the excess that cannot reach the sink to the source
+        queue = deque(vertex for vertex in range(2, count) if excess[vertex] > 0)
+        if queue:
+            height = self.globalRelabel(0)
+            current = list(head)
+            while queue:
+                vertex = queue.popleft()
+                while excess[vertex] > 0:
+                    edge = current[vertex]
+                    if edge == -1:
+                        lowest = None
+                        edge = head[vertex]
+                        while edge != -1:
+                            if capacity[edge] - flow[edge] > 0 and (lowest is None or height[to[edge]] < lowest):
+                                lowest = height[to[edge]]
+                            edge = nxt[edge]
+                        height[vertex] = lowest + 1
+                        current[vertex] = head[vertex]
+                        continue
+                    destination = to[edge]
+                    residual = capacity[edge] - flow[edge]
+                    if residual > 0 and destination != 1 and height[vertex] == height[destination] + 1:
+                        pushed = min(excess[vertex], residual)
+                        flow[edge] += pushed
+                        flow[edge ^ 1] -= pushed
+                        excess[vertex] -= pushed
+                        if excess[destination] == 0 and destination > 1:
+                            queue.append(destination)
+                        excess[destination] += pushed
+                    else:
+                        current[vertex] = nxt[edge]
+            if tracer is not None:
+                tracer.record("return_excess", start)
+        return self.sourceFlow()
+
+    def globalRelabel(self, target: int = 1) -> List[int]:
+        """
+        Function description:
+        Returns the distance of every vertex to the target in the residual network, found by a BFS from the target
+        over reverse residual edges. Vertices that cannot reach the target, and the other one of the source and the
+        sink, get the number of vertices. Used by pushRelabel.
+
+        :Input:
+        target: The vertex to measure the distances to, the sink by default or the source.
+        :Output, return or postcondition: The list of heights indexed by vertex number.
+        :Time complexity: O(V + E)
+        :Aux space complexity: O(V) for the heights and the queue.
+        """
+        head, to, nxt, capacity, flow = self.head, self.to, self.next, self.capacity, self.flow
+        count = len(self.names)
+        other = 1 - target
+        height = [count] * count
+        height[target] = 0
+        queue = deque([target])
+        while queue:
+            vertex = queue.popleft()
+            edge = head[vertex]
+            while edge != -1:
+                # edge ^ 1 goes from to[edge] to this vertex, follow it backwards if it has residual capacity
+                origin = to[edge]
+                if height[origin] == count and origin != other and capacity[edge ^ 1] - flow[edge ^ 1] > 0:
+                    height[origin] = height[vertex] + 1
+                    queue.append(origin)
+                edge = nxt[edge]
+        return height
 
     def create_network(self, preferences: List[List[int]], licenses: List[int]) -> None:
         """
         Function description:
         Constructs a bipartite flow network based on provided preferences and licenses.
 
+        Approach description (if main function):
+        The network is built in bulk instead of one addEdge call at a time, giving the same vertices and edges in
+        the same order. With n persons and D = ceil(n/5) destinations the vertex numbers are known up front: source
+        0, sink 1, person i is 2 + i, d_j is 2 + n + j, c_j is 2 + n + D + j and e comes last. The edges come in
+        blocks: source to persons, d vertices to sink, licensed persons to d vertices, persons to c vertices, c
+        vertices to e and e to sink, so their destinations and capacities are written into preallocated lists with
+        extended slices. Most edges out of a vertex follow each other within a block, which gives their next edge by
+        arithmetic, and only the first edge of each person in a block and the reverse edges into the d and c vertices
+        are linked one by one. The licences are turned into a set first, so checking a person is O(1).
+
         :Input:
         preferences: List of lists. Each inner list indicates preferences of a person.
         licenses: List of indices indicating which persons have licenses.
 
         :Output, return or postcondition:
-        Creates a flow network that represents the problem.
+        Creates a flow network that represents the problem, replacing anything already in the network. Raises
+        IndexError if a preference is not a destination.
 
-        :Time complexity: O(n^2). n being the amount of persons. Most intensive operations involve nested loops over
-        preferences.
-        :Aux space complexity: O(n). The space complexity primarily grows with the number of preferences.
+        :Time complexity: O(n + P + L). n being the amount of persons, P the total length of the preferences and L
+        the amount of licenses.
+        :Aux space complexity: O(n + P). For the vertex names and the edge lists before they are stored as arrays.
+        """
+        n = len(preferences)
+        num_d_vertices = math.ceil(n / 5)
+        first_d = 2 + n
+        first_c = first_d + num_d_vertices
+        e = first_c + num_d_vertices
+        licensed = set(licenses)
+        self.destinations = num_d_vertices
+
+        # Vertex names in numbering order
+        self.names = ["source", "sink"]
+        self.names.extend(map(str, range(n)))
+        self.names.extend(map("d{}".format, range(num_d_vertices)))
+        self.names.extend(map("c{}".format, range(num_d_vertices)))
+        self.names.append("e")
+        self.index = dict(zip(self.names, range(len(self.names))))
+
+        wanted = [p for pref in preferences for p in pref]
+        if wanted and (min(wanted) < 0 or max(wanted) >= num_d_vertices):
+            raise IndexError(f"preferences must be destinations 0 to {num_d_vertices - 1}")
+        driver_origins = [2 + i for i, pref in enumerate(preferences) if i in licensed for _ in pref]
+        drivers = [first_d + p for i, pref in enumerate(preferences) if i in licensed for p in pref]
+        car_origins = [2 + i for i, pref in enumerate(preferences) for _ in pref]
+        cars = [first_c + p for p in wanted]
+
+        # First edge number of every block, edge 2k + 1 being the reverse of edge 2k
+        to_sink = 2 * n
+        to_driver = to_sink + 2 * num_d_vertices
+        to_car = to_driver + 2 * len(drivers)
+        to_e = to_car + 2 * len(cars)
+        last = to_e + 2 * num_d_vertices
+        size = last + 2
+
+        to = [0] * size
+        to[0:to_sink:2] = range(2, first_d)
+        to[to_sink:to_driver:2] = [1] * num_d_vertices
+        to[to_sink + 1:to_driver:2] = range(first_d, first_c)
+        to[to_driver:to_car:2] = drivers
+        to[to_driver + 1:to_car:2] = driver_origins
+        to[to_car:to_e:2] = cars
+        to[to_car + 1:to_e:2] = car_origins
+        to[to_e:last:2] = [e] * num_d_vertices
+        to[to_e + 1:last:2] = range(first_c, e)
+        to[last:] = [1, e]
+        self.to = array("i", to)
+        self.capacity = (array("i", [1, 0]) * n + array("i", [2, 0]) * num_d_vertices
+                         + array("i", [1, 0]) * (len(drivers) + len(cars)) + array("i", [3, 0]) * num_d_vertices
+                         + array("i", [n - 2 * num_d_vertices, 0]))
+        self.flow = array("i", bytes(4 * size))
+
+        # Edges out of the source, out of the d vertices and into the sink
+        nxt = [-1] * size
+        head = [-1] * len(self.names)
+        nxt[2:to_sink:2] = range(0, to_sink - 2, 2)
+        head[0] = to_sink - 2 if n else -1
+        nxt[to_sink + 3:to_driver:2] = range(to_sink + 1, to_driver - 2, 2)
+        head[1] = to_driver - 1 if num_d_vertices else -1
+        head[first_d:first_c] = range(to_sink, to_driver, 2)
+
+        # Edges out of persons: the reverse source edge, then the d edges, then the c edges, where each edge
+        # follows the one before it except for the first edge of a person in a block
+        nxt[to_driver + 2:to_e:2] = range(to_driver, to_e - 2, 2)
+        head[2:first_d] = range(1, to_sink, 2)
+        edge = to_driver
+        for i, pref in enumerate(preferences):
+            if pref and i in licensed:
+                nxt[edge] = head[2 + i]
+                edge += 2 * len(pref)
+                head[2 + i] = edge - 2
+        for i, pref in enumerate(preferences):
+            if pref:
+                nxt[edge] = head[2 + i]
+                edge += 2 * len(pref)
+                head[2 + i] = edge - 2
+
+        # Reverse edges into the d and c vertices
+        for edge, destination in zip(range(to_driver + 1, to_e, 2), to[to_driver:to_e:2]):
+            nxt[edge] = head[destination]
+            head[destination] = edge
+
+        # Edges out of the c vertices and e, and the last edge into the sink
+        for j in range(num_d_vertices):
+            nxt[to_e + 2 * j] = head[first_c + j]
+            head[first_c + j] = to_e + 2 * j
+        nxt[to_e + 3:last:2] = range(to_e + 1, last - 2, 2)
+        nxt[last] = last - 1 if num_d_vertices else -1
+        head[e] = last
+        nxt[last + 1] = head[1]
+        head[1] = last + 1
+        self.head = array("i", head)
+        self.next = array("i", nxt)
+
+    def greedyFlow(self, preferences: List[List[int]], licenses: List[int]) -> int:
         """
-        # Create source and sink vertices
-        self.addVertex("source")
-        self.addVertex("sink")
+        Function description:
+        Seeds the network built by create_network with a greedy flow, so a max-flow engine only has to augment the
+        remainder.
+
+        Approach description (if main function):
+        Every person with a licence first drives to the first destination they prefer that still has fewer than 2
+        drivers. Everyone else then rides to the first destination they prefer with fewer than 3 passengers, while
+        the e to sink edge has room. A seated person sends one unit of flow along their route, whose edges are found
+        from the layout create_network uses, so the result is a valid flow that every max-flow engine can start from.
 
-        # Create vertices 0,1,...,len(preferences)-1 to represent persons and connect them to source
-        for i in range(len(preferences)):
-            self.addVertex(str(i))
-            self.addEdge("source", str(i), 1)
+        :Input:
+        preferences: The preferences the network was built from.
+        licenses: The licenses the network was built from.
 
-        # Create d vertices to represent drivers and connect them to sink
-        num_d_vertices = math.ceil(len(preferences) / 5)
-        for i in range(num_d_vertices):
-            self.addVertex(f"d{i}")
-            self.addEdge(f"d{i}", "sink", 2)
+        :Output, return or postcondition:
+        Adds the greedy flow to the network, which must have no flow yet, and returns the number of people seated.
 
-        # Connect number vertices to d vertices based on preferences and licenses
+        :Time complexity: O(n + P). n being the amount of persons and P the total length of the preferences.
+        :Aux space complexity: O(n + D). For the licensed and seated people and the seats used per destination.
+        """
+        flow = self.flow
+        n = len(preferences)
+        num_d_vertices = self.destinations
+        licensed = set(licenses)
+        to_sink = 2 * n
+        to_driver = to_sink + 2 * num_d_vertices
+        to_car = to_driver + 2 * sum(len(pref) for i, pref in enumerate(preferences) if i in licensed)
+        to_e = to_car + 2 * sum(len(pref) for pref in preferences)
+        last = to_e + 2 * num_d_vertices
+        seated = [False] * n
+        count = 0
+
+        # Drivers: source, person, d vertex, sink
+        drivers = [0] * num_d_vertices
+        edge = to_driver
         for i, pref in enumerate(preferences):
-            if i in licenses:
-                for p in pref:
-                    self.addEdge(str(i), f"d{p}", 1)
+            if i in licensed:
+                for k, p in enumerate(pref):
+                    if drivers[p] < 2:
+                        drivers[p] += 1
+                        seated[i] = True
+                        count += 1
+                        for path_edge in (2 * i, edge + 2 * k, to_sink + 2 * p):
+                            flow[path_edge] += 1
+                            flow[path_edge ^ 1] -= 1
+                        break
+                edge += 2 * len(pref)
+
+        # Passengers: source, person, c vertex, e, sink
+        passengers = [0] * num_d_vertices
+        room = self.capacity[last]
+        edge = to_car
+        for i, pref in enumerate(preferences):
+            if not seated[i] and room > 0:
+                for k, p in enumerate(pref):
+                    if passengers[p] < 3:
+                        passengers[p] += 1
+                        room -= 1
+                        count += 1
+                        for path_edge in (2 * i, edge + 2 * k, to_e + 2 * p, last):
+                            flow[path_edge] += 1
+                            flow[path_edge ^ 1] -= 1
+                        break
+            edge += 2 * len(pref)
+        return count
+
+    def preferenceCosts(self, preferences: List[List[int]], licenses: List[int]) -> array:
+        """
+        Function description:
+        Gives every edge of the network built by create_network a cost: the position of the destination in the
+        person's preferences for the edges from persons to d and c vertices, and 0 for the rest. Reverse edges cost
+        the negative, so cancelling flow refunds its cost.
+
+        :Input:
+        preferences: The preferences the network was built from.
+        licenses: The licenses the network was built from.
+
+        :Output, return or postcondition: The costs, an array indexed by edge number.
+        :Time complexity: O(n + P). n being the amount of persons and P the total length of the preferences.
+        :Aux space complexity: O(E) for the costs.
+        """
+        licensed = set(licenses)
+        ranks = [k for i, pref in enumerate(preferences) if i in licensed for k in range(len(pref))]
+        ranks.extend([k for pref in preferences for k in range(len(pref))])
+        start = 2 * len(preferences) + 2 * self.destinations
+        cost = array("i", bytes(4 * len(self.to)))
+        cost[start:start + 2 * len(ranks):2] = array("i", ranks)
+        cost[start + 1:start + 2 * len(ranks):2] = array("i", [-rank for rank in ranks])
+        return cost
+
+    def minCostFlow(self, cost: array) -> Tuple[int, int]:
+        """
+        Function description:
+        Calculates a maximum flow of minimum cost in the network, which must have no flow yet, and fills the edges
+        with it.
 
-        # Create c to represent cars vertices
-        for i in range(num_d_vertices):
-            self.addVertex(f"c{i}")
+        Approach description (if main function):
+        Primal-dual successive shortest paths. Every vertex has a potential, and the reduced cost of an edge from u
+        to v is its cost plus the potential of u minus the potential of v. Potentials start at 0, which keeps reduced
+        costs non negative as long as the costs are. Each phase runs Dijkstra on reduced costs over edges with
+        residual capacity and adds the distances to the potentials, after which the shortest paths to the sink are
+        exactly the paths of edges with reduced cost 0. A blocking flow is pushed through those edges like in
+        dinic, repeating until the sink cannot be reached through them. Pushing flow only along reduced cost 0 edges
+        keeps every residual edge at a non negative reduced cost, so the flow stays of minimum cost for its value.
+        Costs here are preference positions, so there are few distinct path costs and few phases.
 
-        # Connect number vertices to c vertices based on preferences
-        for i, pref in enumerate(preferences):
-            for p in pref:
-                self.addEdge(str(i), f"c{p}", 1)
+        :Input:
+        cost: The cost of every edge, non negative for forward edges and the negative for reverse edges.
 
-        # Create vertex e as an intermediary vertex and connect c vertices to e
-        self.addVertex("e")
-        for i in range(num_d_vertices):
-            self.addEdge(f"c{i}", "e", 3)
+        :Output, return or postcondition:
+        Returns the value of the flow and its total cost.
+
+        :Time complexity:
+        O(C×(E×log(V) + V×E)). C is the number of distinct shortest path costs, at most the largest cost times V, V
+        is the number of vertices and E is the number of edges.
 
-        # Connect e to sink and the edge's capacity is constraint for the amount of passengers
-        self.addEdge("e", "sink", len(preferences) - 2 * math.ceil(len(preferences) / 5))
+        :Aux space complexity:
+        O(V) for the potentials, the distances, the heap, the levels and the current arcs.
+        """
+        head, to, nxt, capacity, flow = self.head, self.to, self.next, self.capacity, self.flow
+        count = len(self.names)
+        potential = [0] * count
+        infinity = float("inf")
+        tracer = self.tracer
+        paths = 0
+        while True:
+            start = 0 if tracer is None else tracer.clock()
+            # Dijkstra on reduced costs from the source
+            distance = [infinity] * count
+            distance[0] = 0
+            heap = [(0, 0)]
+            while heap:
+                length, vertex = heappop(heap)
+                if length > distance[vertex]:
+                    continue
+                reduced = length + potential[vertex]
+                edge = head[vertex]
+                while edge != -1:
+                    if capacity[edge] - flow[edge] > 0:
+                        destination = to[edge]
+                        new_length = reduced + cost[edge] - potential[destination]
+                        if new_length < distance[destination]:
+                            distance[destination] = new_length
+                            heappush(heap, (new_length, destination))
+                    edge = nxt[edge]
+            if distance[1] == infinity:
+                if tracer is not None:
+                    tracer.record("phase", start, paths=0)
+                break
+            # Vertices not reached now are never reached again, so their potential no longer matters
+            for vertex in range(count):
+                if distance[vertex] != infinity:
+                    potential[vertex] += distance[vertex]
+            phase_paths = paths
+            # Edges with a reduced cost other than 0 get no residual capacity for the blocking flows. Flow only moves
+            # on edges with reduced cost 0, whose reverse edges have reduced cost 0 too, so this holds for the phase
+            admissible = array("i", capacity)
+            for edge in range(len(to)):
+                if cost[edge] + potential[to[edge ^ 1]] != potential[to[edge]]:
+                    admissible[edge] = flow[edge]
+            while True:
+                level = self.buildLevels(admissible)
+                if level[1] == -1:
+                    break
+                current = list(head)
+                while self.augmentLevelPath(level, current, admissible):
+                    paths += 1
+            if tracer is not None:
+                tracer.record("phase", start, paths=paths - phase_paths)
+        if self.metrics is not None:
+            self.metrics.inc("augmenting_paths", paths)
+        total = 0
+        for edge in range(0, len(to), 2):
+            total += cost[edge] * flow[edge]
+        return self.sourceFlow(), total
 
     def getResults(self) -> List[List[int]]:
         """
         Function description:
         Uses the flow network to determine the allocation of persons to cars.
 
+        Approach description (if main function):
+        A single pass over the edges out of the person vertices puts every person whose edge to a d or c vertex
+        carries flow into the list of that destination. The number of destinations is the one create_network built
+        the network with, and persons are visited in order, so every car lists its people in increasing order.
+
         :Input: None
         :Output, return or postcondition:
-        Returns a list of lists where each inner list represents a car's allocation of people.
-
-        :Time complexity: O(n^2). n being the amount of persons. The method involves nested loops
-        over person vertices and their edges.
-        :Aux space complexity: O(n). Storage for results.
-        """
-        results = []
-        num_d_vertices = math.ceil(len(self.vertices) / 5)
-
-        # For each d and c vertex pair, gather the connected number vertices
-        for i in range(num_d_vertices):
-            combined_list = []
-            # Check each numbered vertex for connections to d or c vertices
-            for v in self.vertices:
-                if v.name.isnumeric():
-                    for edge in v.edges:
-                        if edge.flow > 0 and edge.destination == f"d{i}":
-                            combined_list.append(int(v.name))
-                        elif edge.flow > 0 and edge.destination == f"c{i}":
-                            combined_list.append(int(v.name))
-            if combined_list:  # Only add if there's a valid connection
-                results.append(combined_list)
-        return results
+        Returns a list of lists where each inner list represents a car's allocation of people, for every destination
+        someone goes to, in order of destination.
+
+        :Time complexity: O(n + E). n being the amount of persons and E the number of edges out of them.
+        :Aux space complexity: O(D). D being the amount of destinations, for the lists of the cars.
+        """
+        head, to, nxt, flow = self.head, self.to, self.next, self.flow
+        num_d_vertices = self.destinations
+        first_d = len(self.names) - 1 - 2 * num_d_vertices
+        first_c = first_d + num_d_vertices
+        cars = [[] for _ in range(num_d_vertices)]
+        for person in range(2, first_d):
+            edge = head[person]
+            while edge != -1:
+                if flow[edge] > 0:
+                    destination = to[edge]
+                    cars[destination - first_d if destination < first_c else destination - first_c].append(person - 2)
+                edge = nxt[edge]
+        # Only add cars with a valid connection
+        return [car for car in cars if car]
+
+def infeasibility_report(preferences: List[List[int]], licenses: List[int]) -> List[str]:
+    """
+    Function description:
+    Checks necessary conditions for an allocation to exist and reports every one that fails.
+
+    Approach description (if main function):
+    With n persons there are D = ceil(n/5) destinations and a maximum flow of n saturates every d vertex edge, so
+    each destination gets exactly 2 drivers and at most 3 passengers. This needs at least 2 people, 2×D distinct
+    people with a licence, a non empty list of valid destinations for every person and 2 licensed people preferring
+    every destination. Hall's condition on single destinations and pairs of destinations is checked as well: at
+    most 5 people may only want to go to one destination, and at most 10 people may only want to go to one of two.
+    Counting the people confined to every destination and every pair that someone is confined to takes one pass.
+    Passing all checks does not guarantee an allocation exists.
+
+    :Input:
+    preferences: List of lists. Each inner list indicates preferences of a person.
+    licenses: List of indices indicating which persons have licenses.
+
+    :Output, return or postcondition:
+    Returns a list of the reasons the instance is infeasible, empty if none was found.
 
-def allocate(preferences: List[List[int]], licenses: List[int]) -> Optional[List[List[int]]]:
+    :Time complexity: O(n + P + L). n being the amount of persons, P the total length of the preferences and L the
+    amount of licenses.
+    :Aux space complexity: O(n + D). For the licensed people and the counts per destination and pair.
+    """
+    n = len(preferences)
+    destinations = math.ceil(n / 5)
+    reasons = []
+    if n < 2:
+        reasons.append(f"a car needs at least 2 people, there are {n}")
+    licensed = {i for i in licenses if 0 <= i < n}
+    if len(licensed) < 2 * destinations:
+        reasons.append(f"{destinations} cars need {2 * destinations} drivers, licensed people: {len(licensed)}")
+
+    empty, invalid = [], []
+    drivers = [0] * destinations
+    confined = [0] * destinations
+    pairs = {}
+    for i, pref in enumerate(preferences):
+        wanted = set(pref)
+        if not wanted:
+            empty.append(i)
+        elif not all(0 <= p < destinations for p in wanted):
+            invalid.append(i)
+            continue
+        if i in licensed:
+            for p in wanted:
+                drivers[p] += 1
+        if len(wanted) == 1:
+            confined[wanted.pop()] += 1
+        elif len(wanted) == 2:
+            pair = (min(wanted), max(wanted))
+            pairs[pair] = pairs.get(pair, 0) + 1
+    if empty:
+        reasons.append(f"people {empty} have no preferences")
+    if invalid:
+        reasons.append(f"people {invalid} prefer destinations outside 0 to {destinations - 1}")
+    for j in range(destinations):
+        if drivers[j] < 2:
+            reasons.append(f"destination {j} needs 2 drivers, licensed people preferring it: {drivers[j]}")
+        if confined[j] > 5:
+            reasons.append(f"destination {j} seats 5, people only wanting it: {confined[j]}")
+    for (j, k), count in pairs.items():
+        if count + confined[j] + confined[k] > 10:
+            reasons.append(f"destinations {j} and {k} seat 10, people only wanting them: "
+                           f"{count + confined[j] + confined[k]}")
+    return reasons
+
+
+def allocate(preferences: List[List[int]], licenses: List[int],
+             method: str = "ford_fulkerson", warm_start: bool = True,
+             tracer: Optional[Tracer] = None) -> Optional[List[List[int]]]:
     """
     Function description:
-    Allocates persons to cars based on their preferences and available licenses using a flow network and the
-    Ford-Fulkerson method.
+    Allocates persons to cars based on their preferences and available licenses using a flow network and a max-flow
+    engine, Ford-Fulkerson by default.
 
     :Input:
     preferences (list): List of lists. Each inner list indicates preferences of a person.
     licenses (list): List of indices indicating which persons have licenses.
+    method (str): The max-flow engine, one of "ford_fulkerson", "dinic" and "push_relabel". Every engine finds a
+    maximum flow, so the feasibility of an instance does not depend on it.
+    warm_start (bool): Whether to seed the network with FlowNetwork.greedyFlow, so the engine only augments the
+    people the greedy pass could not seat.
+    tracer (Tracer): If given, records an allocate span with a child span for every phase (validate, create_network,
+    greedy_flow, max_flow and get_results) and, under max_flow, a span for every round of the engine.
 
     :Output, return or postcondition:
     Returns a list of lists where each inner list represents a car's allocation of people. If allocation is not
-    possible, it returns None.
+    possible, it returns None, without building the flow network when infeasibility_report finds a reason.
 
     :Time complexity:
     O(n^3), where n is the length of preferences. The complexity is mainly governed by the calculateMaxFlow method.
     The Ford-Fulkerson method with BFS in getPath can lead to O(n*(n+n^2)) complexity. The max flow is the number of
     persons, V represents the number of vertices which scales with the number of persons, and n^2 is due to the worst
-    case scenario where everybody wants to go to every destination and everybody has a license.
+    case scenario where everybody wants to go to every destination and everybody has a license. Dinic's algorithm
+    needs O(sqrt(n)) phases of O(n^2) each instead.
 
     :Aux space complexity:
     O(n), primarily determined by the space requirements of the flow network and the BFS traversal in `getPath`.
     """
-    if len(preferences)<2 or len(licenses) < math.ceil(len(preferences)/5):
-        # Each car need minimum 2 persons or there are not enough drivers for the amount of people
+    with trace_span(tracer, "allocate", people=len(preferences), method=method) as outer:
+        with trace_span(tracer, "validate"):
+            if method not in MAX_FLOW_METHODS:
+                raise ValueError(f"unknown max-flow method {method!r}, expected one of {sorted(MAX_FLOW_METHODS)}")
+            infeasible = bool(infeasibility_report(preferences, licenses))
+        if infeasible:
+            # A necessary condition fails, such as too few people or drivers, so no flow network is needed
+            outer["attributes"]["feasible"] = False
+            return None
+        network = FlowNetwork()
+        with trace_span(tracer, "create_network"):
+            network.create_network(preferences, licenses)
+        if warm_start:
+            with trace_span(tracer, "greedy_flow"):
+                network.greedyFlow(preferences, licenses)
+        with trace_span(tracer, "max_flow") as span:
+            network.tracer = tracer
+            max_flow=network.calculateMaxFlow(method)
+            network.tracer = None
+            span["attributes"]["flow"] = max_flow
+        outer["attributes"]["feasible"] = max_flow == len(preferences)
+        if max_flow < len(preferences): # Not every person can be matched with a car that has 2 drivers
+            return None
+        with trace_span(tracer, "get_results"):
+            return network.getResults()
+
+
+def allocate_min_cost(preferences: List[List[int]],
+                      licenses: List[int]) -> Optional[Tuple[List[List[int]], int]]:
+    """
+    Function description:
+    Allocates persons to cars like allocate, but honours the order of the preferences: going to the destination at
+    position k of a person's preferences costs k, and the allocation of least total cost is returned.
+
+    Approach description (if main function):
+    The network is the one create_network builds, with the edges from persons to d and c vertices costing the
+    position of the destination in the person's preferences. A minimum cost maximum flow seats everyone if anyone
+    can be, and among those allocations picks the cheapest. It starts from zero flow, since a greedy flow is not
+    necessarily cheapest.
+
+    :Input:
+    preferences (list): List of lists. Each inner list indicates preferences of a person, the first most preferred.
+    licenses (list): List of indices indicating which persons have licenses.
+
+    :Output, return or postcondition:
+    Returns the allocation in the form allocate returns it and its total cost, the sum of the positions of the
+    destinations people go to. If allocation is not possible, it returns None.
+
+    :Time complexity:
+    The time complexity of FlowNetwork.minCostFlow, with V and E in O(n + P), P being the total length of the
+    preferences.
+
+    :Aux space complexity:
+    O(n + P) for the network and its costs.
+    """
+    if infeasibility_report(preferences, licenses):
         return None
     network = FlowNetwork()
     network.create_network(preferences, licenses)
-    max_flow=network.calculateMaxFlow()
-    if max_flow < len(preferences): # Not every person can be matched with a car that has 2 drivers
+    max_flow, cost = network.minCostFlow(network.preferenceCosts(preferences, licenses))
+    if max_flow < len(preferences):
         return None
-    return network.getResults()
+    return network.getResults(), cost
+
+def allocate_timed(preferences: List[List[int]], licenses: List[int],
+                   method: str = "ford_fulkerson") -> Tuple[Optional[List[List[int]]], float]:
+    """
+    Function description:
+    Runs allocate and times it. Module level so a process pool can run it.
+
+    :Input:
+    preferences, licenses, method: As for allocate.
+    :Output, return or postcondition: The result of allocate and the time it took in seconds.
+    :Time complexity: The time complexity of allocate.
+    :Aux space complexity: The aux space complexity of allocate.
+    """
+    timer = time.perf_counter()
+    result = allocate(preferences, licenses, method)
+    return result, time.perf_counter() - timer
+
+
+def allocate_many(instances: Iterable[Tuple[List[List[int]], List[int]]], workers: Optional[int] = None,
+                  method: str = "ford_fulkerson") -> List[Tuple[Optional[List[List[int]]], float]]:
+    """
+    Function description:
+    Solves many independent allocation instances, spread over a pool of worker processes.
+
+    Approach description (if main function):
+    The instances are handed to a ProcessPoolExecutor in chunks, so each worker receives a batch of instances per
+    message instead of one, which keeps the pickling and messaging overhead low next to the solving. map returns
+    the results in the order of the instances. With one worker, or a single instance, no pool is started and the
+    instances are solved in this process.
+
+    :Input:
+    instances: The (preferences, licenses) pairs to solve.
+    workers: The number of worker processes, by default the number of CPUs.
+    method: The max-flow engine, one of the names in MAX_FLOW_METHODS.
+
+    :Output, return or postcondition:
+    Returns, for every instance in order, the result of allocate and the time solving it took in seconds.
+
+    :Time complexity: The sum of the time complexities of allocate for the instances, divided over the workers.
+    :Aux space complexity: O(total size of the instances) for the batches and the results.
+    """
+    if method not in MAX_FLOW_METHODS:
+        raise ValueError(f"unknown max-flow method {method!r}, expected one of {sorted(MAX_FLOW_METHODS)}")
+    instances = list(instances)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(instances) <= 1:
+        return [allocate_timed(preferences, licenses, method) for preferences, licenses in instances]
+    # A few chunks per worker evens out instances of different sizes
+    chunksize = max(1, len(instances) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=min(workers, len(instances))) as pool:
+        return list(pool.map(allocate_timed, [preferences for preferences, _ in instances],
+                             [licenses for _, licenses in instances], repeat(method, len(instances)),
+                             chunksize=chunksize))
+
+
+class Allocator:
+    def __init__(self, preferences: List[List[int]], licenses: List[int], method: str = "dinic"):
+        """
+        Function description:
+        Initializes an Allocator, which keeps the flow network of an allocation and its current flow so the
+        allocation can be updated as people are added or removed or change their preferences or licence.
+
+        Approach description (if main function):
+        The network is built once with create_network, seeded with greedyFlow like allocate does and solved with the
+        chosen max-flow engine, Dinic's algorithm by default. A change cancels only the flow of the people it affects:
+        in this network every unit of flow goes source, person, d or c vertex, (e,) sink, so a person is unrouted by
+        taking one unit off the four or five edges of their route. Edges are never deleted, an edge that no longer
+        exists gets capacity 0 and new edges are appended. The number of destinations follows ceil(n/5) of the people
+        present, destinations beyond it are closed by setting the capacity of their d and c edges to 0 after
+        unrouting their people, and the capacity of the e to sink edge follows n - 2×ceil(n/5). The max-flow engine
+        then augments from the remaining flow, which is a valid flow, so it only has to place the few people who were
+        unrouted or added.
+
+        :Input:
+        preferences: List of lists. Each inner list indicates preferences of a person.
+        licenses: List of indices indicating which persons have licenses.
+        method: The max-flow engine, one of the names in MAX_FLOW_METHODS.
+
+        :Output, return or postcondition: Creates the allocator with the attributes being network, method, flow,
+        count (the number of people present), preferences, licensed and active (indexed by person) and the vertex
+        and edge numbers of the people and destinations.
+        :Time complexity: O(n + P) to build the network, P being the total length of the preferences, plus the
+        complexity of the max-flow engine.
+        :Aux space complexity: O(n + P) for the network.
+        """
+        if method not in MAX_FLOW_METHODS:
+            raise ValueError(f"unknown max-flow method {method!r}, expected one of {sorted(MAX_FLOW_METHODS)}")
+        self.method = method
+        self.network = network = FlowNetwork()
+        network.create_network(preferences, licenses)
+        n = len(preferences)
+        licensed = set(licenses)
+        self.preferences = [list(pref) for pref in preferences]
+        self.licensed = [i in licensed for i in range(n)]
+        self.active = [True] * n
+        self.count = n
+        self.persons = list(range(2, 2 + n))
+        self.person_of = {vertex: i for i, vertex in enumerate(self.persons)}
+        self.source_edges = list(range(0, 2 * n, 2))
+
+        # Destination vertices, and the edges every unit of flow through them takes to the sink
+        self.e = network.getVertex("e")
+        self.e_edge = network.findEdge(self.e, 1)
+        self.drivers = []
+        self.driver_vertices = set()
+        self.cars = []
+        self.onward = {}
+        self.destination = {}
+        for j in range(network.destinations):
+            self.add_destination(network.getVertex(f"d{j}"), network.getVertex(f"c{j}"))
+        self.open = network.destinations
+        network.greedyFlow(preferences, licenses)
+        self.flow = network.calculateMaxFlow(method)
+
+    def add_destination(self, driver: int, car: int) -> None:
+        """
+        Function description:
+        Records the d and c vertex of the next destination.
+
+        :Input:
+        driver: The number of the d vertex.
+        car: The number of the c vertex.
+        :Output, return or postcondition: The destination can be found from its vertices and its vertices from it.
+        :Time complexity: O(D). D is the number of edges out of the two vertices.
+        :Aux space complexity: O(1)
+        """
+        j = len(self.drivers)
+        self.drivers.append(driver)
+        self.driver_vertices.add(driver)
+        self.cars.append(car)
+        self.onward[driver] = [self.network.findEdge(driver, 1)]
+        self.onward[car] = [self.network.findEdge(car, self.e), self.e_edge]
+        self.destination[driver] = self.destination[car] = j
+
+    def check_person(self, person: int) -> None:
+        """
+        Function description:
+        Raises IndexError unless the person is present.
+
+        :Input:
+        person: The number of the person.
+        :Time complexity: O(1)
+        :Aux space complexity: O(1)
+        """
+        if not 0 <= person < len(self.active) or not self.active[person]:
+            raise IndexError(f"there is no person {person}")
+
+    def check_preferences(self, preferences: List[int], destinations: int) -> None:
+        """
+        Function description:
+        Raises IndexError unless every preference is one of the destinations.
+
+        :Input:
+        preferences: The preferences of a person.
+        destinations: The number of destinations.
+        :Time complexity: O(P). P is the number of preferences.
+        :Aux space complexity: O(1)
+        """
+        for p in preferences:
+            if not 0 <= p < destinations:
+                raise IndexError(f"preferences must be destinations 0 to {destinations - 1}")
+
+    def route(self, person: int) -> int:
+        """
+        Function description:
+        Finds the edge from a person to the d or c vertex their flow goes through.
+
+        :Input:
+        person: The number of the person.
+        :Output, return or postcondition: The edge number, or -1 if the person is not routed.
+        :Time complexity: O(D). D is the number of edges out of the person.
+        :Aux space complexity: O(1)
+        """
+        network = self.network
+        if network.flow[self.source_edges[person]] == 0:
+            return -1
+        edge = network.head[self.persons[person]]
+        # The edges a person adds are the even ones, the odd one is the reverse of their source edge
+        while edge != -1 and not (edge % 2 == 0 and network.flow[edge] > 0):
+            edge = network.next[edge]
+        return edge
+
+    def unroute(self, person: int) -> int:
+        """
+        Function description:
+        Cancels the unit of flow of a person, if they are routed.
+
+        :Input:
+        person: The number of the person.
+        :Output, return or postcondition: Returns 1 if a unit of flow was cancelled, else 0.
+        :Time complexity: O(D). D is the number of edges out of the person.
+        :Aux space complexity: O(1)
+        """
+        edge = self.route(person)
+        if edge == -1:
+            return 0
+        flow = self.network.flow
+        for path_edge in [self.source_edges[person], edge] + self.onward[self.network.to[edge]]:
+            flow[path_edge] -= 1
+            flow[path_edge ^ 1] += 1
+        self.flow -= 1
+        return 1
+
+    def unroute_into(self, vertex: int, limit: int) -> int:
+        """
+        Function description:
+        Cancels the flow of people routed through a d or c vertex.
+
+        :Input:
+        vertex: The number of the d or c vertex.
+        limit: The most people to unroute.
+        :Output, return or postcondition: Returns the number of people unrouted.
+        :Time complexity: O(D). D is the number of edges out of the vertex.
+        :Aux space complexity: O(D) for the edges of the vertex.
+        """
+        done = 0
+        for edge in self.network.edgesOf(vertex):
+            if done == limit:
+                break
+            # A reverse edge with negative flow comes from a person routed through the vertex
+            if edge % 2 == 1 and self.network.flow[edge] < 0:
+                done += self.unroute(self.person_of[self.network.to[edge]])
+        return done
+
+    def connect(self, person: int) -> None:
+        """
+        Function description:
+        Adds the edges from a person to the d vertices (if they have a licence) and c vertices they prefer.
+
+        :Input:
+        person: The number of the person.
+        :Time complexity: O(P). P is the number of preferences of the person.
+        :Aux space complexity: O(1)
+        """
+        vertex = self.persons[person]
+        if self.licensed[person]:
+            for p in self.preferences[person]:
+                self.network.addEdgeById(vertex, self.drivers[p], 1)
+        for p in self.preferences[person]:
+            self.network.addEdgeById(vertex, self.cars[p], 1)
+
+    def disconnect(self, person: int, drivers_only: bool = False) -> None:
+        """
+        Function description:
+        Sets the capacity of the edges from an unrouted person to the d and c vertices to 0.
+
+        :Input:
+        person: The number of the person.
+        drivers_only: If True only the edges to d vertices are closed.
+        :Time complexity: O(D). D is the number of edges out of the person.
+        :Aux space complexity: O(1)
+        """
+        network = self.network
+        edge = network.head[self.persons[person]]
+        while edge != -1:
+            if edge % 2 == 0 and (not drivers_only or network.to[edge] in self.driver_vertices):
+                network.capacity[edge] = 0
+            edge = network.next[edge]
+
+    def resize(self, count: int) -> None:
+        """
+        Function description:
+        Updates the number of people present, opening or closing destinations so there are ceil(count/5), and sets
+        the capacity of the e to sink edge to count - 2×ceil(count/5), unrouting people whose flow no longer fits.
+
+        :Input:
+        count: The new number of people present.
+        :Time complexity: O(D + E_d). D being the number of destinations ever opened and E_d the number of edges out
+        of the closed destinations.
+        :Aux space complexity: O(1)
+        """
+        network = self.network
+        destinations = math.ceil(count / 5)
+        # Close destinations that no longer exist
+        for j in range(destinations, self.open):
+            for vertex in (self.drivers[j], self.cars[j]):
+                self.unroute_into(vertex, -1)
+                network.capacity[self.onward[vertex][0]] = 0
+        # Open new destinations, making their vertices the first time
+        for j in range(self.open, destinations):
+            if j == len(self.drivers):
+                driver = network.addVertex(f"d{j}")
+                network.addEdgeById(driver, 1, 0)
+                car = network.addVertex(f"c{j}")
+                network.addEdgeById(car, self.e, 0)
+                self.add_destination(driver, car)
+            network.capacity[self.onward[self.drivers[j]][0]] = 2
+            network.capacity[self.onward[self.cars[j]][0]] = 3
+        self.open = destinations
+        self.count = count
+        # Unroute passengers until the e to sink edge has room for them
+        capacity = max(0, count - 2 * destinations)
+        for car in self.cars[:destinations]:
+            excess = network.flow[self.e_edge] - capacity
+            if excess <= 0:
+                break
+            self.unroute_into(car, excess)
+        network.capacity[self.e_edge] = capacity
+
+    def reaugment(self) -> None:
+        """
+        Function description:
+        Runs the max-flow engine from the current flow.
+
+        :Time complexity: O(k×E) for Ford-Fulkerson, k being the number of people unrouted or added since the
+        flow was last maximum and E the number of edges.
+        :Aux space complexity: O(V) for the search.
+        """
+        self.flow = self.network.calculateMaxFlow(self.method)
+
+    def add_person(self, preferences: List[int], licensed: bool = False) -> int:
+        """
+        Function description:
+        Adds a person and updates the allocation.
+
+        :Input:
+        preferences: The destinations the person prefers.
+        licensed: Whether the person has a licence.
+        :Output, return or postcondition: Returns the number of the new person. Raises IndexError if a preference is
+        not a destination, counting the one the new person may open.
+        :Time complexity: O(P + D) plus reaugment. P is the number of preferences and D the number of destinations.
+        :Aux space complexity: O(P) for the new edges.
+        """
+        self.check_preferences(preferences, math.ceil((self.count + 1) / 5))
+        self.resize(self.count + 1)
+        person = len(self.preferences)
+        self.preferences.append(list(preferences))
+        self.licensed.append(licensed)
+        self.active.append(True)
+        vertex = self.network.addVertex(str(person))
+        self.persons.append(vertex)
+        self.person_of[vertex] = person
+        self.source_edges.append(self.network.addEdgeById(0, vertex, 1))
+        self.connect(person)
+        self.reaugment()
+        return person
+
+    def remove_person(self, person: int) -> None:
+        """
+        Function description:
+        Removes a person and updates the allocation. The numbers of the other people do not change.
+
+        :Input:
+        person: The number of the person. Raises IndexError if they are not present.
+        :Time complexity: O(D) plus reaugment. D is the number of edges out of the person and the destinations.
+        :Aux space complexity: O(1)
+        """
+        self.check_person(person)
+        self.unroute(person)
+        self.disconnect(person)
+        self.network.capacity[self.source_edges[person]] = 0
+        self.active[person] = False
+        self.resize(self.count - 1)
+        self.reaugment()
+
+    def change_preferences(self, person: int, preferences: List[int]) -> None:
+        """
+        Function description:
+        Replaces the preferences of a person and updates the allocation.
+
+        :Input:
+        person: The number of the person. Raises IndexError if they are not present.
+        preferences: The destinations the person now prefers. Raises IndexError if one is not a destination.
+        :Time complexity: O(D + P) plus reaugment. D is the number of edges out of the person and P the number of
+        preferences.
+        :Aux space complexity: O(P) for the new edges.
+        """
+        self.check_person(person)
+        self.check_preferences(preferences, self.open)
+        self.unroute(person)
+        self.disconnect(person)
+        self.preferences[person] = list(preferences)
+        self.connect(person)
+        self.reaugment()
+
+    def change_licence(self, person: int, licensed: bool) -> None:
+        """
+        Function description:
+        Gives a person a licence or takes it away and updates the allocation. Only a person driving loses their
+        place when their licence is taken away.
 
+        :Input:
+        person: The number of the person. Raises IndexError if they are not present.
+        licensed: Whether the person now has a licence.
+        :Time complexity: O(D + P) plus reaugment. D is the number of edges out of the person and P the number of
+        preferences.
+        :Aux space complexity: O(P) for the new edges.
+        """
+        self.check_person(person)
+        if self.licensed[person] == licensed:
+            return
+        self.licensed[person] = licensed
+        vertex = self.persons[person]
+        if licensed:
+            for p in self.preferences[person]:
+                self.network.addEdgeById(vertex, self.drivers[p], 1)
+        else:
+            edge = self.route(person)
+            if edge != -1 and self.network.to[edge] in self.driver_vertices:
+                self.unroute(person)
+            self.disconnect(person, drivers_only=True)
+        self.reaugment()
 
+    def results(self) -> Optional[List[List[int]]]:
+        """
+        Function description:
+        Returns the current allocation, in the same form as allocate, with the numbers of the people.
+
+        :Output, return or postcondition: A list of lists where each inner list represents a car's allocation of
+        people, or None if allocation is not possible.
+        :Time complexity: O(n + E). n being the number of people ever added and E the number of edges out of them.
+        :Aux space complexity: O(D). D being the amount of destinations, for the lists of the cars.
+        """
+        if self.count < 2 or self.flow < self.count:
+            return None
+        cars = [[] for _ in range(self.open)]
+        for person, active in enumerate(self.active):
+            if active:
+                cars[self.destination[self.network.to[self.route(person)]]].append(person)
+        return [car for car in cars if car]
@@ -0,0 +1,414 @@
+"""
+    Benchmarks for the car allocation flow network.
+
+    Run with: python bench_allocate.py
+    Scaling suite over instance families: python bench_allocate.py --suite [--sizes 10 100 ... 100000] [--json out.json]
+    Trace of one allocate call: python bench_allocate.py --trace trace.json [--stacks stacks.txt] [--profile out.prof]
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from assignment2 import (MAX_FLOW_METHODS, Allocator, FlowNetwork, Tracer, allocate, allocate_many, allocate_min_cost,
+                         infeasibility_report)
+from bench_trie import best_time
+
+
+def random_instance(people: int, choices: int = 3, licensed: float = 0.5,
+                    seed: int = 0) -> Tuple[List[List[int]], List[int]]:
+    """
+    Function description:
+    Generates a random allocation instance with ceil(people / 5) destinations.
+
+    :Input:
+    people: The number of people.
+    choices: The largest number of destinations a person prefers.
+    licensed: The fraction of people with a licence.
+    seed: Seed for the random generator.
+    :Output, return or postcondition: The preferences and the licences.
+    """
+    generator = random.Random(seed)
+    destinations = math.ceil(people / 5)
+    preferences = [generator.sample(range(destinations), generator.randint(1, min(choices, destinations)))
+                   for _ in range(people)]
+    licences = [i for i in range(people) if generator.random() < licensed]
+    return preferences, licences
+
+
+def feasible_instance(people: int, choices: int = 3, licensed: float = 0.5,
+                      seed: int = 0) -> Tuple[List[List[int]], List[int]]:
+    """
+    Function description:
+    Generates a random allocation instance that has an allocation, by first splitting the people into
+    ceil(people / 5) cars of 2 to 5 with 2 drivers each, then hiding that allocation among extra random preferences
+    and licences.
+
+    :Input:
+    people: The number of people, at least 2.
+    choices: The largest number of destinations a person prefers.
+    licensed: The fraction of the other people with a licence.
+    seed: Seed for the random generator.
+    :Output, return or postcondition: The preferences and the licences.
+    """
+    generator = random.Random(seed)
+    destinations = math.ceil(people / 5)
+    # Every car gets 2 people, the rest are spread over the free seats
+    cars = [j for j in range(destinations) for _ in range(2)]
+    extra = [j for j in range(destinations) for _ in range(3)]
+    generator.shuffle(extra)
+    cars.extend(extra[:people - 2 * destinations])
+    order = list(range(people))
+    generator.shuffle(order)
+    preferences = [[] for _ in range(people)]
+    licences = set()
+    drivers = [0] * destinations
+    for person, car in zip(order, cars):
+        others = generator.sample(range(destinations), min(destinations, generator.randint(1, choices)))
+        preferences[person] = [car] + [p for p in others if p != car][:choices - 1]
+        generator.shuffle(preferences[person])
+        if drivers[car] < 2:
+            drivers[car] += 1
+            licences.add(person)
+        elif generator.random() < licensed:
+            licences.add(person)
+    return preferences, sorted(licences)
+
+
+def infeasible_instance(people: int, choices: int = 3, licensed: float = 0.5,
+                        seed: int = 0) -> Tuple[List[List[int]], List[int]]:
+    """
+    Function description:
+    Generates an instance without an allocation from one of feasible_instance. With at least 4 destinations, 16
+    people are made to prefer exactly destinations 0, 1 and 2, whose cars seat 15; this passes the single and pair
+    checks of infeasibility_report, so max-flow has to find out. With fewer destinations, every licence but one among
+    the people preferring destination 0 is taken away, which the pre-checks reject.
+
+    :Input:
+    people: The number of people, at least 2.
+    choices, licensed, seed: As for feasible_instance.
+    :Output, return or postcondition: The preferences and the licences.
+    """
+    preferences, licences = feasible_instance(people, choices, licensed, seed)
+    if math.ceil(people / 5) >= 4:
+        for person in random.Random(seed).sample(range(people), 16):
+            preferences[person] = [0, 1, 2]
+        return preferences, licences
+    wanting = {i for i, pref in enumerate(preferences) if 0 in pref}
+    keep = min(wanting & set(licences))
+    return preferences, [i for i in licences if i not in wanting or i == keep]
+
+
+# Instance families of the scaling suite: generator and its choices and licensed arguments
+FAMILIES = {f"{density}-{licences}-{kind}": (generator, choices, fraction)
+            for density, choices in (("sparse", 2), ("dense", 8))
+            for licences, fraction in (("few", 0.05), ("many", 0.8))
+            for kind, generator in (("feasible", feasible_instance), ("infeasible", infeasible_instance))}
+
+# The phases allocate goes through, in order
+PHASES = ["precheck", "build", "greedy", "maxflow", "results"]
+
+
+def time_phases(preferences: List[List[int]], licences: List[int], method: str = "dinic") -> Dict[str, object]:
+    """
+    Function description:
+    Runs the phases of allocate one at a time and times each: infeasibility_report, create_network, greedyFlow,
+    calculateMaxFlow and getResults. Phases after the one that shows the instance infeasible are not run.
+
+    :Input:
+    preferences: The preferences of the instance.
+    licences: The licences of the instance.
+    method: The max-flow engine.
+    :Output, return or postcondition: The time of every phase run in seconds, and whether an allocation exists.
+    """
+    clock = time.perf_counter
+    seconds = {}
+    timer = clock()
+    rejected = bool(infeasibility_report(preferences, licences))
+    seconds["precheck"] = clock() - timer
+    feasible = False
+    if not rejected:
+        network = FlowNetwork()
+        timer = clock()
+        network.create_network(preferences, licences)
+        seconds["build"] = clock() - timer
+        timer = clock()
+        network.greedyFlow(preferences, licences)
+        seconds["greedy"] = clock() - timer
+        timer = clock()
+        feasible = network.calculateMaxFlow(method) == len(preferences)
+        seconds["maxflow"] = clock() - timer
+        if feasible:
+            timer = clock()
+            network.getResults()
+            seconds["results"] = clock() - timer
+    return {"seconds": seconds, "feasible": feasible}
+
+
+def bench_scaling(sizes: List[int], families: Optional[List[str]] = None, method: str = "dinic",
+                  output: Optional[str] = None) -> Dict[str, List[Dict[str, object]]]:
+    """
+    Function description:
+    Times the phases of allocate on every instance family at every size and prints the scaling curves: a table per
+    family with the time of each phase, the phase that dominates and the growth exponent of the total time between
+    consecutive sizes (1 is linear, 2 quadratic). Optionally saves the curves as JSON.
+
+    :Input:
+    sizes: The numbers of people, in increasing order.
+    families: The names of the families in FAMILIES to run, all by default.
+    method: The max-flow engine.
+    output: Path of the JSON file to write, if any.
+    :Output, return or postcondition: The measurements of every family, one per size.
+    """
+    curves = {}
+    for family in families or list(FAMILIES):
+        generator, choices, fraction = FAMILIES[family]
+        print(f"{family} ({method})")
+        print(f"{'people':>8} " + " ".join(f"{phase:>9}" for phase in PHASES) + f" {'total':>9} {'dominant':>9} "
+              f"{'exponent':>8} feasible")
+        curve = []
+        for people in sizes:
+            preferences, licences = generator(people, choices, fraction, seed=people)
+            point = time_phases(preferences, licences, method)
+            point["people"] = people
+            total = sum(point["seconds"].values())
+            dominant = max(point["seconds"], key=point["seconds"].get)
+            exponent = ""
+            if curve and curve[-1]["total"] > 0 and total > 0:
+                exponent = f"{math.log(total / curve[-1]['total']) / math.log(people / curve[-1]['people']):.2f}"
+            point["total"] = total
+            curve.append(point)
+            print(f"{people:>8} " + " ".join(f"{point['seconds'][phase]:>9.4f}" if phase in point["seconds"]
+                                             else f"{'-':>9}" for phase in PHASES)
+                  + f" {total:>9.4f} {dominant:>9} {exponent:>8} {point['feasible']}")
+        curves[family] = curve
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as outfile:
+            json.dump({"method": method, "sizes": sizes, "families": curves}, outfile, indent=2)
+    return curves
+
+
+def bench_get_path(sizes: List[int]) -> None:
+    """
+    Function description:
+    Measures the time and the peak memory allocated by one augmenting path search on the network of a fresh
+    instance, and the time of a whole Ford-Fulkerson allocation, for several numbers of people. The instances have
+    an allocation, so allocate runs the flow instead of stopping at infeasibility_report.
+
+    :Input:
+    sizes: The numbers of people to try.
+    :Output, return or postcondition: Prints one line per size.
+    """
+    for people in sizes:
+        preferences, licences = feasible_instance(people, seed=people)
+        assert not infeasibility_report(preferences, licences)
+        network = FlowNetwork()
+        network.create_network(preferences, licences)
+        tracemalloc.start()
+        timer = time.perf_counter()
+        network.getPath(0, 1)
+        search = time.perf_counter() - timer
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        timer = time.perf_counter()
+        allocate(preferences, licences)
+        total = time.perf_counter() - timer
+        print(f"{people:>6} people: getPath {search * 1000:8.3f}ms, peak {peak / 1024:8.1f}KiB, "
+              f"allocate {total:.3f}s")
+
+
+def bench_create_network(people: int, choices: int = 3) -> None:
+    """
+    Function description:
+    Measures how long create_network takes to build the network of a random instance.
+
+    :Input:
+    people: The number of people, with ceil(people / 5) destinations.
+    choices: The largest number of destinations a person prefers.
+    :Output, return or postcondition: Prints the build time and the size of the network.
+    """
+    preferences, licences = random_instance(people, choices)
+    network = FlowNetwork()
+    build = best_time(lambda: FlowNetwork().create_network(preferences, licences), 3)
+    network.create_network(preferences, licences)
+    print(f"create_network: {build:.3f}s for {people} people, {len(network.names)} vertices, "
+          f"{len(network.to) // 2} edges")
+
+
+def bench_incremental(people: int, changes: int = 20) -> None:
+    """
+    Function description:
+    Compares solving an instance that has an allocation from scratch with updating an Allocator after one person
+    changes their preferences.
+
+    :Input:
+    people: The number of people.
+    changes: The number of preference changes to average over.
+    :Output, return or postcondition: Prints both timings and the time to build the Allocator.
+    """
+    preferences, licences = feasible_instance(people, seed=people)
+    assert not infeasibility_report(preferences, licences)
+    generator = random.Random(people)
+    timer = time.perf_counter()
+    allocator = Allocator(preferences, licences)
+    build = time.perf_counter() - timer
+    timer = time.perf_counter()
+    for _ in range(changes):
+        allocator.change_preferences(generator.randrange(people), generator.sample(range(allocator.open), 2))
+    change = (time.perf_counter() - timer) / changes
+    scratch = best_time(lambda: allocate(preferences, licences, "dinic"), 3)
+    print(f"{people:>6} people: allocate (dinic) {scratch:.4f}s, Allocator {build:.4f}s to build, "
+          f"change_preferences {change:.4f}s")
+
+
+def bench_allocate_many(instances: int, people: int, workers: List[int]) -> None:
+    """
+    Function description:
+    Measures the wall clock time of allocate_many over a batch of instances that have an allocation, for several
+    numbers of workers.
+
+    :Input:
+    instances: The number of instances in the batch.
+    people: The number of people in every instance.
+    workers: The numbers of worker processes to try.
+    :Output, return or postcondition: Prints the wall clock time and the summed solving time for every number of
+    workers.
+    """
+    batch = [feasible_instance(people, seed=seed) for seed in range(instances)]
+    assert not any(infeasibility_report(*instance) for instance in batch)
+    for count in workers:
+        timer = time.perf_counter()
+        results = allocate_many(batch, count, "dinic")
+        wall = time.perf_counter() - timer
+        print(f"{count} worker(s): {wall:.3f}s wall clock, {sum(seconds for _, seconds in results):.3f}s solving, "
+              f"{instances} instances of {people} people")
+
+
+def bench_warm_start(sizes: List[int]) -> None:
+    """
+    Function description:
+    Compares allocate with and without the greedy warm start for every max-flow engine, on instances that have an
+    allocation.
+
+    :Input:
+    sizes: The numbers of people to try.
+    :Output, return or postcondition: Prints the timings and how many people the greedy pass seats.
+    """
+    for people in sizes:
+        preferences, licences = feasible_instance(people, seed=people)
+        network = FlowNetwork()
+        network.create_network(preferences, licences)
+        seated = network.greedyFlow(preferences, licences)
+        timings = []
+        for method in MAX_FLOW_METHODS:
+            cold = best_time(lambda: allocate(preferences, licences, method, False), 1)
+            warm = best_time(lambda: allocate(preferences, licences, method, True), 1)
+            timings.append(f"{method} {cold:.3f}s -> {warm:.3f}s")
+        print(f"{people:>6} people, {seated} seated greedily: " + ", ".join(timings))
+
+
+def bench_min_cost(sizes: List[int]) -> None:
+    """
+    Function description:
+    Compares allocate_min_cost with allocate (Dinic) on instances that have an allocation.
+
+    :Input:
+    sizes: The numbers of people to try.
+    :Output, return or postcondition: Prints both timings and the total cost of the cheapest allocation.
+    """
+    for people in sizes:
+        preferences, licences = feasible_instance(people, seed=people)
+        plain = best_time(lambda: allocate(preferences, licences, "dinic"), 1)
+        timer = time.perf_counter()
+        _, cost = allocate_min_cost(preferences, licences)
+        ranked = time.perf_counter() - timer
+        print(f"{people:>6} people: allocate (dinic) {plain:.3f}s, allocate_min_cost {ranked:.3f}s, cost {cost}")
+
+
+def bench_engines_infeasible(sizes: List[int], slow_limit: int = 2000) -> None:
+    """
+    Function description:
+    Times every max-flow engine on random instances, which mostly have no allocation, so some of the flow the source
+    sends cannot reach the sink. The engines run on the network directly, since infeasibility_report would often
+    reject the instance first.
+
+    :Input:
+    sizes: The numbers of people to try.
+    slow_limit: The largest number of people Ford-Fulkerson, which takes minutes on 10000 people, is run on.
+    :Output, return or postcondition: Prints the flow and the time of every engine.
+    """
+    for people in sizes:
+        preferences, licences = random_instance(people, seed=people)
+        timings = []
+        for method in MAX_FLOW_METHODS:
+            if method == "ford_fulkerson" and people > slow_limit:
+                continue
+            network = FlowNetwork()
+            network.create_network(preferences, licences)
+            timer = time.perf_counter()
+            flow = network.calculateMaxFlow(method)
+            timings.append(f"{method} {time.perf_counter() - timer:.3f}s")
+        print(f"{people:>6} people, flow {flow} ({'feasible' if flow == people else 'infeasible'}): "
+              + ", ".join(timings))
+
+
+def trace_allocate(people: int, method: str, trace: str, stacks: Optional[str] = None,
+                   profile: Optional[str] = None) -> None:
+    """
+    Function description:
+    Traces one allocate call on a feasible instance and writes its spans as a Chrome trace, for chrome://tracing,
+    Perfetto or speedscope, and optionally as collapsed stacks for flamegraph.pl and as a cProfile file for pstats
+    or snakeviz.
+
+    :Input:
+    people: The number of people.
+    method: The max-flow engine.
+    trace: Path of the Chrome trace JSON file to write.
+    stacks: Path of the collapsed stacks file to write, if any.
+    profile: Path of the cProfile file to write, if any.
+    :Output, return or postcondition: Writes the files and prints the time of every phase.
+    """
+    preferences, licences = feasible_instance(people, seed=people)
+    tracer = Tracer(profile=profile is not None)
+    allocate(preferences, licences, method, tracer=tracer)
+    with open(trace, "w", encoding="utf-8") as outfile:
+        json.dump(tracer.chrome_trace(), outfile)
+    if stacks is not None:
+        with open(stacks, "w", encoding="utf-8") as outfile:
+            outfile.write(tracer.collapsed_stacks())
+    if profile is not None:
+        tracer.profiler.dump_stats(profile)
+    for span in tracer.spans:
+        if len(span["stack"]) <= 2:
+            print(f"{'  ' * (len(span['stack']) - 1)}{span['name']:<16} {span['end'] - span['start']:.4f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks for the car allocation flow network.")
+    parser.add_argument("--suite", action="store_true", help="run the scaling suite over instance families")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000],
+                        help="numbers of people for the suite")
+    parser.add_argument("--families", nargs="+", choices=list(FAMILIES), help="families for the suite, all by default")
+    parser.add_argument("--method", choices=list(MAX_FLOW_METHODS), default="dinic", help="max-flow engine")
+    parser.add_argument("--json", help="file to save the suite results to")
+    parser.add_argument("--trace", help="trace one allocate call into this Chrome trace file")
+    parser.add_argument("--people", type=int, default=10000, help="number of people of the traced instance")
+    parser.add_argument("--stacks", help="file to save the collapsed stacks of the trace to")
+    parser.add_argument("--profile", help="file to save the cProfile statistics of the trace to")
+    arguments = parser.parse_args()
+    if arguments.trace:
+        trace_allocate(arguments.people, arguments.method, arguments.trace, arguments.stacks, arguments.profile)
+    elif arguments.suite:
+        bench_scaling(arguments.sizes, arguments.families, arguments.method, arguments.json)
+    else:
+        bench_get_path([100, 1000, 3000])
+        bench_create_network(100000)
+        bench_incremental(5000)
+        bench_allocate_many(200, 500, [1, 2, 4])
+        bench_warm_start([100, 1000, 3000])
+        bench_min_cost([100, 1000, 5000])
+        bench_engines_infeasible([500, 2000, 10000])
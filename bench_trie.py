@@ -0,0 +1,405 @@
+"""
+    Benchmarks for the auto-complete Trie.
+
+    Run with: python bench_trie.py
+    Synthetic corpus suite: python bench_trie.py --suite [--sizes 10000 100000 1000000] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from assignment2 import Alphabet, CompactTrie, Trie, VersionedTrie, load_dictionary, load_trie
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then not reported
+    resource = None
+
+
+def best_time(function: Callable[[], object], repeat: int = 5) -> float:
+    """
+    Function description:
+    Runs a function several times and returns the fastest wall clock time, which is the least noisy estimate.
+
+    :Input:
+    function: The function to time. It takes no arguments.
+    repeat: How many times to run it.
+    :Output, return or postcondition: The fastest run time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        timer = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - timer)
+    return best
+
+
+def replay_prefixes(words: List[str], queries: int, seed: int = 0) -> List[str]:
+    """
+    Function description:
+    Builds a query log replay: words are picked with a skewed (Pareto) popularity and every keystroke of each word
+    becomes one prefix, like an auto-complete box sends them.
+
+    :Input:
+    words: The words of the dictionary.
+    queries: The number of words typed.
+    seed: Seed for the random generator.
+    :Output, return or postcondition: The list of prefixes in the order they were typed.
+    """
+    generator = random.Random(seed)
+    prefixes = []
+    for _ in range(queries):
+        word = words[min(int(generator.paretovariate(1.0)) - 1, len(words) - 1)]
+        prefixes.extend(word[:i] for i in range(1, len(word) + 1))
+    return prefixes
+
+
+def bench_insert_and_search(Dictionary: List[List], prefixes: List[str]) -> None:
+    """
+    Function description:
+    Microbenchmark of the insert and lookup engines: builds the Trie, runs prefix_search over the prefixes, and
+    inserts and searches one very long key.
+
+    :Input:
+    Dictionary: The dictionary to build the Trie from.
+    prefixes: The prefixes to search for.
+    :Output, return or postcondition: Prints the timings.
+    """
+    build = best_time(lambda: Trie(Dictionary))
+    myTrie = Trie(Dictionary)
+    search = best_time(lambda: [myTrie.prefix_search(prefix) for prefix in prefixes])
+    key = "ab" * 50000
+    timer = time.perf_counter()
+    myTrie.insert(key, [key, "long key", 1])
+    myTrie.prefix_search(key)
+    long_key = time.perf_counter() - timer
+    print(f"Trie construction:     {build:.4f}s for {len(Dictionary)} words")
+    print(f"prefix_search:         {search:.4f}s for {len(prefixes)} prefixes")
+    print(f"{len(key)} character key: {long_key:.4f}s to insert and search")
+
+
+def bench_prefix_search_many(myTrie: Trie, prefixes: List[str]) -> None:
+    """
+    Function description:
+    Compares prefix_search in a loop with one prefix_search_many call over the same prefixes.
+
+    :Input:
+    myTrie: The Trie to query.
+    prefixes: The prefixes to search for.
+    :Output, return or postcondition: Prints both timings and the speedup.
+    """
+    loop = best_time(lambda: [myTrie.prefix_search(prefix) for prefix in prefixes])
+    batch = best_time(lambda: myTrie.prefix_search_many(prefixes))
+    print(f"prefix_search loop:    {loop:.4f}s for {len(prefixes)} prefixes")
+    print(f"prefix_search_many:    {batch:.4f}s ({loop / batch:.1f}x)")
+
+
+def bench_load_trie(filename: str) -> None:
+    """
+    Function description:
+    Compares cold and warm starts of load_trie, for a Trie and for a CompactTrie. The dictionary is copied to a
+    temporary directory, so the caches of the original are left alone.
+
+    :Input:
+    filename: The dictionary file.
+    :Output, return or postcondition: Prints the time of every start.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        copy = os.path.join(directory, os.path.basename(filename))
+        shutil.copy(filename, copy)
+        for compact in (False, True):
+            timings = []
+            for start in ("cold", "warm"):
+                timer = time.perf_counter()
+                load_trie(copy, compact=compact)
+                timings.append(f"{start} {time.perf_counter() - timer:.3f}s")
+            print(f"load_trie ({'CompactTrie' if compact else 'Trie'}): " + ", ".join(timings))
+
+
+def bench_fuzzy_prefix_search(myTrie: Trie, prefixes: List[str], edits: List[int]) -> None:
+    """
+    Function description:
+    Measures the mean and p99 latency of fuzzy_prefix_search for several edit budgets.
+
+    :Input:
+    myTrie: The Trie to query.
+    prefixes: The prefixes to search for.
+    edits: The values of max_edits to try.
+    :Output, return or postcondition: Prints the latencies for every edit budget.
+    """
+    clock = time.perf_counter
+    for max_edits in edits:
+        latencies = []
+        for prefix in prefixes:
+            timer = clock()
+            myTrie.fuzzy_prefix_search(prefix, max_edits)
+            latencies.append(clock() - timer)
+        latencies.sort()
+        print(f"fuzzy_prefix_search, {max_edits} edit(s): mean {sum(latencies) / len(latencies) * 1000:.3f}ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.3f}ms")
+
+
+def bench_compact_trie(words: int = 100000, seed: int = 0) -> None:
+    """
+    Function description:
+    Compares the construction time and traced memory of a Trie and a CompactTrie over random words.
+
+    :Input:
+    words: The number of words.
+    seed: Seed for the random generator.
+    :Output, return or postcondition: Prints the build time and memory of both.
+    """
+    generator = random.Random(seed)
+    Dictionary = [["".join(generator.choices("abcdefghijklmnopqrstuvwxyz", k=generator.randint(3, 12))), "",
+                   generator.randint(1, 1000)] for _ in range(words)]
+    for structure in (Trie, CompactTrie):
+        build = best_time(lambda: structure(Dictionary), repeat=3)
+        tracemalloc.start()
+        built = structure(Dictionary)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del built
+        print(f"{structure.__name__} of {words} words: {build:.3f}s, {size / 2 ** 20:.1f}MiB")
+
+
+def bench_open_alphabet(words: int = 50000, characters: int = 3000, seed: int = 0) -> None:
+    """
+    Function description:
+    Compares the memory of a Trie over a large open alphabet, such as CJK text, with the default adaptive child
+    storage and with every node kept sparse.
+
+    :Input:
+    words: The number of words.
+    characters: The number of distinct characters, taken from the CJK unified ideographs block.
+    seed: Seed for the random generator.
+    :Output, return or postcondition: Prints the traced memory of both Tries.
+    """
+    generator = random.Random(seed)
+    letters = [chr(0x4E00 + i) for i in range(characters)]
+    # Common characters are used more often, like in real text
+    weights = [1 / rank for rank in range(1, characters + 1)]
+    Dictionary = [["".join(generator.choices(letters, weights, k=generator.randint(1, 4))), "", 1]
+                  for _ in range(words)]
+    sizes = []
+    for alphabet in (Alphabet(None), Alphabet(None, dense_threshold=characters + 1)):
+        tracemalloc.start()
+        myTrie = Trie(Dictionary, alphabet=alphabet)
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        del myTrie
+    print(f"{words} words over {characters} characters: {sizes[0] / 2 ** 20:.1f}MiB adaptive, "
+          f"{sizes[1] / 2 ** 20:.1f}MiB all sparse")
+
+
+def bench_concurrent_reads(Dictionary: List[List], prefixes: List[str], threads: List[int],
+                           duration: float = 1.0) -> None:
+    """
+    Function description:
+    Measures prefix_search throughput of a VersionedTrie for several numbers of reader threads while one writer
+    thread keeps calling update_frequency.
+
+    :Input:
+    Dictionary: The dictionary to build the Trie from.
+    prefixes: The prefixes the readers search for, round robin.
+    threads: The numbers of reader threads to try.
+    duration: How long each run lasts in seconds.
+    :Output, return or postcondition: Prints reads per second and updates per second for every number of readers.
+    """
+    myTrie = VersionedTrie(Dictionary)
+    words = [words[0] for words in Dictionary]
+    for count in threads:
+        stop = threading.Event()
+        reads = [0] * count
+        updates = [0]
+
+        def reader(position: int) -> None:
+            done = 0
+            mine = prefixes[position::count]
+            while not stop.is_set():
+                myTrie.prefix_search(mine[done % len(mine)])
+                done += 1
+            reads[position] = done
+
+        def writer() -> None:
+            generator = random.Random(count)
+            while not stop.is_set():
+                myTrie.update_frequency(generator.choice(words), generator.randint(1, 2000))
+                updates[0] += 1
+
+        workers = [threading.Thread(target=reader, args=(i,)) for i in range(count)]
+        workers.append(threading.Thread(target=writer))
+        timer = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        time.sleep(duration)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - timer
+        print(f"{count} reader thread(s): {sum(reads) / elapsed:>10.0f} reads/s, "
+              f"{updates[0] / elapsed:.0f} updates/s")
+
+
+def synthetic_dictionary(filename: str, words: int, seed: int = 0, exponent: float = 1.0) -> None:
+    """
+    Function description:
+    Writes a dictionary file in the format of Dictionary.txt with random lowercase words. Word lengths follow a log
+    normal distribution (median about 7, from 1 to 30 characters) and frequencies follow Zipf's law: the word of
+    popularity rank r gets frequency 10^6 / r^exponent, the ranks being shuffled over the file. Words may repeat,
+    like words inserted more than once. The file is written as it is generated, so any size fits in memory.
+
+    :Input:
+    filename: Path of the file to write.
+    words: The number of words.
+    seed: Seed for the random generator.
+    exponent: The Zipf exponent.
+    :Output, return or postcondition: Writes the file.
+    """
+    generator = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    ranks = list(range(1, words + 1))
+    generator.shuffle(ranks)
+    with open(filename, "w", encoding="utf-8") as outfile:
+        for rank in ranks:
+            length = min(30, max(1, int(generator.lognormvariate(1.95, 0.45))))
+            word = "".join(generator.choices(letters, k=length))
+            frequency = max(1, int(1000000 / rank ** exponent))
+            outfile.write(f"word: {word}\nfrequency: {frequency}\ndefinition: Synthetic word of rank {rank}.\n\n")
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Function description:
+    Returns a percentile of sorted values, by the nearest rank method.
+
+    :Input:
+    ordered: The values, sorted in increasing order.
+    fraction: The percentile as a fraction, 0.99 for p99.
+    :Output, return or postcondition: The value at that rank.
+    """
+    return ordered[min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.5) - 1))]
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Function description:
+    Returns the peak resident set size of this process in bytes, or None where the resource module is missing.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(filename: str, queries: int, seed: int = 0) -> Dict[str, float]:
+    """
+    Function description:
+    Measures load_dictionary, Trie construction and prefix_search on one dictionary file. Meant to run in a fresh
+    process, so the peak RSS belongs to this dictionary alone.
+
+    :Input:
+    filename: The dictionary file.
+    queries: The number of words typed for the prefix_search replay; every keystroke is one query.
+    seed: Seed for the replay.
+    :Output, return or postcondition: The measurements, times in seconds and throughputs per second.
+    """
+    timer = time.perf_counter()
+    Dictionary = load_dictionary(filename)
+    load = time.perf_counter() - timer
+    timer = time.perf_counter()
+    myTrie = Trie(Dictionary)
+    build = time.perf_counter() - timer
+    # Popular words are typed more often
+    words = [record[0] for record in sorted(Dictionary, key=lambda record: -record[2])]
+    prefixes = replay_prefixes(words, queries, seed)
+    latencies = []
+    clock = time.perf_counter
+    for prefix in prefixes:
+        timer = clock()
+        myTrie.prefix_search(prefix)
+        latencies.append(clock() - timer)
+    search = sum(latencies)
+    latencies.sort()
+    return {"words": len(Dictionary), "load_seconds": load, "load_words_per_second": len(Dictionary) / load,
+            "build_seconds": build, "build_words_per_second": len(Dictionary) / build,
+            "queries": len(prefixes), "search_queries_per_second": len(prefixes) / search,
+            "search_p50_seconds": percentile(latencies, 0.5), "search_p99_seconds": percentile(latencies, 0.99),
+            "peak_rss_bytes": peak_rss()}
+
+
+def bench_suite(sizes: List[int], queries: int = 2000, output: Optional[str] = None) -> List[Dict[str, float]]:
+    """
+    Function description:
+    Runs measure on a synthetic dictionary of every size, each in its own process, prints a table and optionally
+    saves the results with the commit and interpreter they were measured on as JSON, to compare commits.
+
+    :Input:
+    sizes: The numbers of words.
+    queries: The number of words typed for the prefix_search replay.
+    output: Path of the JSON file to write, if any.
+    :Output, return or postcondition: The list of measurements, one per size.
+    """
+    results = []
+    print(f"{'words':>10} {'load/s':>10} {'build/s':>10} {'queries/s':>10} {'p50 us':>8} {'p99 us':>8} "
+          f"{'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            filename = os.path.join(directory, f"synthetic_{size}.txt")
+            synthetic_dictionary(filename, size, seed=size)
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", filename,
+                                    "--queries", str(queries)], capture_output=True, text=True, check=True)
+            result = json.loads(child.stdout)
+            results.append(result)
+            os.remove(filename)
+            rss = "n/a" if result["peak_rss_bytes"] is None else f"{result['peak_rss_bytes'] / 2 ** 20:.1f}"
+            print(f"{size:>10} {result['load_words_per_second']:>10.0f} {result['build_words_per_second']:>10.0f} "
+                  f"{result['search_queries_per_second']:>10.0f} {result['search_p50_seconds'] * 1e6:>8.1f} "
+                  f"{result['search_p99_seconds'] * 1e6:>8.1f} {rss:>9}")
+    if output is not None:
+        try:
+            commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+        except OSError:
+            commit = None
+        with open(output, "w", encoding="utf-8") as outfile:
+            json.dump({"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+                       "queries": queries, "results": results}, outfile, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks for the auto-complete Trie.")
+    parser.add_argument("--suite", action="store_true", help="run the synthetic corpus suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="dictionary sizes for the suite, up to 10000000")
+    parser.add_argument("--queries", type=int, default=2000, help="words typed for the prefix_search replay")
+    parser.add_argument("--json", help="file to save the suite results to")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.measure:
+        print(json.dumps(measure(arguments.measure, arguments.queries)))
+    elif arguments.suite:
+        bench_suite(arguments.sizes, arguments.queries, arguments.json)
+    else:
+        Dictionary = load_dictionary("Dictionary.txt")
+        prefixes = replay_prefixes([words[0] for words in Dictionary], 5000)
+        bench_insert_and_search(Dictionary, prefixes)
+        bench_prefix_search_many(Trie(Dictionary), prefixes)
+        bench_load_trie("Dictionary.txt")
+        bench_fuzzy_prefix_search(Trie(Dictionary), prefixes[::10], [0, 1, 2])
+        bench_concurrent_reads(Dictionary, prefixes, [1, 2, 4, 8])
+        bench_compact_trie()
+        bench_open_alphabet()
@@ -7,8 +7,15 @@
 """
 
 import unittest
+import random
 import time
-from assignment2 import Trie, allocate
+import os
+import shutil
+import tempfile
+import threading
+from assignment2 import Trie, FlowNetwork, Allocator, Metrics, Tracer, CompactTrie, Alphabet, TrieSnapshot, \
+    VersionedTrie, PrefixCache, allocate, allocate_many, allocate_min_cost, infeasibility_report, iter_dictionary, \
+    load_trie, cache_path, save_snapshot
 
 # 1: Customized Auto-Complete
 
@@ -432,6 +439,490 @@ class TestingQ1(unittest.TestCase):
         self.assertEqual(frequency, 38616)
 
 
+# 1: Updates and Deletions
+
+class TestingUpdates(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = [['ab', 'first', 5], ['abc', 'second', 5], ['abd', 'third', 7], ['b', 'fourth', 1]]
+        myTrie = Trie(Dictionary, top_k=2)
+
+        # testing
+        self.assertTrue(myTrie.update_frequency('abd', 2))
+        self.assertEqual(myTrie.prefix_search('a'), ['ab', 'first', 3])
+        self.assertEqual(myTrie.prefix_search_topk('a'), [['ab', 'first', 5], ['abc', 'second', 5]])
+        self.assertTrue(myTrie.update_frequency('b', 9))
+        self.assertEqual(myTrie.prefix_search(''), ['b', 'fourth', 4])
+        self.assertFalse(myTrie.update_frequency('abe', 9))
+        self.assertFalse(myTrie.update_frequency('a', 9))
+
+    def test_02(self):
+
+        # initialising test
+        Dictionary = [['ab', 'first', 5], ['abc', 'second', 5], ['abd', 'third', 7], ['b', 'fourth', 1]]
+        myTrie = Trie(Dictionary, top_k=2)
+
+        # testing
+        self.assertTrue(myTrie.delete('abd'))
+        self.assertEqual(myTrie.prefix_search('abd'), [None, None, 0])
+        self.assertEqual(myTrie.prefix_search('ab'), ['ab', 'first', 2])
+        self.assertEqual(myTrie.prefix_search_topk(''), [['ab', 'first', 5], ['abc', 'second', 5]])
+        self.assertFalse(myTrie.delete('abd'))
+        self.assertTrue(myTrie.delete('ab'))
+        self.assertEqual(myTrie.prefix_search('ab'), ['abc', 'second', 1])
+        self.assertTrue(myTrie.delete('abc'))
+        self.assertTrue(myTrie.delete('b'))
+        self.assertEqual(myTrie.prefix_search(''), [None, None, 0])
+        self.assertEqual(myTrie.prefix_search('a'), [None, None, 0])
+
+    def test_03(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary)
+        for words in Dictionary[::3]:
+            myTrie.delete(words[0])
+        for words in Dictionary[1::3]:
+            myTrie.update_frequency(words[0], words[2] * 2)
+        expected = Trie([[words[0], words[1], words[2] * 2] for words in Dictionary[1::3]] + Dictionary[2::3])
+        prefixes = {words[0][:i] for words in Dictionary for i in range(len(words[0]) + 1)}
+
+        # testing
+        for prefix in prefixes:
+            self.assertEqual(myTrie.prefix_search(prefix), expected.prefix_search(prefix))
+
+
+# 1: Result Cache
+
+class TestingPrefixCache(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = [['ab', 'first', 5], ['abc', 'second', 5], ['b', 'third', 3]]
+        myTrie = Trie(Dictionary)
+        cache = PrefixCache(maxsize=2)
+        myTrie.set_cache(cache)
+
+        # testing
+        self.assertEqual(myTrie.prefix_search('a'), ['ab', 'first', 2])
+        self.assertEqual(myTrie.prefix_search('a'), ['ab', 'first', 2])
+        myTrie.prefix_search('b')
+        myTrie.prefix_search('c')
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 3, 'evictions': 1, 'expirations': 0,
+                                         'invalidations': 0, 'size': 2, 'maxsize': 2})
+        myTrie.insert('c', ['c', 'fourth', 1])
+        self.assertEqual(myTrie.prefix_search('c'), ['c', 'fourth', 1])
+        myTrie.prefix_search('')
+        myTrie.update_frequency('abc', 9)
+        self.assertEqual(myTrie.prefix_search(''), ['abc', 'second', 4])
+        myTrie.delete('abc')
+        self.assertEqual(myTrie.prefix_search('ab'), ['ab', 'first', 1])
+        self.assertEqual(cache.stats()['invalidations'], 3)
+
+    def test_02(self):
+
+        # initialising test
+        now = [0.0]
+        myTrie = Trie([['ab', 'first', 5]])
+        cache = PrefixCache(maxsize=10, ttl=5, clock=lambda: now[0])
+        myTrie.set_cache(cache)
+        myTrie.prefix_search('a')
+        now[0] = 4.0
+        myTrie.prefix_search('a')
+        now[0] = 9.5
+
+        # testing
+        self.assertEqual(myTrie.prefix_search('a'), ['ab', 'first', 1])
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        result = myTrie.prefix_search('a')
+        result[0] = 'changed'
+        self.assertEqual(myTrie.prefix_search('a'), ['ab', 'first', 1])
+
+
+# 1: Copy-on-Write Updates
+
+class TestingVersionedTrie(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = [['aa', 'first', 1], ['ab', 'second', 5], ['b', 'third', 3]]
+        myTrie = VersionedTrie(Dictionary, top_k=2)
+        before = myTrie.snapshot()
+        myTrie.update_frequency('aa', 10)
+        myTrie.insert('ac', ['ac', 'fourth', 7])
+        myTrie.delete('b')
+
+        # testing
+        self.assertEqual(myTrie.version, 3)
+        self.assertEqual(myTrie.prefix_search(''), ['aa', 'first', 3])
+        self.assertEqual(myTrie.prefix_search_topk('a'), [['aa', 'first', 10], ['ac', 'fourth', 7]])
+        self.assertEqual(before.prefix_search(''), ['ab', 'second', 3])
+        self.assertEqual(before.prefix_search_topk('a'), [['ab', 'second', 5], ['aa', 'first', 1]])
+        self.assertFalse(myTrie.delete('b'))
+        self.assertEqual(myTrie.version, 3)
+
+    def test_02(self):
+
+        # initialising test
+        Dictionary = [['aa', 'first', 1], ['ab', 'second', 5]]
+        myTrie = VersionedTrie(Dictionary, top_k=2)
+        errors = []
+
+        def reader():
+            for _ in range(2000):
+                view = myTrie.snapshot()
+                word = view.prefix_search('a')[0]
+                top = view.prefix_search_topk('a')
+                if word != top[0][0] or top[0][2] < top[1][2]:
+                    errors.append((word, top))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for frequency in range(2000):
+            myTrie.update_frequency('aa', frequency % 10)
+        for thread in threads:
+            thread.join()
+
+        # testing
+        self.assertEqual(errors, [])
+
+
+# 1: Alphabets
+
+class TestingAlphabet(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = [['Caf\u00e9', 'upper', 3], ['caf\u00e9', 'lower', 5], ['iPhone-15', 'phone', 9],
+                      ['\u6771\u4eac', 'tokyo', 4], ['\u6771\u5317', 'tohoku', 4]]
+        myTrie = Trie(Dictionary, alphabet=Alphabet(None))
+
+        # testing
+        self.assertEqual(myTrie.prefix_search('C'), ['Caf\u00e9', 'upper', 1])
+        self.assertEqual(myTrie.prefix_search('caf\u00e9'), ['caf\u00e9', 'lower', 1])
+        self.assertEqual(myTrie.prefix_search('iPhone-'), ['iPhone-15', 'phone', 1])
+        self.assertEqual(myTrie.prefix_search('\u6771'), ['\u6771\u4eac', 'tokyo', 2])
+        self.assertEqual(myTrie.prefix_search('x'), [None, None, 0])
+        self.assertEqual(myTrie.prefix_search(''), ['iPhone-15', 'phone', 5])
+
+    def test_02(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary)
+        sparseTrie = Trie(Dictionary, alphabet=Alphabet(dense_threshold=4))
+        prefixes = {words[0][:i] for words in Dictionary for i in range(len(words[0]) + 1)}
+
+        # testing
+        for prefix in prefixes | {'evtfq', 'siczn', 'zzzz'}:
+            self.assertEqual(sparseTrie.prefix_search(prefix), myTrie.prefix_search(prefix))
+
+    def test_03(self):
+
+        # initialising test
+        myTrie = Trie([['abc', 'lower', 1]])
+
+        # testing
+        self.assertRaises(ValueError, myTrie.insert, 'abC', ['abC', 'upper', 2])
+        self.assertEqual(myTrie.prefix_search('ab'), ['abc', 'lower', 1])
+        self.assertEqual(myTrie.prefix_search('aB'), [None, None, 0])
+
+    def test_04(self):
+
+        # initialising test
+        myTrie = Trie([['a', 'first', 1], ['b', 'second', 2], ['c', 'third', 3]],
+                      alphabet=Alphabet(None, dense_threshold=2))
+        root = myTrie.root
+        dense = (root.keys, len(root.link))
+        myTrie.insert('aefghijk', ['aefghijk', 'fourth', 4])
+        myTrie.insert('z', ['z', 'fifth', 5])
+
+        # testing
+        self.assertEqual(dense, (None, 4))
+        self.assertEqual(root.keys, [1, 2, 3, 11])
+        self.assertEqual(myTrie.prefix_search('z'), ['z', 'fifth', 1])
+        self.assertEqual(myTrie.prefix_search('c'), ['c', 'third', 1])
+        self.assertEqual(myTrie.prefix_search('ae'), ['aefghijk', 'fourth', 1])
+        self.assertEqual(myTrie.prefix_search(''), ['z', 'fifth', 5])
+
+    def test_05(self):
+
+        # initialising test
+        Dictionary = [['2024', 'year', 4], ['2025', 'next', 4], ['911', 'call', 7], ['2', 'two', 1]]
+        myTrie = Trie(Dictionary, alphabet=Alphabet('0123456789'))
+        mappedTrie = Trie(Dictionary, alphabet=Alphabet('0213456789'))
+
+        # testing
+        self.assertEqual(Alphabet().offset, ord('a') - 1)
+        self.assertEqual(myTrie.alphabet.offset, ord('0') - 1)
+        self.assertIsNone(mappedTrie.alphabet.offset)
+        self.assertRaises(ValueError, myTrie.insert, '20a', ['20a', 'letter', 9])
+        for prefix in ['', '2', '20', '202', '2025', '9', '3']:
+            self.assertEqual(myTrie.prefix_search(prefix), mappedTrie.prefix_search(prefix))
+        self.assertEqual(myTrie.prefix_search('20'), ['2024', 'year', 2])
+
+
+# 1: Long Keys
+
+class TestingLongKeys(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        key = 'ab' * 10000
+        myTrie = Trie([['abc', 'short', 3], [key, 'long', 2]])
+
+        # testing
+        self.assertEqual(myTrie.prefix_search(key), [key, 'long', 1])
+        self.assertEqual(myTrie.prefix_search(key[:5000]), [key, 'long', 1])
+        self.assertEqual(myTrie.prefix_search('ab'), ['abc', 'short', 2])
+        self.assertEqual(myTrie.prefix_search(key + 'a'), [None, None, 0])
+
+
+# 1: Batch Prefix Search
+
+class TestingPrefixSearchMany(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary)
+        prefixes = [words[0][:i] for words in Dictionary[::7] for i in range(len(words[0]), -1, -1)]
+        prefixes += ['evtfq', '', 'siczn', 'evtfq', 'zzzz', 'a']
+
+        # testing
+        self.assertEqual(myTrie.prefix_search_many(prefixes), [myTrie.prefix_search(prefix) for prefix in prefixes])
+        self.assertEqual(myTrie.prefix_search_many([]), [])
+
+
+# 1: Top-k Suggestions
+
+class TestingTopK(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary, top_k=10)
+
+        # testing
+        for prefix in ['', 'a', 'ab', 'b', 'mvn', 'q']:
+            expected = sorted([list(words) for words in Dictionary if words[0].startswith(prefix)],
+                              key=lambda words: (-words[2], words[0]))
+            self.assertEqual(myTrie.prefix_search_topk(prefix, 10), expected[:10])
+            self.assertEqual(myTrie.prefix_search_topk(prefix, 3), expected[:3])
+        self.assertEqual(myTrie.prefix_search_topk('evtfq'), [])
+
+    def test_02(self):
+
+        # initialising test
+        Dictionary = [['ab', 'first', 5], ['abc', 'second', 5], ['abd', 'third', 7], ['b', 'fourth', 1]]
+        myTrie = Trie(Dictionary, top_k=2)
+        myTrie.insert('abd', ['abd', 'third', 9])
+
+        # testing
+        self.assertEqual(myTrie.prefix_search_topk('a'), [['abd', 'third', 9], ['ab', 'first', 5]])
+        self.assertEqual(myTrie.prefix_search_topk('abc'), [['abc', 'second', 5]])
+        self.assertEqual(myTrie.prefix_search_topk('abd', 1), [['abd', 'third', 9]])
+        self.assertRaises(ValueError, myTrie.prefix_search_topk, 'a', 3)
+
+    def test_03(self):
+
+        # initialising test
+        myTrie = Trie([['a', 'x', 10], ['b', 'y', 5]], top_k=1)
+        myTrie.insert('a', ['a', 'x', 1])
+        otherTrie = Trie([['aa', 'x', 10], ['ab', 'y', 5], ['ac', 'z', 4]], top_k=2)
+        otherTrie.insert('aa', ['aa', 'new', 1])
+        otherTrie.insert('ac', ['ac', 'z', 6])
+
+        # testing
+        # A word inserted again keeps its highest frequency, like prefix_search does
+        self.assertEqual(myTrie.prefix_search_topk(''), [['a', 'x', 10]])
+        self.assertEqual(myTrie.prefix_search(''), ['a', 'x', 3])
+        self.assertEqual(otherTrie.prefix_search_topk(''), [['aa', 'x', 10], ['ac', 'z', 6]])
+        self.assertEqual(otherTrie.prefix_search_topk('aa'), [['aa', 'x', 10]])
+        for prefix in ['', 'a', 'aa', 'ab', 'ac']:
+            self.assertEqual(otherTrie.prefix_search_topk(prefix, 1)[0][:2], otherTrie.prefix_search(prefix)[:2])
+        otherTrie.delete('aa')
+        self.assertEqual(otherTrie.prefix_search_topk(''), [['ac', 'z', 6], ['ab', 'y', 5]])
+
+    def test_04(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary, top_k=1)
+        for words in Dictionary[::5]:
+            myTrie.insert(words[0], [words[0], 'again', words[2] // 2])
+        for words in Dictionary[1::5]:
+            myTrie.insert(words[0], [words[0], 'again', words[2] * 2])
+
+        # testing
+        for prefix in {words[0][:i] for words in Dictionary[::3] for i in range(len(words[0]) + 1)}:
+            self.assertEqual(myTrie.prefix_search_topk(prefix)[0][:2], myTrie.prefix_search(prefix)[:2])
+
+
+# 1: Fuzzy Prefix Search
+
+class TestingFuzzyPrefixSearch(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = [['cat', 'a', 5], ['car', 'b', 7], ['cart', 'c', 2], ['dog', 'd', 7], ['cot', 'e', 1]]
+        myTrie = Trie(Dictionary)
+
+        # testing
+        self.assertEqual(myTrie.fuzzy_prefix_search('cat', 0), ['cat', 'a', 1])
+        self.assertEqual(myTrie.fuzzy_prefix_search('cat', 1), ['car', 'b', 4])
+        self.assertEqual(myTrie.fuzzy_prefix_search('dgo', 1), ['dog', 'd', 1])
+        self.assertEqual(myTrie.fuzzy_prefix_search('xyz', 2), [None, None, 0])
+        self.assertEqual(myTrie.fuzzy_prefix_search('xyz', 3), ['car', 'b', 5])
+        self.assertRaises(ValueError, myTrie.fuzzy_prefix_search, 'cat', -1)
+
+    def test_02(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary)
+        prefixes = [words[0][:i] for words in Dictionary[::97] for i in range(len(words[0]) + 1)] + ['evtfq', 'zzzz']
+
+        # testing
+        for prefix in prefixes:
+            self.assertEqual(myTrie.fuzzy_prefix_search(prefix, 0), myTrie.prefix_search(prefix))
+        for prefix in ['abdom', 'abstrct', 'aclimat', 'acquit']:
+            matches = [words for words in Dictionary
+                       if any(edit_distance(words[0][:i], prefix) <= 1 for i in range(len(words[0]) + 1))]
+            best = min(matches, key=lambda words: (-words[2], words[0]))
+            self.assertEqual(myTrie.fuzzy_prefix_search(prefix, 1), [best[0], best[1], len(matches)])
+
+
+# 1: Dictionary Loading
+
+class TestingLoader(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        records = list(iter_dictionary("Dictionary.txt"))
+
+        # testing
+        self.assertEqual(records, [tuple(words) for words in Dictionary])
+
+    def test_02(self):
+
+        # initialising test
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, "Dictionary.txt")
+        shutil.copy("Dictionary.txt", filename)
+        myTrie = Trie(load_dictionary("Dictionary.txt"))
+        coldTrie = load_trie(filename)
+        warmTrie = load_trie(filename)
+
+        # testing
+        self.assertTrue(os.path.exists(cache_path(filename)))
+        for prefix in ['', 'a', 'ab', 'mvn', 'zz', 'evtfq']:
+            self.assertEqual(coldTrie.prefix_search(prefix), myTrie.prefix_search(prefix))
+            self.assertEqual(warmTrie.prefix_search(prefix), myTrie.prefix_search(prefix))
+
+    def test_03(self):
+
+        # initialising test
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, "Dictionary.txt")
+        shutil.copy("Dictionary.txt", filename)
+        myTrie = Trie(load_dictionary("Dictionary.txt"))
+        coldTrie = load_trie(filename, compact=True)
+        warmTrie = load_trie(filename, compact=True)
+
+        # testing
+        self.assertTrue(os.path.exists(cache_path(filename, compact=True)))
+        self.assertIsInstance(warmTrie, CompactTrie)
+        self.assertEqual(len(warmTrie), len(coldTrie))
+        for prefix in ['', 'a', 'ab', 'mvn', 'zz', 'evtfq']:
+            self.assertEqual(coldTrie.prefix_search(prefix), myTrie.prefix_search(prefix))
+            self.assertEqual(warmTrie.prefix_search(prefix), myTrie.prefix_search(prefix))
+
+
+# 1: Compact Trie
+
+class TestingCompactTrie(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary)
+        compactTrie = CompactTrie(Dictionary)
+        prefixes = {words[0][:i] for words in Dictionary for i in range(len(words[0]) + 1)}
+
+        # testing
+        for prefix in prefixes | {'evtfq', 'siczn', 'zzzz'}:
+            self.assertEqual(compactTrie.prefix_search(prefix), myTrie.prefix_search(prefix))
+
+    def test_02(self):
+
+        # initialising test
+        Dictionary = [['ab', 'first', 5], ['abc', 'second', 5], ['abd', 'third', 7], ['b', 'fourth', 1]]
+        compactTrie = CompactTrie(Dictionary)
+
+        # testing
+        self.assertEqual(compactTrie.prefix_search(''), ['abd', 'third', 4])
+        self.assertEqual(compactTrie.prefix_search('ab'), ['abd', 'third', 3])
+        self.assertEqual(compactTrie.prefix_search('abc'), ['abc', 'second', 1])
+        self.assertEqual(compactTrie.prefix_search('c'), [None, None, 0])
+        self.assertEqual(len(compactTrie), 6)
+
+
+# 1: Trie Snapshots
+
+class TestingSnapshot(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, "Dictionary.snapshot")
+        Dictionary = load_dictionary("Dictionary.txt")
+        myTrie = Trie(Dictionary)
+        save_snapshot(myTrie, filename)
+        prefixes = {words[0][:i] for words in Dictionary for i in range(len(words[0]) + 1)}
+
+        # testing
+        with TrieSnapshot(filename) as snapshot:
+            for prefix in prefixes | {'evtfq', 'siczn', 'zzzz'}:
+                self.assertEqual(snapshot.prefix_search(prefix), myTrie.prefix_search(prefix))
+
+    def test_02(self):
+
+        # initialising test
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, "Dictionary.snapshot")
+        Dictionary = [['caf\u00e9', 'coffee', 3], ['cab', 'taxi', 3], ['car', 'vehicle', 9]]
+        save_snapshot(CompactTrie(Dictionary), filename)
+
+        # testing
+        with TrieSnapshot(filename) as snapshot:
+            self.assertEqual(snapshot.prefix_search('ca'), ['car', 'vehicle', 3])
+            self.assertEqual(snapshot.prefix_search('caf'), ['caf\u00e9', 'coffee', 1])
+            self.assertEqual(snapshot.prefix_search('d'), [None, None, 0])
+        with open(filename, "wb") as outfile:
+            outfile.write(b"not a snapshot" * 8)
+        self.assertRaises(ValueError, TrieSnapshot, filename)
+
+
 # 2: A Weekend Getaway
 
 class TestingQ2(unittest.TestCase):
@@ -847,8 +1338,369 @@ class TestingQ2(unittest.TestCase):
             self.assertCountEqual(cars[i], expected[output][i])
 
 
+# 2: Max-Flow Engines
+
+class TestingMaxFlowMethods(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        preferences = [[0], [1], [0,1], [0, 1], [1, 0], [1], [1, 0], [0, 1], [1]]
+        licences = [1, 4, 0, 5, 8]
+        expected = [[[0, 4, 2, 3 ,6], [1, 5, 8, 7]],
+                    [[0, 4, 2, 3, 7], [1, 5, 8, 6]],
+                    [[0, 4, 2, 6, 7], [1, 5, 8, 3]],
+                    [[0, 4, 3, 6, 7], [1, 5, 8, 2]],
+                    [[0, 4, 2, 3], [1, 5, 8, 6, 7]],
+                    [[0, 4, 2, 6], [1, 5, 8, 3, 7]],
+                    [[0, 4, 2, 7], [1, 5, 8, 3, 6]],
+                    [[0, 4, 3, 6], [1, 5, 8, 2, 7]],
+                    [[0, 4, 3, 7], [1, 5, 8, 2, 6]],
+                    [[0, 4, 6, 7], [1, 5, 8, 2, 3]]]
+
+        # testing
+        for method in ["ford_fulkerson", "dinic", "push_relabel"]:
+            cars = allocate(preferences, licences, method)
+            self.assertEqual(len(cars), len(expected[0]))
+            output = find_chosen_output(cars, expected)
+            for i in range(len(cars)):
+                self.assertCountEqual(cars[i], expected[output][i])
+
+    def test_02(self):
+
+        # initialising test
+        preferences = [[0], [0], [0], [0], [0], [0]]
+        licences = [1, 4, 3]
+
+        # testing
+        for method in ["ford_fulkerson", "dinic", "push_relabel"]:
+            self.assertEqual(allocate(preferences, licences, method), None)
+        self.assertRaises(ValueError, allocate, preferences, licences, "simplex")
+
+    def test_03(self):
+
+        # initialising test
+        network = FlowNetwork()
+        source = network.addVertex("source")
+        sink = network.addVertex("sink")
+        middle = network.addVertex("a")
+        edge = network.addEdge("source", "a", 3)
+        network.addEdgeById(middle, sink, 2)
+
+        # testing
+        self.assertEqual((source, sink, middle), (0, 1, 2))
+        self.assertEqual(network.getVertex("a"), middle)
+        self.assertEqual(network.getVertex("b"), None)
+        self.assertEqual(network.to[edge], middle)
+        self.assertEqual(network.to[edge ^ 1], source)
+        self.assertEqual(network.capacity[edge ^ 1], 0)
+        self.assertEqual(network.edgesOf(middle), [edge + 2, edge ^ 1])
+        self.assertEqual(network.calculateMaxFlow("dinic"), 2)
+        self.assertEqual(network.flow[edge], 2)
+        self.assertEqual(network.flow[edge ^ 1], -2)
+
+    def test_04(self):
+
+        # initialising test
+        preferences = [[1, 0], [1], [0], [], [0, 1], [1]]
+        licences = [0, 4, 4, 9]
+        network = FlowNetwork()
+        network.create_network(preferences, licences)
+
+        # testing
+        self.assertEqual(network.names, ["source", "sink", "0", "1", "2", "3", "4", "5", "d0", "d1", "c0", "c1", "e"])
+        destinations = lambda name: [network.names[network.to[edge]]
+                                     for edge in network.edgesOf(network.getVertex(name))]
+        self.assertEqual(destinations("0"), ["c0", "c1", "d0", "d1", "source"])
+        self.assertEqual(destinations("1"), ["c1", "source"])
+        self.assertEqual(destinations("3"), ["source"])
+        self.assertEqual(destinations("d1"), ["4", "0", "sink"])
+        self.assertEqual(destinations("sink"), ["e", "d1", "d0"])
+        self.assertEqual(network.capacity[network.edgesOf(network.getVertex("e"))[0]], 2)
+        self.assertRaises(IndexError, network.create_network, [[0], [2]], [0])
+
+    def test_05(self):
+
+        # initialising test
+        preferences = [[2], [0], [2], [0], [1], [1], [0], [1], [2], [0], [1]]
+        licences = [0, 1, 2, 3, 4, 5]
+        network = FlowNetwork()
+        network.create_network(preferences, licences)
+        network.calculateMaxFlow("dinic")
+
+        # testing
+        self.assertEqual(network.destinations, 3)
+        self.assertEqual(network.getResults(), [[1, 3, 6, 9], [4, 5, 7, 10], [0, 2, 8]])
+        self.assertEqual(FlowNetwork().getResults(), [])
+
+    def test_06(self):
+
+        # initialising test
+        instances = [([[0], [0], [0], [0], [0], [0]], [1, 4, 3]),
+                     ([[0], [1], [0,1], [0, 1], [1, 0], [1], [1, 0], [0, 1], [1]], [1, 4, 0, 5, 8]),
+                     ([[0], [0]], [0, 1]),
+                     ([[0]], [0])]
+
+        # testing
+        for workers in [1, 2]:
+            results = allocate_many(instances, workers, "dinic")
+            self.assertEqual([cars for cars, _ in results], [allocate(*instance, "dinic") for instance in instances])
+            self.assertTrue(all(seconds >= 0 for _, seconds in results))
+        self.assertEqual(allocate_many([], 2), [])
+
+    def test_07(self):
+
+        # initialising test
+        preferences = [[0], [0], [0], [0], [0], [0], [1], [], [0, 1], [0, 1], [0, 3]]
+        licences = [0, 1, 2, 6, 12]
+
+        # testing
+        self.assertEqual(infeasibility_report(preferences, licences),
+                         ["3 cars need 6 drivers, licensed people: 4",
+                          "people [7] have no preferences",
+                          "people [10] prefer destinations outside 0 to 2",
+                          "destination 0 seats 5, people only wanting it: 6",
+                          "destination 1 needs 2 drivers, licensed people preferring it: 1",
+                          "destination 2 needs 2 drivers, licensed people preferring it: 0"])
+        self.assertEqual(infeasibility_report([[0, 1]] * 11, list(range(11))),
+                         ["destination 2 needs 2 drivers, licensed people preferring it: 0",
+                          "destinations 0 and 1 seat 10, people only wanting them: 11"])
+        self.assertEqual(infeasibility_report([[0], [0]], [0, 1]), [])
+        self.assertEqual(infeasibility_report([[0], [0]], [0]),
+                         ["1 cars need 2 drivers, licensed people: 1",
+                          "destination 0 needs 2 drivers, licensed people preferring it: 1"])
+        self.assertEqual(infeasibility_report([], []), ["a car needs at least 2 people, there are 0"])
+
+    def test_08(self):
+
+        # initialising test
+        preferences = [[0], [1], [0,1], [0, 1], [1, 0], [1], [1, 0], [0, 1], [1]]
+        licences = [1, 4, 0, 5, 8]
+        network = FlowNetwork()
+        network.create_network(preferences, licences)
+
+        # testing
+        self.assertEqual(network.greedyFlow(preferences, licences), 8)
+        self.assertEqual(network.sourceFlow(), 8)
+        self.assertEqual(network.getResults(), [[0, 2, 3, 7], [1, 4, 5, 6]])
+        self.assertEqual(network.calculateMaxFlow("dinic"), 9)
+        for method in ["ford_fulkerson", "dinic", "push_relabel"]:
+            for warm_start in [False, True]:
+                cars = allocate(preferences, licences, method, warm_start)
+                self.assertEqual(sorted(cars[0] + cars[1]), list(range(9)))
+                self.assertTrue({0, 4} <= set(cars[0]) and {1, 5, 8} <= set(cars[1]))
+
+    def test_09(self):
+
+        # initialising test
+        preferences = [[0, 1], [1, 0], [0, 1], [1, 0], [0, 1], [1, 0]]
+        licences = [0, 1, 2, 3]
+
+        # testing
+        self.assertEqual(allocate_min_cost(preferences, licences), ([[0, 2, 4], [1, 3, 5]], 0))
+        cars, cost = allocate_min_cost([[0, 1]] * 6, list(range(6)))
+        self.assertEqual((cost, len(cars[0]), len(cars[1])), (2, 4, 2))
+        self.assertEqual(allocate_min_cost([[0, 1]] * 6, [0, 1, 2]), None)
+
+    def test_10(self):
+
+        # initialising test
+        generator = random.Random(2000)
+        preferences = [generator.sample(range(400), generator.randint(1, 3)) for _ in range(2000)]
+        licences = [i for i in range(2000) if generator.random() < 0.5]
+        flows = {}
+        for method in ["dinic", "push_relabel"]:
+            network = FlowNetwork()
+            network.create_network(preferences, licences)
+            timer = time.perf_counter()
+            flows[method] = network.calculateMaxFlow(method)
+            seconds = time.perf_counter() - timer
+            balance = [0] * len(network.names)
+            for edge in range(0, len(network.to), 2):
+                balance[network.to[edge]] += network.flow[edge]
+                balance[network.to[edge ^ 1]] -= network.flow[edge]
+
+        # testing
+        # Some flow cannot reach the sink, which push-relabel once took 16s to find out without its heuristics
+        self.assertEqual(flows["push_relabel"], flows["dinic"])
+        self.assertLess(flows["push_relabel"], 2000)
+        self.assertEqual(balance[2:], [0] * (len(network.names) - 2))
+        self.assertLess(seconds, 5)
+
+
+# 2: Incremental Allocation
+
+class TestingAllocator(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        preferences = [[0], [1], [0,1], [0, 1], [1, 0], [1], [1, 0], [0, 1], [1]]
+        licences = [1, 4, 0, 5, 8]
+        allocator = Allocator(preferences, licences)
+
+        # testing
+        cars = allocator.results()
+        self.assertEqual(len(cars), 2)
+        self.assertTrue({0, 4} <= set(cars[0]) and {1, 5, 8} <= set(cars[1]))
+        allocator.change_licence(4, False)
+        self.assertEqual(allocator.results(), None)
+        allocator.change_licence(2, True)
+        cars = allocator.results()
+        self.assertTrue({0, 2} <= set(cars[0]) and {1, 5, 8} <= set(cars[1]))
+        self.assertEqual(sorted(cars[0] + cars[1]), list(range(9)))
+        allocator.change_preferences(0, [1])
+        self.assertEqual(allocator.results(), None)
+        self.assertRaises(IndexError, allocator.change_preferences, 0, [2])
+
+    def test_02(self):
+
+        # initialising test
+        allocator = Allocator([[0], [0], [0], [0], [0]], [0, 1])
+
+        # testing
+        self.assertEqual(allocator.results(), [[0, 1, 2, 3, 4]])
+        person = allocator.add_person([1], True)
+        self.assertEqual(person, 5)
+        self.assertEqual(allocator.results(), None)
+        allocator.add_person([1, 0], True)
+        allocator.change_preferences(2, [1])
+        self.assertEqual(allocator.results(), [[0, 1, 3, 4], [2, 5, 6]])
+        allocator.remove_person(5)
+        self.assertEqual(allocator.results(), None)
+        allocator.remove_person(6)
+        self.assertEqual(allocator.results(), None)
+        allocator.change_preferences(2, [0])
+        self.assertEqual(allocator.results(), [[0, 1, 2, 3, 4]])
+        self.assertRaises(IndexError, allocator.remove_person, 5)
+        allocator.remove_person(0)
+        self.assertEqual(allocator.results(), None)
+
+
+# Metrics
+
+class TestingMetrics(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        metrics = Metrics()
+        myTrie = Trie([["ab", "first", 5], ["ac", "second", 5], ["b", "third", 1]], metrics=metrics)
+        myTrie.prefix_search("a")
+        myTrie.prefix_search("az")
+        myTrie.prefix_search("")
+
+        # testing
+        self.assertEqual(metrics.as_dict(), {"compare_calls": 8, "compare_characters": 4, "nodes_allocated": 8,
+                                             "prefix_search_nodes_visited_count": 3,
+                                             "prefix_search_nodes_visited_sum": 5})
+        self.assertEqual(metrics.to_prometheus("trie").splitlines()[:2],
+                         ["# TYPE trie_compare_calls_total counter", "trie_compare_calls_total 8"])
+        self.assertIn("trie_prefix_search_nodes_visited_sum 5", metrics.to_prometheus("trie"))
+        myTrie.update_frequency("ab", 9)
+        self.assertEqual(metrics.counters["nodes_allocated"], 9)
+        metrics.reset()
+        self.assertEqual(metrics.to_prometheus(), "")
+
+    def test_02(self):
+
+        # initialising test
+        preferences = [[0], [1], [0,1], [0, 1], [1, 0], [1], [1, 0], [0, 1], [1]]
+        licences = [1, 4, 0, 5, 8]
+        network = FlowNetwork()
+        network.metrics = Metrics()
+        network.create_network(preferences, licences)
+        network.getVertex("d0")
+        network.calculateMaxFlow("ford_fulkerson")
+
+        # testing
+        counters = network.metrics.counters
+        self.assertEqual(counters["get_vertex_calls"], 1)
+        self.assertEqual(counters["augmenting_paths"], 9)
+        self.assertTrue(0 < counters["bfs_vertices_scanned"] < counters["bfs_edges_scanned"])
+        self.assertEqual(FlowNetwork().metrics, None)
+
+    def test_03(self):
+
+        # initialising test
+        network = FlowNetwork()
+        for name in ["source", "sink", "a", "b"]:
+            network.addVertex(name)
+        for origin, destination in [("source", "a"), ("source", "b"), ("a", "sink"), ("b", "sink")]:
+            network.addEdge(origin, destination, 1)
+        network.metrics = Metrics()
+        network.calculateMaxFlow("ford_fulkerson")
+
+        # testing
+        # Three searches: source then b, source then a, and source alone. Each stops at the edge reaching the sink
+        counters = network.metrics.counters
+        self.assertEqual(counters["augmenting_paths"], 2)
+        self.assertEqual(counters["bfs_vertices_scanned"], 5)
+        self.assertEqual(counters["bfs_edges_scanned"], 8)
+        network.metrics.reset()
+        network.buildLevels()
+        self.assertEqual(network.metrics.counters, {"bfs_vertices_scanned": 1, "bfs_edges_scanned": 2})
+
+
+# Tracing
+
+class TestingTracer(unittest.TestCase):
+
+    def test_01(self):
+
+        # initialising test
+        ticks = iter(range(100))
+        tracer = Tracer(clock=lambda: next(ticks))
+        finished = []
+        tracer.add_callback(lambda span: finished.append(span["name"]))
+        with tracer.span("outer", size=3) as span:
+            with tracer.span("inner"):
+                pass
+            tracer.record("round", tracer.clock(), flow=1)
+            span["attributes"]["done"] = True
+
+        # testing
+        self.assertEqual(finished, ["inner", "round", "outer"])
+        self.assertEqual([span["stack"] for span in tracer.spans],
+                         [("outer", "inner"), ("outer", "round"), ("outer",)])
+        self.assertEqual(tracer.spans[2]["attributes"], {"size": 3, "done": True})
+        self.assertEqual(tracer.collapsed_stacks(), "outer 3000000\nouter;inner 1000000\nouter;round 1000000\n")
+        events = tracer.chrome_trace()["traceEvents"]
+        self.assertEqual([(event["name"], event["ts"], event["dur"]) for event in events],
+                         [("outer", 1000000, 5000000), ("inner", 2000000, 1000000), ("round", 4000000, 1000000)])
+
+    def test_02(self):
+
+        # initialising test
+        preferences = [[0], [1], [0,1], [0, 1], [1, 0], [1], [1, 0], [0, 1], [1]]
+        licences = [1, 4, 0, 5, 8]
+        tracer = Tracer(profile=True)
+        result = allocate(preferences, licences, method="dinic", warm_start=False, tracer=tracer)
+
+        # testing
+        self.assertEqual(result, allocate(preferences, licences, method="dinic", warm_start=False))
+        names = [span["name"] for span in tracer.spans]
+        self.assertEqual([name for name in names if name != "phase"],
+                         ["validate", "create_network", "max_flow", "get_results", "allocate"])
+        phases = [span for span in tracer.spans if span["name"] == "phase"]
+        self.assertEqual(phases[0]["stack"], ("allocate", "max_flow", "phase"))
+        self.assertEqual(sum(span["attributes"]["paths"] for span in phases), 9)
+        self.assertEqual(phases[-1]["attributes"]["paths"], 0)
+        self.assertTrue(tracer.profiler.getstats())
+        self.assertEqual(tracer.stack, [])
+
+
 # Helper Functions
 
+def edit_distance(first, second):
+    row = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        below = [i]
+        for j in range(1, len(second) + 1):
+            below.append(min(row[j] + 1, below[j - 1] + 1, row[j - 1] + (char != second[j - 1])))
+        row = below
+    return row[-1]
+
 def load_dictionary(filename):
     infile = open(filename, encoding = 'utf-8')
     word, frequency = "", 0